@@ -7,25 +7,57 @@ common_script_dir=$( cd -- "$( dirname -- "${BASH_SOURCE[0]}" )" &> /dev/null &&
 
 . "${common_script_dir}/config.sh"
 
-download_hf_model() {
-    local subdir="$1"
-    local repo="$2"
-    local server_path="$3"
-    local filename=$(basename "$server_path")
-
-    local local_dir="${install_root}/ComfyUI/models/${subdir}/"
-    local local_path="${local_dir}/${filename}"
-
-    cd $local_dir
-    if [ -f "$local_path" ]; then
-        echo "Model already exists: $filename"
-    else
-        ln -sf $(huggingface-cli download "$repo" "$server_path")
+# Download the models listed in manifests (see models/) into ComfyUI's model directories
+download_models() {
+    "${common_script_dir}/download_models.py" \
+        --models-dir "${install_root}/ComfyUI/models" \
+        --parallel "${download_parallel}" \
+        --report "${model_report_fn}" \
+        "$@"
+}
+
+# Identifies this container. Steps that install into the container rather than the volume include
+# it in their fingerprint, so they run again in a new container. It is kept outside the volume, so
+# it goes with the rest of the container disk.
+container_id() {
+    if [ ! -f /root/.setup_container_id ]; then
+        cat /proc/sys/kernel/random/uuid > /root/.setup_container_id
     fi
+    cat /root/.setup_container_id
+}
+
+# Hash of the contents of files, counting missing files too
+hash_files() {
+    local fn
+    for fn in "$@"; do
+        if [ -f "$fn" ]; then
+            sha256sum "$fn"
+        else
+            echo "missing $fn"
+        fi
+    done | sha256sum | cut -d ' ' -f 1
+}
+
+# Fingerprint of a setup step's inputs, e.g. a git HEAD, a hash_files of requirements, config values
+step_fingerprint() {
+    printf '%s\n' "$@" | sha256sum | cut -d ' ' -f 1
+}
+
+# Succeed if a step last completed with this fingerprint and update mode is off
+step_is_current() {
+    local name=$1
+    local fingerprint=$2
+    [ "$setup_update" -eq 0 ] && [ -f "${setup_state_dir}/${name}" ] && \
+        [ "$(cat "${setup_state_dir}/${name}")" = "$fingerprint" ]
+}
 
-    local real_path=$(realpath "$local_path")
-    local size=$(du -bs "$real_path" | awk '{printf("%4.1f GB\n", $1/2^30)}')
-    echo "${size} ${filename}" >> ${model_size_fn}
+# Record that a step completed with this fingerprint
+step_done() {
+    local name=$1
+    local fingerprint=$2
+    mkdir -p "$setup_state_dir"
+    echo "$fingerprint" > "${setup_state_dir}/${name}.tmp"
+    mv "${setup_state_dir}/${name}.tmp" "${setup_state_dir}/${name}"
 }
 
 if [ -n "$venv_dir" ] && [ -f "$venv_dir/bin/activate" ]; then
@@ -14,8 +14,21 @@ kohya_ss_dir="${kohya_ss_parent}/kohya_ss"
 #venv_dir="/workspace/venv"
 venv_dir=""
 
-model_size_fn="${install_root}/model_size.txt"
+# Size of each model downloaded by download_models.py, printed by report_disk_usage.sh
+model_report_fn="${install_root}/model_sizes.json"
 
+# Chunks of model files downloaded at the same time
+download_parallel=8
+
+# Fingerprints of the inputs each setup step last completed with, so unchanged steps are skipped
+setup_state_dir="${install_root}/.setup_state"
+
+# Set SETUP_UPDATE=1, or pass --update to setup.sh, to pull the latest ComfyUI, upgrade packages
+# and pull the Ollama models again. Otherwise setup doesn't go to the network for anything it
+# already has.
+setup_update=${SETUP_UPDATE:-0}
+
+# Only applies when the OS packages are set up, i.e. in a new container or in update mode
 do_apt_upgrade=0
 
 # psmisc for killall
@@ -0,0 +1,459 @@
+#!/usr/bin/env python3
+
+# SPDX-FileCopyrightText: Copyright (c) 2025 Richard L. Lynch <rich@richlynch.com>
+# SPDX-License-Identifier: MIT
+
+"""Download the models listed in manifests into ComfyUI's model directories, several chunks at
+a time.
+
+Each manifest line has the model directory, the Hugging Face repository and the path of the file
+in the repository, and optionally the file's SHA-256:
+
+    diffusion_models/  black-forest-labs/FLUX.1-dev  flux1-dev.safetensors
+
+Files are fetched with HTTP range requests in chunks, by a pool of --parallel workers shared by
+all files, into <name>.part. The chunks that are done are recorded in <name>.part.json, so an
+interrupted download carries on where it left off. A finished file is checked against the SHA-256
+from the manifest or the hub before it is moved into place. Files that are already there are
+skipped without going to the network, unless --verify is given.
+
+Only the standard library is used, so this runs before any venv is set up. The hub is
+$HF_ENDPOINT, or https://huggingface.co, with the token from $HF_TOKEN or $HF_HOME/token.
+fake_hub.py serves a local directory the same way, for trying this out offline.
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import shlex
+import hashlib
+import argparse
+import threading
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+SHA256_PATTERN = re.compile(r'^[0-9a-f]{64}$')
+
+def hash_file(path, chunk_size=1 << 20):
+    """
+    Get the SHA-256 of a file's contents as a hex string.
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        while chunk := file.read(chunk_size):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def format_size(size):
+    """
+    Format a size in bytes as GB, like the old model_size.txt.
+    """
+    return f'{size / 2**30:5.1f} GB'
+
+def parse_manifest(path):
+    """
+    Read the models listed in a manifest. Blank lines and anything after # are ignored.
+
+    Returns:
+        list: dict with subdir, repo, path and sha256 (or None) for each model
+    """
+    models = []
+    with open(path, encoding='utf-8') as manifest_file:
+        for line_number, line in enumerate(manifest_file, 1):
+            fields = shlex.split(line, comments=True)
+            if not fields:
+                continue
+            if len(fields) not in (3, 4):
+                raise ValueError(f'{path}:{line_number}: expected <subdir> <repo> <path> [sha256]')
+            sha256 = fields[3].lower() if len(fields) == 4 else None
+            if sha256 is not None and not SHA256_PATTERN.match(sha256):
+                raise ValueError(f'{path}:{line_number}: {fields[3]} is not a SHA-256')
+            models.append({'subdir': fields[0].strip('/'), 'repo': fields[1], 'path': fields[2], 'sha256': sha256})
+    return models
+
+def hub_token():
+    """
+    Get the Hugging Face token saved by huggingface-cli login, or None.
+    """
+    if os.environ.get('HF_TOKEN'):
+        return os.environ['HF_TOKEN']
+    hf_home = os.environ.get('HF_HOME', os.path.expanduser('~/.cache/huggingface'))
+    try:
+        with open(os.path.join(hf_home, 'token'), encoding='utf-8') as token_file:
+            return token_file.read().strip() or None
+    except OSError:
+        return None
+
+class NoRedirect(urllib.request.HTTPRedirectHandler):
+    """
+    Hand redirects back to the caller, so the token isn't sent on to the CDN.
+    """
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+class Hub:
+    """
+    Look up and fetch files from a Hugging Face compatible hub.
+
+    Args:
+        endpoint: Base URL of the hub
+        token: Token sent to the hub, or None
+        revision: Branch, tag or commit to download
+        timeout: Seconds to wait for the server before retrying
+    """
+    def __init__(self, endpoint, token, revision, timeout):
+        self.endpoint = endpoint.rstrip('/')
+        self.token = token
+        self.revision = revision
+        self.timeout = timeout
+        self.opener = urllib.request.build_opener(NoRedirect)
+
+    def headers(self, with_token):
+        """
+        Get the headers for a request, with the token for requests to the hub itself.
+        """
+        headers = {'Accept-Encoding': 'identity', 'User-Agent': 'pod_on_demand-download_models'}
+        if self.token and with_token:
+            headers['Authorization'] = f'Bearer {self.token}'
+        return headers
+
+    def resolve(self, model):
+        """
+        Find where to download a file from, and its size and SHA-256.
+
+        Large files are stored with LFS and redirect to a CDN, with the size and SHA-256 in the
+        X-Linked-Size and X-Linked-Etag headers. Small files are served directly, and only their
+        size is known.
+
+        Returns:
+            tuple: (url, size, sha256 or None, whether the URL is on the hub and needs the token)
+        """
+        url = f"{self.endpoint}/{model['repo']}/resolve/{urllib.parse.quote(self.revision)}/{urllib.parse.quote(model['path'])}"
+        for _ in range(5):
+            request = urllib.request.Request(url, method='HEAD', headers=self.headers(True))
+            try:
+                with self.opener.open(request, timeout=self.timeout) as response:
+                    headers = response.headers
+                    location = None
+            except urllib.error.HTTPError as ex:
+                if ex.code not in (301, 302, 303, 307, 308):
+                    raise
+                headers = ex.headers
+                location = urllib.parse.urljoin(url, headers['Location'])
+
+            etag = (headers.get('X-Linked-Etag') or headers.get('ETag') or '').strip('"').removeprefix('W/').strip('"')
+            size = headers.get('X-Linked-Size') or (headers.get('Content-Length') if location is None else None)
+            if location is not None and 'X-Linked-Size' not in headers:
+                # e.g. a renamed repository - follow it on the hub
+                url = location
+                continue
+            if size is None:
+                raise ValueError(f'{url} did not report a size')
+            return location or url, int(size), etag if SHA256_PATTERN.match(etag) else None, location is None
+        raise ValueError(f'Too many redirects for {model["repo"]}/{model["path"]}')
+
+    def fetch(self, url, with_token, start, end):
+        """
+        Fetch bytes start to end, inclusive, of a file.
+
+        Returns:
+            bytes: The data
+        """
+        headers = dict(self.headers(with_token), Range=f'bytes={start}-{end}')
+        request = urllib.request.Request(url, headers=headers)
+        with self.opener.open(request, timeout=self.timeout) as response:
+            # A server that ignores ranges sends the whole file, which starts with the first chunk
+            if response.status != 206 and start != 0:
+                raise ValueError(f'Server ignored the range request for {url}')
+            return response.read(end - start + 1)
+
+class Download:
+    """
+    One file being downloaded, with the chunks that are done saved next to it.
+
+    Args:
+        model: Entry from the manifest
+        dest: Final path of the file
+        hub: Hub to fetch it from
+        chunk_size: Bytes per range request
+    """
+    def __init__(self, model, dest, hub, chunk_size):
+        self.model = model
+        self.name = f"{model['subdir']}/{os.path.basename(model['path'])}"
+        self.dest = dest
+        self.part_path = f'{dest}.part'
+        self.state_path = f'{dest}.part.json'
+        self.hub = hub
+        self.chunk_size = chunk_size
+        self.lock = threading.Lock()
+        self.url = None
+        self.url_needs_token = False
+        self.size = None
+        self.sha256 = None
+        self.done = set()
+        self._key = None
+        self.failed = None
+        self.start_time = time.time()
+        self.elapsed = None
+        self.bytes_fetched = 0
+
+    def prepare(self):
+        """
+        Look the file up on the hub and open the partial download, keeping any chunks already done
+        for the same file.
+        """
+        self.url, self.size, hub_sha256, self.url_needs_token = self.hub.resolve(self.model)
+        if self.model['sha256'] and hub_sha256 and self.model['sha256'] != hub_sha256:
+            raise ValueError(f"SHA-256 on the hub doesn't match the manifest: {hub_sha256}")
+        self.sha256 = self.model['sha256'] or hub_sha256
+
+        key = {'repo': self.model['repo'], 'path': self.model['path'], 'size': self.size,
+               'sha256': self.sha256, 'chunk_size': self.chunk_size}
+        try:
+            with open(self.state_path, encoding='utf-8') as state_file:
+                state = json.load(state_file)
+            if os.path.exists(self.part_path) and all(state.get(name) == value for name, value in key.items()):
+                self.done = set(state['done'])
+        except (OSError, ValueError, KeyError):
+            pass
+        self._key = key
+
+        os.makedirs(os.path.dirname(self.dest), exist_ok=True)
+        if not self.done:
+            with open(self.part_path, 'wb') as part_file:
+                # Sparse, so chunks can be written at their offsets in any order
+                part_file.truncate(self.size)
+        self._save_state()
+
+    @property
+    def chunk_count(self):
+        return max((self.size + self.chunk_size - 1) // self.chunk_size, 1)
+
+    def remaining_chunks(self):
+        return [index for index in range(self.chunk_count) if index not in self.done]
+
+    def _save_state(self):
+        tmp_path = f'{self.state_path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as state_file:
+            json.dump(dict(self._key, done=sorted(self.done)), state_file, separators=(',', ':'))
+        os.replace(tmp_path, self.state_path)
+
+    def fetch_chunk(self, index, retries):
+        """
+        Download one chunk into the partial file, retrying with backoff.
+
+        Returns:
+            bool: True once every chunk is done
+        """
+        start = index * self.chunk_size
+        end = min(start + self.chunk_size, self.size) - 1
+        for attempt in range(retries + 1):
+            if self.failed:
+                return False
+            try:
+                data = self.hub.fetch(self.url, self.url_needs_token, start, end) if self.size else b''
+                if len(data) != end - start + 1:
+                    raise ValueError(f'got {len(data)} of {end - start + 1} bytes')
+                break
+            except urllib.error.HTTPError as ex:
+                error = ex
+                if ex.code in (403, 410):
+                    # Signed CDN links expire - look the file up again
+                    with self.lock:
+                        self.url, _, _, self.url_needs_token = self.hub.resolve(self.model)
+            except (OSError, ValueError) as ex:
+                error = ex
+            if attempt < retries:
+                time.sleep(min(2 ** attempt, 30))
+        else:
+            self.failed = f'chunk {index}: {error}'
+            return False
+
+        fd = os.open(self.part_path, os.O_WRONLY)
+        try:
+            os.pwrite(fd, data, start)
+            # Only record the chunk once it is on disk, so a crash can't leave a hole marked done
+            os.fdatasync(fd)
+        finally:
+            os.close(fd)
+        with self.lock:
+            self.done.add(index)
+            self.bytes_fetched += len(data)
+            self._save_state()
+            return len(self.done) == self.chunk_count
+
+    def finish(self):
+        """
+        Check the finished file and move it into place.
+        """
+        if self.sha256:
+            actual = hash_file(self.part_path)
+            if actual != self.sha256:
+                # Start over next time rather than keep chunks that can't be told apart
+                os.remove(self.part_path)
+                os.remove(self.state_path)
+                self.failed = f'SHA-256 mismatch: expected {self.sha256}, got {actual}'
+                return
+        elif os.path.getsize(self.part_path) != self.size:
+            self.failed = f'size mismatch: expected {self.size}'
+            return
+        if os.path.islink(self.dest):
+            # e.g. a link into the cache of the old huggingface-cli downloads
+            os.remove(self.dest)
+        os.replace(self.part_path, self.dest)
+        os.remove(self.state_path)
+
+def load_report(path):
+    """
+    Load the size report, or an empty one.
+    """
+    try:
+        with open(path, encoding='utf-8') as report_file:
+            return json.load(report_file)
+    except (OSError, ValueError):
+        return {}
+
+def save_report(path, report):
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as report_file:
+        json.dump(report, report_file, indent=1, sort_keys=True)
+    os.replace(tmp_path, path)
+
+def print_report(report):
+    """
+    Print the size of each model, smallest first, and the total.
+    """
+    for name, entry in sorted(report.items(), key=lambda item: item[1]['size']):
+        status = '' if entry['status'] in ('downloaded', 'present') else f" ({entry['status']})"
+        print(f"{format_size(entry['size'])} {name}{status}")
+    print(f"{format_size(sum(entry['size'] for entry in report.values()))} total")
+
+def download_models(models, args):
+    """
+    Download every model that isn't there yet with a shared pool of workers.
+
+    Returns:
+        dict: Report entry for each model
+    """
+    hub = Hub(args.endpoint, hub_token(), args.revision, args.timeout)
+    report = {}
+    downloads = []
+    for model in models:
+        dest = os.path.join(args.models_dir, model['subdir'], os.path.basename(model['path']))
+        name = f"{model['subdir']}/{os.path.basename(model['path'])}"
+        if os.path.exists(dest) and not args.verify:
+            print(f'Model already exists: {name}', flush=True)
+            report[name] = {'size': os.path.getsize(dest), 'status': 'present'}
+            continue
+        downloads.append(Download(model, dest, hub, args.chunk_mb << 20))
+
+    with ThreadPoolExecutor(max_workers=args.parallel) as executor:
+        def prepare(download):
+            try:
+                download.prepare()
+            except (OSError, ValueError) as ex:
+                download.failed = f'lookup failed: {ex}'
+        list(executor.map(prepare, downloads))
+
+        pending = []
+        for download in downloads:
+            if download.failed:
+                continue
+            if args.verify and os.path.exists(download.dest):
+                if os.path.getsize(download.dest) == download.size and (
+                        not download.sha256 or hash_file(download.dest) == download.sha256):
+                    print(f'Model verified: {download.name}', flush=True)
+                    os.remove(download.part_path)
+                    os.remove(download.state_path)
+                    report[download.name] = {'size': download.size, 'status': 'present'}
+                    download.failed = 'verified'
+                    continue
+                print(f'Model does not match the hub, downloading it again: {download.name}', flush=True)
+            resumed = len(download.done) * download.chunk_size
+            print(f'Downloading {download.name} ({format_size(download.size).strip()}'
+                  f"{f', resuming at {format_size(resumed).strip()}' if resumed else ''})", flush=True)
+            pending.append(download)
+
+        def complete(download):
+            try:
+                download.finish()
+            except OSError as ex:
+                download.failed = str(ex)
+            if not download.failed:
+                download.elapsed = time.time() - download.start_time
+                print(f'Downloaded {download.name} in {download.elapsed:.0f} seconds '
+                      f'({download.bytes_fetched / max(download.elapsed, 1e-3) / 2**20:.1f} MB/s)', flush=True)
+
+        def fetch(download, index):
+            if download.fetch_chunk(index, args.retries):
+                complete(download)
+
+        # Files in manifest order, so the first ones are ready first
+        futures = []
+        for download in pending:
+            remaining = download.remaining_chunks()
+            if not remaining:
+                # Every chunk was fetched before the last run stopped, but the file wasn't moved
+                # into place, e.g. while it was being hashed
+                futures.append(executor.submit(complete, download))
+            futures += [executor.submit(fetch, download, index) for index in remaining]
+        last_progress = time.time()
+        while not all(future.done() for future in futures):
+            time.sleep(1)
+            if time.time() - last_progress >= args.progress_interval:
+                last_progress = time.time()
+                fetched = sum(download.bytes_fetched for download in pending)
+                left = sum((download.chunk_count - len(download.done)) for download in pending if not download.failed)
+                print(f'Fetched {format_size(fetched).strip()}, {left} chunks left', flush=True)
+        for future in futures:
+            # Unexpected errors from the workers
+            future.result()
+
+    for download in downloads:
+        if download.failed == 'verified':
+            continue
+        if download.failed:
+            print(f'Failed to download {download.name}: {download.failed}', file=sys.stderr, flush=True)
+            report[download.name] = {'size': download.size or 0, 'status': 'failed'}
+        else:
+            report[download.name] = {'size': download.size, 'status': 'downloaded'}
+            if download.elapsed is not None:
+                report[download.name]['seconds'] = round(download.elapsed, 1)
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description='Download the models listed in manifests, several chunks at a time')
+    parser.add_argument('manifests', nargs='*', help='Files listing <subdir> <repo> <path> [sha256] per line')
+    parser.add_argument('--models-dir', default='/workspace/ComfyUI/models', help='Directory the subdirs are in')
+    parser.add_argument('--endpoint', default=os.environ.get('HF_ENDPOINT', 'https://huggingface.co'),
+                        help='Hub to download from')
+    parser.add_argument('--revision', default='main', help='Branch, tag or commit to download')
+    parser.add_argument('--parallel', type=int, default=8, help='Chunks downloaded at the same time')
+    parser.add_argument('--chunk-mb', type=int, default=64, help='MB per range request')
+    parser.add_argument('--retries', type=int, default=5, help='Retries of a chunk before giving up on its file')
+    parser.add_argument('--timeout', type=float, default=60, help='Seconds to wait for the server')
+    parser.add_argument('--progress-interval', type=float, default=30, help='Seconds between progress lines')
+    parser.add_argument('--verify', action='store_true', help='Check existing files against the hub too')
+    parser.add_argument('--report', help='JSON file to add the size of each model to')
+    parser.add_argument('--show-report', action='store_true', help='Print the sizes in --report and exit')
+    args = parser.parse_args()
+
+    if args.show_report:
+        print_report(load_report(args.report))
+        return
+
+    models = [model for manifest in args.manifests for model in parse_manifest(manifest)]
+    report = download_models(models, args)
+    if args.report:
+        # Other runs, e.g. for other manifests, add to the same report
+        save_report(args.report, dict(load_report(args.report), **report))
+    print_report(report)
+    if any(entry['status'] == 'failed' for entry in report.values()):
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+
+# SPDX-FileCopyrightText: Copyright (c) 2025 Richard L. Lynch <rich@richlynch.com>
+# SPDX-License-Identifier: MIT
+
+"""Local stand-in for the parts of the Hugging Face hub used by download_models.py, for offline runs.
+
+Serves <root>/<repo>/<path> at /<repo>/resolve/<revision>/<path>. Files of at least
+--lfs-threshold bytes behave like LFS files: the hub answers with a redirect to /cdn/, carrying
+the size and SHA-256 in X-Linked-Size and X-Linked-Etag. Smaller files are served directly. The
+CDN supports range requests and can be made to drop connections part way, to try out resuming:
+
+    ./fake_hub.py --root /tmp/hub --port 8800 --fail-rate 0.2 &
+    HF_ENDPOINT=http://127.0.0.1:8800 ./download_models.py --models-dir /tmp/models models/flux.txt
+"""
+
+import os
+import re
+import random
+import hashlib
+import argparse
+import functools
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+RESOLVE_PATTERN = re.compile(r'^/(?P<repo>[^/]+/[^/]+)/resolve/(?P<revision>[^/]+)/(?P<path>.+)$')
+RANGE_PATTERN = re.compile(r'^bytes=(?P<start>\d+)-(?P<end>\d*)$')
+
+@functools.cache
+def file_sha256(path, mtime):
+    """
+    Get the SHA-256 of a file, cached until it is modified.
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        while chunk := file.read(1 << 20):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class FakeHubHandler(BaseHTTPRequestHandler):
+    """
+    Answer hub and CDN requests from the files under server.root.
+    """
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args): # pylint: disable=redefined-builtin
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def do_HEAD(self):
+        self.handle_request(send_body=False)
+
+    def do_GET(self):
+        self.handle_request(send_body=True)
+
+    def handle_request(self, send_body):
+        path = urllib.parse.unquote(urllib.parse.urlsplit(self.path).path)
+        if path.startswith('/cdn/'):
+            if 'Authorization' in self.headers:
+                # The real CDN rejects requests carrying the hub token
+                self.send_error(400, 'Unexpected Authorization header')
+                return
+            self.send_file(os.path.join(self.server.root, path[len('/cdn/'):]), send_body)
+            return
+
+        match = RESOLVE_PATTERN.match(path)
+        if not match:
+            self.send_error(404)
+            return
+        if self.server.token and self.headers.get('Authorization') != f'Bearer {self.server.token}':
+            self.send_error(401, 'Invalid token')
+            return
+        file_path = os.path.join(self.server.root, match.group('repo'), match.group('path'))
+        if not os.path.isfile(file_path):
+            self.send_error(404, 'Entry not found')
+            return
+
+        size = os.path.getsize(file_path)
+        if size < self.server.lfs_threshold:
+            self.send_file(file_path, send_body)
+            return
+        self.send_response(302)
+        self.send_header('Location', f"/cdn/{urllib.parse.quote(match.group('repo'))}/{urllib.parse.quote(match.group('path'))}")
+        self.send_header('X-Linked-Size', str(size))
+        self.send_header('X-Linked-Etag', f'"{file_sha256(file_path, os.path.getmtime(file_path))}"')
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def send_file(self, file_path, send_body):
+        if not os.path.isfile(file_path):
+            self.send_error(404)
+            return
+        size = os.path.getsize(file_path)
+        start, end = 0, size - 1
+        match = RANGE_PATTERN.match(self.headers.get('Range', ''))
+        if match:
+            start = int(match.group('start'))
+            end = min(int(match.group('end')), size - 1) if match.group('end') else size - 1
+            if start >= size:
+                self.send_error(416)
+                return
+            self.send_response(206)
+            self.send_header('Content-Range', f'bytes {start}-{end}/{size}')
+        else:
+            self.send_response(200)
+        self.send_header('Content-Length', str(end - start + 1))
+        self.send_header('Accept-Ranges', 'bytes')
+        # Like git's blob hash for small files - not a SHA-256 of the contents
+        self.send_header('ETag', f'"{hashlib.sha1(file_path.encode()).hexdigest()}"')
+        self.end_headers()
+        if not send_body:
+            return
+
+        length = end - start + 1
+        cut_short = self.server.random.random() < self.server.fail_rate
+        if cut_short:
+            length //= 2
+        with open(file_path, 'rb') as file:
+            file.seek(start)
+            while length > 0:
+                chunk = file.read(min(length, 1 << 20))
+                if not chunk:
+                    break
+                self.wfile.write(chunk)
+                length -= len(chunk)
+        if cut_short:
+            # The client gets less than Content-Length, as if the connection dropped
+            self.close_connection = True
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve a directory like the Hugging Face hub')
+    parser.add_argument('--root', required=True, help='Directory with a <user>/<repo>/ subdirectory per repository')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8800)
+    parser.add_argument('--token', help='Token required by the hub')
+    parser.add_argument('--lfs-threshold', type=int, default=10 << 20,
+                        help='Size in bytes from which files are redirected to the CDN like LFS files')
+    parser.add_argument('--fail-rate', type=float, default=0, help='Probability of a CDN response being cut short')
+    parser.add_argument('--seed', type=int, help='Seed for --fail-rate')
+    parser.add_argument('--verbose', action='store_true', help='Log every request')
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer((args.host, args.port), FakeHubHandler)
+    server.root = args.root
+    server.token = args.token
+    server.lfs_threshold = args.lfs_threshold
+    server.fail_rate = args.fail_rate
+    server.random = random.Random(args.seed)
+    server.verbose = args.verbose
+    print(f'Fake hub serving {args.root} at http://{args.host}:{args.port}/', flush=True)
+    server.serve_forever()
+
+if __name__ == '__main__':
+    main()
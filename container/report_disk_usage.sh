@@ -15,9 +15,9 @@ script_dir=$( cd -- "$( dirname -- "${BASH_SOURCE[0]}" )" &> /dev/null && pwd )
 ########################################################################################
 
 echo "===================================================================="
-cat "$model_size_fn" | sort -n
+"${script_dir}/download_models.py" --show-report --report "$model_report_fn"
 
 echo "===================================================================="
 du -hsc /workspace
 
-rm -f "$model_size_fn"
+rm -f "$model_report_fn"
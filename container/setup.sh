@@ -8,21 +8,33 @@ set -eu
 
 script_dir=$( cd -- "$( dirname -- "${BASH_SOURCE[0]}" )" &> /dev/null && pwd )
 
+# Steps whose inputs haven't changed since they last completed are skipped, and nothing already
+# installed is fetched again. --update also pulls the latest ComfyUI, upgrades packages and pulls
+# the Ollama models again.
+if [ "${1:-}" = "--update" ]; then
+    export SETUP_UPDATE=1
+fi
+
 . "${script_dir}/common.sh"
 
-rm -f ${model_size_fn}
+rm -f ${model_report_fn}
 
 ${script_dir}/setup_os.sh
 ${script_dir}/setup_venv.sh
 ${script_dir}/setup_huggingface.sh
 ${script_dir}/setup_comfyui.sh
-${script_dir}/setup_flux.sh
-${script_dir}/setup_wan.sh
+
+# Download the Flux and WAN models with one pool of downloads, in the background while Ollama is
+# set up
+download_models "${script_dir}/models/flux.txt" "${script_dir}/models/wan.txt" &
+download_pid=$!
 
 ${script_dir}/setup_ollama.sh
 ${script_dir}/run_ollama.sh
 ${script_dir}/setup_ollama_models.sh
 
+wait ${download_pid}
+
 # ComfyUI may depend on the ollama Python package so run it after setting up Ollama
 ${script_dir}/run_comfyui.sh
 
@@ -20,8 +20,18 @@ if [ ! -d ComfyUI ]; then
 fi
 
 cd ComfyUI
-git pull
-pip install -r requirements.txt
+if [ $setup_update -ne 0 ]; then
+    git pull
+fi
+
+# Packages go into the container, so install them again in a new container too
+requirements_fingerprint=$(step_fingerprint "$(container_id)" "$(command -v pip)" "$(hash_files requirements.txt)")
+if step_is_current comfyui_requirements "$requirements_fingerprint"; then
+    echo "ComfyUI requirements are unchanged, skipping pip install."
+else
+    pip install -r requirements.txt
+    step_done comfyui_requirements "$requirements_fingerprint"
+fi
 
 ########################################################################################
 # ComfyUI-Manager
@@ -33,4 +43,6 @@ if [ ! -d comfyui-manager ]; then
 fi
 
 cd comfyui-manager
-git pull
+if [ $setup_update -ne 0 ]; then
+    git pull
+fi
@@ -14,14 +14,4 @@ script_dir=$( cd -- "$( dirname -- "${BASH_SOURCE[0]}" )" &> /dev/null && pwd )
 # Flux models
 ########################################################################################
 
-cd $script_dir
-
-# flux-dev
-# https://comfyanonymous.github.io/ComfyUI_examples/flux/
-download_hf_model text_encoders/        comfyanonymous/flux_text_encoders       t5xxl_fp16.safetensors
-download_hf_model text_encoders/        comfyanonymous/flux_text_encoders       clip_l.safetensors
-download_hf_model diffusion_models/     black-forest-labs/FLUX.1-dev            flux1-dev.safetensors # 23GB
-download_hf_model vae/                  Comfy-Org/Lumina_Image_2.0_Repackaged   split_files/vae/ae.safetensors
-
-# Flux fill (inpainting) model
-download_hf_model diffusion_models/     black-forest-labs/FLUX.1-Fill-dev       flux1-fill-dev.safetensors
+download_models "${script_dir}/models/flux.txt"
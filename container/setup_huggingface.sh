@@ -16,7 +16,17 @@ script_dir=$( cd -- "$( dirname -- "${BASH_SOURCE[0]}" )" &> /dev/null && pwd )
 
 cd $script_dir
 
-pip install -U "huggingface_hub[cli]"
+hf_fingerprint=$(step_fingerprint "$(container_id)" "$(command -v pip)")
+if step_is_current huggingface_hub "$hf_fingerprint"; then
+    echo "huggingface_hub is already installed, skipping pip install."
+else
+    if [ $setup_update -ne 0 ]; then
+        pip install -U "huggingface_hub[cli]"
+    else
+        pip install "huggingface_hub[cli]"
+    fi
+    step_done huggingface_hub "$hf_fingerprint"
+fi
 
 git config --global credential.helper store
 
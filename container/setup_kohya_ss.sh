@@ -14,9 +14,17 @@ script_dir=$( cd -- "$( dirname -- "${BASH_SOURCE[0]}" )" &> /dev/null && pwd )
 # Kohya's GUI
 ########################################################################################
 
-apt install -y \
-    python3-tk \
+kohya_apt_packages="
+    python3-tk
     python3-venv
+"
+kohya_apt_fingerprint=$(step_fingerprint "$(container_id)" $kohya_apt_packages)
+if step_is_current kohya_ss_apt "$kohya_apt_fingerprint"; then
+    echo "Kohya_ss OS packages are already installed, skipping apt."
+else
+    apt install -y $kohya_apt_packages
+    step_done kohya_ss_apt "$kohya_apt_fingerprint"
+fi
 
 mkdir -p "$kohya_ss_parent"
 cd "$kohya_ss_parent"
@@ -27,6 +35,16 @@ if [ ! -d "$kohya_ss_dir" ]; then
 fi
 
 cd "$kohya_ss_dir"
-git pull
-git submodule update --init --recursive
-./setup-runpod.sh
+if [ $setup_update -ne 0 ]; then
+    git pull
+fi
+
+# Kohya_ss is installed in the container, so the container is part of the fingerprint too
+kohya_fingerprint=$(step_fingerprint "$(container_id)" "$(git rev-parse HEAD)" "$kohya_ss_dir")
+if step_is_current kohya_ss "$kohya_fingerprint"; then
+    echo "Kohya_ss is unchanged at $(git rev-parse --short HEAD), skipping setup-runpod.sh."
+else
+    git submodule update --init --recursive
+    ./setup-runpod.sh
+    step_done kohya_ss "$kohya_fingerprint"
+fi
@@ -26,4 +26,14 @@ fi
 
 ln -sf ${install_root}/ollama/bin/ollama /usr/local/bin/ollama
 
-pip install -U ollama
+ollama_fingerprint=$(step_fingerprint "$(container_id)" "$(command -v pip)")
+if step_is_current ollama_pip "$ollama_fingerprint"; then
+    echo "ollama Python package is already installed, skipping pip install."
+else
+    if [ $setup_update -ne 0 ]; then
+        pip install -U ollama
+    else
+        pip install ollama
+    fi
+    step_done ollama_pip "$ollama_fingerprint"
+fi
@@ -12,9 +12,23 @@ script_dir=$( cd -- "$( dirname -- "${BASH_SOURCE[0]}" )" &> /dev/null && pwd )
 
 ########################################################################################
 
+# Models already on the volume are only pulled again in update mode
+installed_models=$(ollama list | awk 'NR > 1 { print $1 }')
+
+# Pull the models at the same time
+pids=()
 for model in \
     "llama3.2:latest" \
     "gemma3:latest"
 do
-    ollama pull $model
+    if [ $setup_update -eq 0 ] && grep -qxF "$model" <<< "$installed_models"; then
+        echo "Ollama model $model is already pulled, skipping."
+        continue
+    fi
+    ollama pull $model &
+    pids+=($!)
+done
+
+for pid in ${pids[@]+"${pids[@]}"}; do
+    wait $pid
 done
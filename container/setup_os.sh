@@ -12,15 +12,22 @@ script_dir=$( cd -- "$( dirname -- "${BASH_SOURCE[0]}" )" &> /dev/null && pwd )
 
 ########################################################################################
 
-if [ ! -f /root/.apt_update_was_run ]; then
-    apt update
-    touch /root/.apt_update_was_run
-fi
+apt_fingerprint=$(step_fingerprint "$(container_id)" $extra_apt_packages)
+if step_is_current apt "$apt_fingerprint"; then
+    echo "OS packages are already installed, skipping apt."
+else
+    if [ ! -f /root/.apt_update_was_run ] || [ $setup_update -ne 0 ]; then
+        apt update
+        touch /root/.apt_update_was_run
+    fi
+
+    apt install -y $extra_apt_packages
 
-apt install -y $extra_apt_packages
+    if [ $do_apt_upgrade -ne 0 ]; then
+        apt upgrade -y
+    fi
 
-if [ $do_apt_upgrade -ne 0 ]; then
-    apt upgrade -y
+    step_done apt "$apt_fingerprint"
 fi
 
 if [ -d "${install_root}/home" ]; then
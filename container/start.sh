@@ -12,8 +12,8 @@ script_dir=$( cd -- "$( dirname -- "${BASH_SOURCE[0]}" )" &> /dev/null && pwd )
 
 echo "$0 is starting"
 
-echo "Running ${script_dir}/setup.sh ..."
-${script_dir}/setup.sh
+echo "Running ${script_dir}/setup.sh $* ..."
+${script_dir}/setup.sh "$@"
 
 echo "Running /start.sh ..."
 /start.sh
@@ -3,47 +3,302 @@
 # SPDX-FileCopyrightText: Copyright (c) 2025 Richard L. Lynch <rich@richlynch.com>
 # SPDX-License-Identifier: MIT
 
+"""Print the pod's CPU and GPU utilization and memory use as JSON lines for proxy.py.
+
+The first line has every value. After that, each line only has the values that changed, so an
+idle pod prints "{}", and every --keyframe-interval seconds a full line is printed again.
+
+    {"cpu_util":12.5,"cpu_mem_gb":8.41,"gpu_util":97.0,"gpu_mem_gb":20.13,"gpus":[[97.0,20.13]],
+     "training_jobs":0,"comfyui_queue":1,"comfyui_prompt":"5d2c...","ollama_models":[]}
+
+Besides utilization, the lines say whether the apps have work: prompts queued or running in
+ComfyUI, kohya_ss training scripts running, and models loaded in Ollama. comfyui_queue and
+ollama_models are null while the app doesn't answer.
+"""
+
+import os
+import re
 import time
 import json
+import ctypes
+import random
+import argparse
 import subprocess
+import urllib.request
 
 import psutil
 
-def get_gpu_stats():
-    proc = subprocess.run([
-        'nvidia-smi',
-        '--query-gpu=index,utilization.gpu,memory.used',
-        '--format=csv,noheader,nounits'],
-        stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+class NvmlGpus:
+    """
+    Read GPU utilization and memory through NVML, loaded once with the device handles kept open,
+    instead of starting nvidia-smi for every sample.
+    """
+    class Utilization(ctypes.Structure):
+        _fields_ = [('gpu', ctypes.c_uint), ('memory', ctypes.c_uint)]
 
-    if proc.returncode != 0:
-        raise RuntimeError(f"nvidia-smi failed with error: {proc.stderr.decode('utf-8')}")
+    class Memory(ctypes.Structure):
+        _fields_ = [('total', ctypes.c_ulonglong), ('free', ctypes.c_ulonglong), ('used', ctypes.c_ulonglong)]
 
-    total_util = 0
-    total_mem_gb = 0
-    for line in proc.stdout.decode('utf-8', errors='ignore').splitlines():
-        index, util, mem_mb = line.replace(',', ' ').split()
-        total_util += float(util)
-        total_mem_gb += float(mem_mb) / 1024
-    return total_util, total_mem_gb
+    def __init__(self):
+        # Mounted into the container by the NVIDIA runtime along with the driver
+        self.nvml = ctypes.CDLL('libnvidia-ml.so.1')
+        self._check(self.nvml.nvmlInit_v2(), 'nvmlInit')
+        count = ctypes.c_uint()
+        self._check(self.nvml.nvmlDeviceGetCount_v2(ctypes.byref(count)), 'nvmlDeviceGetCount')
+        self.handles = []
+        for index in range(count.value):
+            handle = ctypes.c_void_p()
+            self._check(self.nvml.nvmlDeviceGetHandleByIndex_v2(index, ctypes.byref(handle)),
+                        'nvmlDeviceGetHandleByIndex')
+            self.handles.append(handle)
 
-def main():
-    while True:
-        cpu_util = sum([proc.info['cpu_percent'] for proc in psutil.process_iter(['cpu_percent'])])
+    def _check(self, result, function):
+        if result != 0:
+            self.nvml.nvmlErrorString.restype = ctypes.c_char_p
+            raise RuntimeError(f"{function} failed: {self.nvml.nvmlErrorString(result).decode('utf-8')}")
+
+    def sample(self):
+        """
+        Returns:
+            list: (utilization percent, memory used in GB) per GPU
+        """
+        gpus = []
+        utilization = self.Utilization()
+        memory = self.Memory()
+        for handle in self.handles:
+            self._check(self.nvml.nvmlDeviceGetUtilizationRates(handle, ctypes.byref(utilization)),
+                        'nvmlDeviceGetUtilizationRates')
+            self._check(self.nvml.nvmlDeviceGetMemoryInfo(handle, ctypes.byref(memory)), 'nvmlDeviceGetMemoryInfo')
+            gpus.append((float(utilization.gpu), memory.used / 2 ** 30))
+        return gpus
+
+class NvidiaSmiGpus:
+    """
+    Read GPU utilization and memory by running nvidia-smi, for drivers without a usable NVML.
+    """
+    def sample(self):
+        proc = subprocess.run([
+            'nvidia-smi',
+            '--query-gpu=index,utilization.gpu,memory.used',
+            '--format=csv,noheader,nounits'],
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+        if proc.returncode != 0:
+            raise RuntimeError(f"nvidia-smi failed with error: {proc.stderr.decode('utf-8')}")
+
+        gpus = []
+        for line in proc.stdout.decode('utf-8', errors='ignore').splitlines():
+            _, util, mem_mb = line.replace(',', ' ').split()
+            gpus.append((float(util), float(mem_mb) / 1024))
+        return gpus
+
+class FakeGpus:
+    """
+    Made up GPU readings that wander between idle and busy, for running without a GPU.
+    """
+    def __init__(self, count=1, mem_gb=24, seed=None):
+        self.random = random.Random(seed)
+        self.mem_gb = mem_gb
+        self.utils = [0.0] * count
+
+    def sample(self):
+        self.utils = [min(max(util + self.random.uniform(-20, 20), 0), 100) for util in self.utils]
+        return [(round(util), self.mem_gb * util / 100) for util in self.utils]
+
+class NoGpus:
+    """No GPUs to report."""
+    def sample(self):
+        return []
+
+def create_gpu_backend(name, fake_gpus=1):
+    """
+    Create the GPU reader named on the command line. 'auto' uses NVML, falling back to nvidia-smi
+    and then to reporting no GPUs.
+    """
+    if name == 'nvml':
+        return NvmlGpus()
+    if name == 'nvidia-smi':
+        return NvidiaSmiGpus()
+    if name == 'fake':
+        return FakeGpus(fake_gpus)
+    if name == 'none':
+        return NoGpus()
+
+    try:
+        return NvmlGpus()
+    except (OSError, RuntimeError):
+        pass
+    try:
+        backend = NvidiaSmiGpus()
+        backend.sample()
+        return backend
+    except (OSError, RuntimeError):
+        return NoGpus()
+
+# kohya_ss (sd-scripts) training scripts, e.g. train_network.py or sdxl_train.py
+TRAINING_SCRIPT_PATTERN = re.compile(r'^(sdxl_|sd3_|flux_)?(train\w*|fine_tune)\.py$')
+
+def is_training_job(cmdline):
+    """
+    Check if a process is Python running a training script. Only the script's own process
+    matches, not the accelerate launcher that started it.
+    """
+    return len(cmdline) > 1 and bool(TRAINING_SCRIPT_PATTERN.match(os.path.basename(cmdline[1])))
+
+class CpuSampler:
+    """
+    Add up the CPU time and memory of every process, and count training jobs, in a single pass
+    over the process table.
+
+    CPU utilization is the CPU time used since the previous sample, so processes that started in
+    between count from their start rather than reading 0 like a first cpu_percent() call does.
+    100% is one core, matching the sum of per-process percentages shown by top.
+    """
+    def __init__(self):
+        self.cpu_times = {}
+        self.training = {}
+        self.last_sample = time.time()
+
+    def sample(self):
+        """
+        Returns:
+            tuple: CPU utilization percent, memory used in GB and number of training jobs
+        """
+        now = time.time()
+        cpu_times = {}
+        training = {}
+        used = 0
+        rss = 0
+        for proc in psutil.process_iter(['cpu_times', 'memory_info', 'create_time']):
+            info = proc.info
+            if info['cpu_times'] is None or info['memory_info'] is None:
+                continue
+            rss += info['memory_info'].rss
+            key = (proc.pid, info['create_time'])
+            total = info['cpu_times'].user + info['cpu_times'].system
+            cpu_times[key] = total
+            if key in self.cpu_times:
+                used += total - self.cpu_times[key]
+            elif info['create_time'] and info['create_time'] >= self.last_sample:
+                used += total
+
+            # A process's command line doesn't change, so only read it the first time it's seen
+            if key in self.training:
+                training[key] = self.training[key]
+            else:
+                try:
+                    training[key] = is_training_job(proc.cmdline())
+                except psutil.Error:
+                    training[key] = False
+
+        elapsed = now - self.last_sample
+        self.cpu_times = cpu_times
+        self.training = training
+        self.last_sample = now
         # 10 ** 9 matches up with Runpod's web interface better than 2 ** 30
-        cpu_mem_gb = sum([proc.info['memory_info'].rss for proc in psutil.process_iter(['memory_info'])]) / (10 ** 9)
+        return (used / elapsed * 100 if elapsed > 0 else 0.0), rss / (10 ** 9), sum(training.values())
+
+def get_json(url, timeout):
+    """
+    Fetch JSON from a local app, or None if it isn't answering.
+    """
+    try:
+        with urllib.request.urlopen(url, timeout=timeout) as response:
+            return json.load(response)
+    except (OSError, ValueError):
+        return None
+
+class AppProbe:
+    """
+    Ask ComfyUI and Ollama whether they have work, at most every interval seconds as these are
+    HTTP requests rather than reads from /proc.
 
-        gpu_util, gpu_mem_gb = get_gpu_stats()
+    Args:
+        comfyui_url: Base URL of ComfyUI, or '' to not check it
+        ollama_url: Base URL of Ollama, or '' to not check it
+        interval: Seconds between checks
+    """
+    def __init__(self, comfyui_url, ollama_url, interval):
+        self.comfyui_url = comfyui_url.rstrip('/')
+        self.ollama_url = ollama_url.rstrip('/')
+        self.interval = interval
+        self.next_check = 0
+        self.status = {'comfyui_queue': None, 'comfyui_prompt': None, 'ollama_models': None}
 
-        data = {
-            'cpu_util': cpu_util,
-            'cpu_mem_gb': cpu_mem_gb,
-            'gpu_util': gpu_util,
-            'gpu_mem_gb': gpu_mem_gb,
-        }
-        print(json.dumps(data), flush=True)
+    def sample(self):
+        """
+        Returns:
+            dict: Number of prompts queued or running in ComfyUI and the running prompt's ID, and
+                  the names of the models loaded in Ollama
+        """
+        if time.monotonic() < self.next_check:
+            return self.status
+        self.next_check = time.monotonic() + self.interval
+
+        queue = get_json(f'{self.comfyui_url}/queue', timeout=1) if self.comfyui_url else None
+        if queue is not None:
+            running = queue.get('queue_running', [])
+            self.status['comfyui_queue'] = len(running) + len(queue.get('queue_pending', []))
+            # Each entry is [number, prompt_id, prompt, extra_data, outputs_to_execute]
+            self.status['comfyui_prompt'] = running[0][1] if running else None
+        else:
+            self.status['comfyui_queue'] = self.status['comfyui_prompt'] = None
+
+        loaded = get_json(f'{self.ollama_url}/api/ps', timeout=1) if self.ollama_url else None
+        self.status['ollama_models'] = [model['name'] for model in loaded.get('models', [])] if loaded is not None else None
+        return self.status
+
+def collect(cpu, gpus, apps):
+    """
+    Take one sample of everything, rounded so tiny changes don't count as changes.
+    """
+    cpu_util, cpu_mem_gb, training_jobs = cpu.sample()
+    per_gpu = [[round(util, 1), round(mem_gb, 2)] for util, mem_gb in gpus.sample()]
+    return {
+        'cpu_util': round(cpu_util, 1),
+        'cpu_mem_gb': round(cpu_mem_gb, 2),
+        'gpu_util': round(sum(util for util, _ in per_gpu), 1),
+        'gpu_mem_gb': round(sum(mem_gb for _, mem_gb in per_gpu), 2),
+        'gpus': per_gpu,
+        'training_jobs': training_jobs,
+        **apps.sample(),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Print CPU/GPU utilization and memory use as JSON lines')
+    parser.add_argument('--interval', type=float, default=1, help='Seconds between samples, e.g. 0.25')
+    parser.add_argument('--keyframe-interval', type=float, default=60,
+                        help='Seconds between lines with every value, not just the changed ones')
+    parser.add_argument('--gpu-backend', choices=('auto', 'nvml', 'nvidia-smi', 'fake', 'none'), default='auto',
+                        help='How to read GPU statistics')
+    parser.add_argument('--fake-gpus', type=int, default=1, help='Number of GPUs for --gpu-backend fake')
+    parser.add_argument('--comfyui-url', default='http://127.0.0.1:9020', help="ComfyUI to check the queue of, or ''")
+    parser.add_argument('--ollama-url', default='http://127.0.0.1:11434', help="Ollama to check for loaded models, or ''")
+    parser.add_argument('--app-interval', type=float, default=5, help='Seconds between checks of the apps')
+    args = parser.parse_args()
+
+    cpu = CpuSampler()
+    # Record where every process's CPU time starts from, so the first line is a real reading
+    cpu.sample()
+    gpus = create_gpu_backend(args.gpu_backend, args.fake_gpus)
+    apps = AppProbe(args.comfyui_url, args.ollama_url, args.app_interval)
+    last = {}
+    last_keyframe = 0
+    next_sample = time.monotonic() + args.interval
+
+    while True:
+        # Sleep until the next sample is due, so the interval doesn't drift by the sampling time
+        time.sleep(max(next_sample - time.monotonic(), 0))
+        next_sample = max(next_sample + args.interval, time.monotonic())
 
-        time.sleep(5)
+        data = collect(cpu, gpus, apps)
+        if time.monotonic() - last_keyframe >= args.keyframe_interval:
+            changed = data
+            last_keyframe = time.monotonic()
+        else:
+            changed = {key: value for key, value in data.items() if last.get(key) != value}
+        last = data
+        print(json.dumps(changed, separators=(',', ':')), flush=True)
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+
+# SPDX-FileCopyrightText: Copyright (c) 2025 Richard L. Lynch <rich@richlynch.com>
+# SPDX-License-Identifier: MIT
+
+"""Print the files under directories on the pod, and then the changes to them, as JSON lines for
+the sync engine in proxy.py.
+
+The first line lists every file. With --watch, each later line lists the files that were written,
+or null for the ones that were deleted, so the proxy only has to fetch what changed:
+
+    {"full":true,"files":{"ComfyUI/output/ComfyUI_00001_.png":[1543210,1718000000.5,"9f86d0..."]}}
+    {"files":{"ComfyUI/output/ComfyUI_00002_.png":[1544100,1718000060.2,"2c26b4..."]}}
+
+Each file has its size, modification time and SHA-256. The hashes are kept in an index on the
+volume, so a file is only hashed again when its size or modification time changes. Changes come
+from inotify, or from rescanning every --interval seconds where inotify isn't available.
+"""
+
+import os
+import sys
+import json
+import time
+import errno
+import ctypes
+import select
+import struct
+import hashlib
+import argparse
+
+# inotify event masks, from <sys/inotify.h>
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF
+
+EVENT_HEADER = struct.Struct('iIII')
+
+def hash_file(path, chunk_size=1 << 20):
+    """
+    Get the SHA-256 of a file's contents as a hex string.
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        while chunk := file.read(chunk_size):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class FileIndex:
+    """
+    Size, modification time and hash of every file under the synced directories, saved on the
+    volume so hashes survive restarts.
+
+    Args:
+        root: Directory the paths are relative to
+        dirs: Directories under root to index
+        path: File to keep the index in
+    """
+    def __init__(self, root, dirs, path):
+        self.root = root
+        self.dirs = [directory.strip('/') for directory in dirs]
+        self.path = path
+        try:
+            with open(path, encoding='utf-8') as index_file:
+                self.files = json.load(index_file)
+        except (OSError, ValueError):
+            self.files = {}
+
+    def save(self):
+        tmp_path = f'{self.path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as index_file:
+            json.dump(self.files, index_file, separators=(',', ':'))
+        os.replace(tmp_path, self.path)
+
+    def update(self, rel_path):
+        """
+        Bring one file up to date, hashing it only if it changed.
+
+        Returns:
+            list or None: The file's new entry, or None if it no longer exists
+        """
+        try:
+            stat = os.stat(os.path.join(self.root, rel_path))
+        except OSError:
+            self.files.pop(rel_path, None)
+            return None
+        entry = self.files.get(rel_path)
+        if entry and entry[0] == stat.st_size and entry[1] == stat.st_mtime:
+            return entry
+        try:
+            entry = [stat.st_size, stat.st_mtime, hash_file(os.path.join(self.root, rel_path))]
+        except OSError:
+            self.files.pop(rel_path, None)
+            return None
+        self.files[rel_path] = entry
+        return entry
+
+    def scan(self):
+        """
+        Walk the directories and bring the whole index up to date.
+
+        Returns:
+            dict: Entries that changed, with None for files that were deleted
+        """
+        found = set()
+        changes = {}
+        for directory in self.dirs:
+            for dir_path, _, file_names in os.walk(os.path.join(self.root, directory)):
+                for file_name in file_names:
+                    rel_path = os.path.relpath(os.path.join(dir_path, file_name), self.root)
+                    found.add(rel_path)
+                    old_entry = self.files.get(rel_path)
+                    entry = self.update(rel_path)
+                    if entry != old_entry:
+                        changes[rel_path] = entry
+        for rel_path in self.files.keys() - found:
+            if any(rel_path.startswith(f'{directory}/') for directory in self.dirs):
+                del self.files[rel_path]
+                changes[rel_path] = None
+        return changes
+
+class Inotify:
+    """
+    Recursive inotify watch on a set of directories, through libc with ctypes so nothing needs
+    installing on the pod.
+    """
+    def __init__(self):
+        self.libc = ctypes.CDLL(None, use_errno=True)
+        self.fd = self.libc.inotify_init1(os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+        self.dirs = {}
+
+    def add_tree(self, path):
+        """
+        Watch a directory and every directory under it.
+        """
+        for dir_path, _, _ in os.walk(path):
+            wd = self.libc.inotify_add_watch(self.fd, os.fsencode(dir_path), WATCH_MASK)
+            if wd >= 0:
+                self.dirs[wd] = dir_path
+            elif ctypes.get_errno() != errno.ENOENT:
+                # Most likely out of watches (fs.inotify.max_user_watches)
+                raise OSError(ctypes.get_errno(), f'inotify_add_watch failed for {dir_path}')
+
+    def readable(self):
+        """
+        Check if there are events to read without waiting.
+        """
+        readable, _, _ = select.select([self.fd], [], [], 0)
+        return bool(readable)
+
+    def read(self):
+        """
+        Wait for events.
+
+        Returns:
+            list: (path, mask) of each event, or None if events were lost and a rescan is needed
+        """
+        data = os.read(self.fd, 65536)
+        events = []
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, name_len = EVENT_HEADER.unpack_from(data, offset)
+            name = data[offset + EVENT_HEADER.size:offset + EVENT_HEADER.size + name_len].rstrip(b'\0')
+            offset += EVENT_HEADER.size + name_len
+            if mask & IN_Q_OVERFLOW:
+                return None
+            if mask & IN_IGNORED:
+                self.dirs.pop(wd, None)
+                continue
+            if wd in self.dirs:
+                events.append((os.path.join(self.dirs[wd], os.fsdecode(name)), mask))
+        return events
+
+def watch_changes(index, args):
+    """
+    Print the changes to the index as they happen, using inotify.
+    """
+    inotify = Inotify()
+    for directory in index.dirs:
+        os.makedirs(os.path.join(index.root, directory), exist_ok=True)
+        inotify.add_tree(os.path.join(index.root, directory))
+
+    # Catch anything written between the first scan and the watches being added
+    emit(index.scan())
+
+    while True:
+        events = inotify.read()
+        # Let a burst of events, e.g. a batch of outputs, settle into one line
+        time.sleep(args.settle)
+        while events is not None and inotify.readable():
+            more = inotify.read()
+            events = events + more if more is not None else None
+
+        if events is None:
+            emit(index.scan())
+            continue
+
+        paths = set()
+        for path, mask in events:
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    inotify.add_tree(path)
+                    paths.update(os.path.join(dir_path, file_name) for dir_path, _, file_names in os.walk(path)
+                                 for file_name in file_names)
+                elif mask & (IN_DELETE | IN_MOVED_FROM):
+                    prefix = os.path.relpath(path, index.root) + '/'
+                    paths.update(os.path.join(index.root, rel_path) for rel_path in index.files
+                                 if rel_path.startswith(prefix))
+            elif mask & (IN_CLOSE_WRITE | IN_MOVED_TO | IN_DELETE | IN_MOVED_FROM):
+                # Files being written are picked up when they are closed, not when created
+                paths.add(path)
+
+        changes = {}
+        for path in paths:
+            rel_path = os.path.relpath(path, index.root)
+            old_entry = index.files.get(rel_path)
+            entry = index.update(rel_path)
+            if entry != old_entry:
+                changes[rel_path] = entry
+        emit(changes)
+        if changes:
+            index.save()
+
+def rescan_changes(index, args):
+    """
+    Print the changes to the index by rescanning every interval seconds.
+    """
+    while True:
+        time.sleep(args.interval)
+        changes = index.scan()
+        emit(changes)
+        if changes:
+            index.save()
+
+def emit(changes, full=False):
+    """
+    Print one line of changes. Empty lines are printed too, so the proxy knows the feed is alive.
+    """
+    line = {'full': True, 'files': changes} if full else {'files': changes}
+    print(json.dumps(line, separators=(',', ':')), flush=True)
+
+def main():
+    parser = argparse.ArgumentParser(description='Print the files under directories, and changes to them, as JSON lines')
+    parser.add_argument('dirs', nargs='+', help='Directories to index, relative to --root')
+    parser.add_argument('--root', default='/workspace', help='Directory the paths are relative to')
+    parser.add_argument('--index', default='/workspace/.sync_index.json', help='File to keep hashes in')
+    parser.add_argument('--watch', action='store_true', help='Keep printing changes after the first line')
+    parser.add_argument('--interval', type=float, default=10,
+                        help='Seconds between rescans when inotify is not available')
+    parser.add_argument('--settle', type=float, default=1,
+                        help='Seconds to collect inotify events before printing them')
+    args = parser.parse_args()
+
+    index = FileIndex(args.root, args.dirs, args.index)
+    index.scan()
+    index.save()
+    emit(index.files, full=True)
+    if not args.watch:
+        return
+
+    try:
+        watch_changes(index, args)
+    except OSError as ex:
+        print(f'inotify not available, rescanning every {args.interval} seconds: {ex}', file=sys.stderr, flush=True)
+        rescan_changes(index, args)
+
+if __name__ == '__main__':
+    main()
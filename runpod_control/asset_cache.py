@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+
+# SPDX-FileCopyrightText: Copyright (c) 2025 Richard L. Lynch <rich@richlynch.com>
+# SPDX-License-Identifier: MIT
+
+"""Disk-backed LRU cache of static web UI assets served through the proxy."""
+
+import os
+import re
+import json
+import hashlib
+import logging
+import contextlib
+from time import time
+from pathlib import Path
+from collections import OrderedDict
+
+from aiohttp import web
+
+logger = logging.getLogger(__name__)
+
+# Response headers kept with a cached asset and replayed when it is served
+KEEP_HEADERS = ('Content-Type', 'Cache-Control', 'ETag', 'Last-Modified')
+
+class AssetCacheWriter:
+    """
+    Write a response body to the cache as it is streamed to the client. Nothing is visible in the
+    cache until commit() is called.
+    """
+    def __init__(self, cache, key, headers, max_bytes):
+        self.cache = cache
+        self.key = key
+        self.headers = headers
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.tmp_path = cache.body_path(key).with_suffix('.tmp')
+        self.file = open(self.tmp_path, 'wb')
+        cache._writing.add(key)
+
+    def write(self, chunk):
+        """Append a chunk of the body, abandoning the entry if it grows too large."""
+        if self.file is None:
+            return
+        self.size += len(chunk)
+        if self.size > self.max_bytes:
+            self.abort()
+            return
+        self.file.write(chunk)
+
+    def commit(self):
+        """Make the fully written body available in the cache."""
+        if self.file is None:
+            return
+        self.file.close()
+        self.file = None
+        self.cache._writing.discard(self.key)
+        self.cache.store(self.key, self.tmp_path, self.size, self.headers)
+
+    def abort(self):
+        """Discard a partially written body."""
+        if self.file is None:
+            return
+        try:
+            self.file.close()
+        except OSError:
+            # Flushing the rest failed, e.g. because the disk is full - it is deleted anyway
+            pass
+        self.file = None
+        self.cache._writing.discard(self.key)
+        self.tmp_path.unlink(missing_ok=True)
+
+class AssetCache:
+    """
+    Cache GET responses for static assets (scripts, stylesheets, fonts, images) on disk, keyed by
+    path and query string, so UI loads don't pull them through the SSH tunnel each time and still
+    work while the pod is down.
+
+    Args:
+        cache_dir: Directory holding the cached bodies and their metadata
+        max_bytes: Total size of cached bodies before the least recently used are evicted
+        max_entry_bytes: Largest single response to cache
+        default_max_age: Seconds a response without a Cache-Control max-age is used before it is
+                         revalidated with the backend
+        extensions: File extensions of cacheable paths
+    """
+    def __init__(self, cache_dir, max_bytes, max_entry_bytes, default_max_age, extensions):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self.default_max_age = default_max_age
+        self.extensions = tuple(extensions)
+        self.entries = OrderedDict()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        self._writing = set()
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._load()
+
+    def _load(self):
+        # Rebuild the index, least recently used first, from the metadata files on disk
+        meta_paths = sorted(self.cache_dir.glob('*.json'), key=lambda path: path.stat().st_mtime)
+        for meta_path in meta_paths:
+            try:
+                with open(meta_path) as meta_file:
+                    entry = json.load(meta_file)
+                if not self.body_path(entry['key']).exists():
+                    raise FileNotFoundError(self.body_path(entry['key']))
+            except (OSError, ValueError, KeyError) as ex:
+                logger.debug(f"Dropping unreadable asset cache entry {meta_path}: {ex}")
+                meta_path.unlink(missing_ok=True)
+                continue
+            self.entries[entry['key']] = entry
+            self.total_bytes += entry['size']
+        for tmp_path in self.cache_dir.glob('*.tmp'):
+            tmp_path.unlink(missing_ok=True)
+        logger.debug(f"Loaded {len(self.entries)} cached assets ({self.total_bytes/1e6:.1f}MB) from {self.cache_dir}")
+
+    def _file_stem(self, key):
+        return hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+    def body_path(self, key):
+        """Path of the file holding the cached body for a key."""
+        return self.cache_dir / f'{self._file_stem(key)}.body'
+
+    def meta_path(self, key):
+        """Path of the file holding the metadata for a key."""
+        return self.cache_dir / f'{self._file_stem(key)}.json'
+
+    def is_cacheable(self, request):
+        """
+        Check if a request is for a static asset that may be served from the cache.
+        """
+        if request.method != 'GET' or 'Range' in request.headers or 'Authorization' in request.headers:
+            return False
+        return request.path.lower().endswith(self.extensions)
+
+    def lookup(self, key):
+        """
+        Get the cache entry for a key, or None. Marks the entry as recently used.
+        """
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        with contextlib.suppress(OSError):
+            os.utime(self.meta_path(key))
+        return entry
+
+    def is_fresh(self, entry):
+        """Check if an entry can be served without revalidating it with the backend."""
+        return time() < entry['fresh_until']
+
+    def response(self, entry):
+        """
+        Build a response serving a cached entry. Conditional and range requests from the client are
+        answered from the file.
+        """
+        self.hits += 1
+        headers = {k: v for k, v in entry['headers'].items() if k in ('Content-Type', 'Cache-Control')}
+        headers['X-Proxy-Cache'] = 'HIT'
+        return web.FileResponse(self.body_path(entry['key']), headers=headers)
+
+    def revalidation_headers(self, entry):
+        """Headers asking the backend to only send the asset if it changed."""
+        headers = {}
+        if 'ETag' in entry['headers']:
+            headers['If-None-Match'] = entry['headers']['ETag']
+        if 'Last-Modified' in entry['headers']:
+            headers['If-Modified-Since'] = entry['headers']['Last-Modified']
+        return headers
+
+    def refresh(self, entry, backend_headers):
+        """Extend the freshness of an entry after the backend confirmed it is unchanged."""
+        self.revalidations += 1
+        entry['fresh_until'] = time() + self._max_age(backend_headers.get('Cache-Control', entry['headers'].get('Cache-Control', '')))
+        self._write_meta(entry)
+
+    def open_writer(self, key, backend_response):
+        """
+        Start caching a backend response, or return None if it can't be cached.
+        """
+        if backend_response.status != 200:
+            return None
+        cache_control = backend_response.headers.get('Cache-Control', '').lower()
+        if 'no-store' in cache_control or 'private' in cache_control:
+            return None
+        if backend_response.content_length is not None and backend_response.content_length > self.max_entry_bytes:
+            return None
+        if key in self._writing:
+            # Another request is already caching this asset
+            return None
+
+        headers = {k: backend_response.headers[k] for k in KEEP_HEADERS if k in backend_response.headers}
+        return AssetCacheWriter(self, key, headers, self.max_entry_bytes)
+
+    def store(self, key, tmp_path, size, headers):
+        """Add a fully written body to the cache and evict old entries to stay within the size limit."""
+        old_entry = self.entries.pop(key, None)
+        if old_entry:
+            self.total_bytes -= old_entry['size']
+
+        tmp_path.replace(self.body_path(key))
+        entry = {
+            'key': key,
+            'size': size,
+            'headers': headers,
+            'stored': time(),
+            'fresh_until': time() + self._max_age(headers.get('Cache-Control', '')),
+        }
+        self._write_meta(entry)
+        self.entries[key] = entry
+        self.total_bytes += size
+        logger.debug(f"Cached asset {key} ({size} bytes)")
+
+        while self.total_bytes > self.max_bytes and self.entries:
+            _, evicted = self.entries.popitem(last=False)
+            self.total_bytes -= evicted['size']
+            self.body_path(evicted['key']).unlink(missing_ok=True)
+            self.meta_path(evicted['key']).unlink(missing_ok=True)
+            logger.debug(f"Evicted cached asset {evicted['key']}")
+
+    def _write_meta(self, entry):
+        with open(self.meta_path(entry['key']), 'w') as meta_file:
+            json.dump(entry, meta_file)
+
+    def _max_age(self, cache_control):
+        cache_control = cache_control.lower()
+        if 'no-cache' in cache_control:
+            return 0
+        match = re.search(r'max-age=(\d+)', cache_control)
+        if match:
+            return int(match.group(1))
+        return self.default_max_age
@@ -0,0 +1,490 @@
+#!/usr/bin/env python3
+
+# SPDX-FileCopyrightText: Copyright (c) 2025 Richard L. Lynch <rich@richlynch.com>
+# SPDX-License-Identifier: MIT
+
+"""Measure proxy throughput and latency against a local stand-in for ComfyUI, fully offline.
+
+The proxy apps are built with create_app() and run in a child process so its memory use can be
+reported on its own. The fake backend listens directly on the port the SSH tunnel would normally
+forward, and the RunPod API is never called: the pod and SSH connection are simply marked as up,
+or as down for the cold start scenario.
+"""
+
+import sys
+import json
+import copy
+import socket
+import asyncio
+import logging
+import argparse
+import resource
+import tempfile
+import multiprocessing
+from time import perf_counter
+from pathlib import Path
+
+import aiohttp
+from aiohttp import web
+
+from coldstart import percentile
+from config import get_config_without_secrets
+
+logger = logging.getLogger(__name__)
+
+# Body sizes exercised by the HTTP scenarios
+BODY_SIZES = (1024, 64 * 1024, 1024 * 1024, 16 * 1024 * 1024)
+
+# Size of the fake sampler preview frames sent to WebSocket clients
+PREVIEW_FRAME_SIZE = 64 * 1024
+
+def free_port():
+    """Get a free TCP port on the loopback interface."""
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def format_size(size):
+    """Format a body size as e.g. 64KB."""
+    for unit, scale in (('MB', 1024 * 1024), ('KB', 1024)):
+        if size >= scale:
+            return f'{size // scale}{unit}'
+    return f'{size}B'
+
+def memory_usage_mb():
+    """
+    Get the current and peak resident set size of this process in MB.
+    """
+    current = None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    try:
+        with open('/proc/self/status') as status_file:
+            for line in status_file:
+                if line.startswith('VmRSS:'):
+                    current = int(line.split()[1]) / 1024
+                elif line.startswith('VmHWM:'):
+                    peak = int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return current, peak
+
+def benchmark_config(proxy_port, status_port, backend_port, work_dir):
+    """
+    Build a configuration with a single ComfyUI proxy on the given ports, keeping all caches and
+    history in a temporary directory.
+    """
+    config = copy.deepcopy(get_config_without_secrets())
+    comfyui_cfg = config['web']['proxies']['ComfyUI']
+    comfyui_cfg.update(local_bind_address='127.0.0.1', local_port=proxy_port, remote_port=backend_port,
+                       output_cache=str(work_dir / 'output'))
+    status_cfg = config['web']['proxies']['Status']
+    status_cfg.update(local_bind_address='127.0.0.1', local_port=status_port)
+    config['web']['proxies'] = {'Status': status_cfg, 'ComfyUI': comfyui_cfg}
+
+    config['web']['asset_cache']['path'] = str(work_dir / 'assets')
+    config['web']['output_cache']['path'] = str(work_dir / 'outputs')
+    config['web']['cold_start_history']['path'] = str(work_dir / 'cold_start_history.json')
+    config['web']['prewarm']['path'] = str(work_dir / 'usage_history.json')
+    config['web']['readiness'].update(initial_delay=0.05, max_delay=0.2)
+    config['sync']['enabled'] = False
+    return config
+
+def run_proxy(config, control_port):
+    """
+    Run the proxies in this process, with a control server the benchmark uses to take the backend
+    down and up and to read memory usage.
+    """
+    # Imported here so only the child process pays for it
+    import proxy  # pylint: disable=import-outside-toplevel
+
+    logging.basicConfig(level=logging.WARNING, format='%(levelname)-7s | %(message)s', force=True)
+
+    async def serve():
+        global_state = proxy.create_global_state(config, None, [])
+        global_state.pod.pod_running = True
+        global_state.ssh.ssh_running = True
+        for proxy_state in global_state.proxies:
+            proxy_state.need_pod = True
+
+        for proxy_state in global_state.proxies:
+            await proxy.start_site(proxy_state.name, config['web']['proxies'][proxy_state.name],
+                                   global_state, proxy_state, config)
+
+        async def handle_memory(request):
+            current, peak = memory_usage_mb()
+            return web.json_response({'rss_mb': current, 'peak_rss_mb': peak})
+
+        async def handle_backend_down(request):
+            global_state.ssh.ssh_running = False
+            for proxy_state in global_state.proxies:
+                proxy_state.backend_ready = False
+            return web.json_response({'status': 'success'})
+
+        async def handle_backend_up(request):
+            global_state.ssh.ssh_running = True
+            return web.json_response({'status': 'success'})
+
+        async def handle_state(request):
+            return web.json_response({proxy_state.name: proxy_state.backend_ready
+                                      for proxy_state in global_state.proxies if proxy_state.remote_port})
+
+        control = web.Application()
+        control.router.add_get('/memory', handle_memory)
+        control.router.add_get('/state', handle_state)
+        control.router.add_post('/backend/down', handle_backend_down)
+        control.router.add_post('/backend/up', handle_backend_up)
+        runner = web.AppRunner(control, access_log=None)
+        await runner.setup()
+        await web.TCPSite(runner, '127.0.0.1', control_port).start()
+        await asyncio.Event().wait()
+
+    asyncio.run(serve())
+
+class FakeComfyUI:
+    """
+    Local stand-in for the ComfyUI server with endpoints for each benchmark scenario.
+    """
+    def __init__(self):
+        self.bodies = {size: b'x' * size for size in BODY_SIZES}
+        self.prompt_order = []
+        self.ws_messages = 64
+
+    def create_app(self):
+        """Build the aiohttp app serving the fake endpoints."""
+        app = web.Application(client_max_size=max(BODY_SIZES) * 2)
+        app.router.add_get('/', self.handle_index)
+        app.router.add_get('/bench/bytes/{size}', self.handle_bytes)
+        app.router.add_post('/bench/upload', self.handle_upload)
+        app.router.add_get('/bench/app.js', self.handle_asset)
+        app.router.add_post('/prompt', self.handle_prompt)
+        app.router.add_get('/ws', self.handle_websocket)
+        return app
+
+    async def handle_index(self, request):
+        return web.Response(text='ComfyUI')
+
+    async def handle_bytes(self, request):
+        return web.Response(body=self.bodies[int(request.match_info['size'])],
+                            content_type='application/octet-stream')
+
+    async def handle_upload(self, request):
+        size = 0
+        async for chunk in request.content.iter_chunked(65536):
+            size += len(chunk)
+        return web.json_response({'size': size})
+
+    async def handle_asset(self, request):
+        return web.Response(text='console.log("benchmark");', content_type='application/javascript',
+                            headers={'Cache-Control': 'max-age=3600'})
+
+    async def handle_prompt(self, request):
+        body = await request.json()
+        self.prompt_order.append(body['number'])
+        return web.json_response({'prompt_id': str(body['number'])})
+
+    async def handle_websocket(self, request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        preview = (1).to_bytes(4, 'big') + (2).to_bytes(4, 'big') + bytes(PREVIEW_FRAME_SIZE)
+        for step in range(self.ws_messages):
+            await ws.send_str(json.dumps({'type': 'progress', 'data': {'value': step, 'sent': perf_counter()}}))
+            await ws.send_bytes(preview)
+        await ws.send_str(json.dumps({'type': 'done'}))
+        async for _ in ws:
+            pass
+        return ws
+
+def summarize(name, latencies, elapsed, total_bytes=0, **extra):
+    """
+    Summarize the latencies of one scenario.
+
+    Returns:
+        dict: Counts, rates and latency percentiles in milliseconds
+    """
+    result = {
+        'scenario': name,
+        'count': len(latencies),
+        'per_second': len(latencies) / elapsed if elapsed else None,
+        'p50_ms': percentile(latencies, 50) * 1000 if latencies else None,
+        'p99_ms': percentile(latencies, 99) * 1000 if latencies else None,
+        'mb_per_second': total_bytes / elapsed / 1e6 if elapsed else None,
+    }
+    result.update(extra)
+    return result
+
+async def run_concurrently(count, concurrency, make_request):
+    """
+    Call make_request count times with at most concurrency calls in flight.
+
+    Returns:
+        tuple: Latency of each call in seconds, and the total elapsed seconds
+    """
+    latencies = []
+    next_index = iter(range(count))
+
+    async def worker():
+        for index in next_index:
+            start_time = perf_counter()
+            await make_request(index)
+            latencies.append(perf_counter() - start_time)
+
+    start_time = perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, perf_counter() - start_time
+
+async def bench_http_get(session, base_url, size, count, concurrency):
+    """Download bodies of one size through the proxy."""
+    async def make_request(_):
+        async with session.get(f'{base_url}/bench/bytes/{size}') as response:
+            body = await response.read()
+            assert response.status == 200 and len(body) == size, f'{response.status} {len(body)}'
+
+    latencies, elapsed = await run_concurrently(count, concurrency, make_request)
+    return summarize(f'GET {format_size(size)}', latencies, elapsed, size * count)
+
+async def bench_http_post(session, base_url, size, count, concurrency):
+    """Upload bodies of one size through the proxy."""
+    body = b'y' * size
+
+    async def make_request(_):
+        async with session.post(f'{base_url}/bench/upload', data=body) as response:
+            result = await response.json()
+            assert result['size'] == size, result
+
+    latencies, elapsed = await run_concurrently(count, concurrency, make_request)
+    return summarize(f'POST {format_size(size)}', latencies, elapsed, size * count)
+
+async def bench_asset_cache(session, base_url, count, concurrency):
+    """Fetch a static asset, served from the proxy's asset cache after the first request."""
+    async def make_request(_):
+        async with session.get(f'{base_url}/bench/app.js') as response:
+            await response.read()
+            assert response.status == 200, response.status
+
+    await make_request(None)
+    latencies, elapsed = await run_concurrently(count, concurrency, make_request)
+    return summarize('GET cached asset', latencies, elapsed)
+
+async def bench_websocket(session, base_url, streams, backend):
+    """
+    Open concurrent WebSocket streams of progress messages and preview frames, measuring how long
+    progress messages take to arrive.
+    """
+    latencies = []
+    delivered = [0]
+
+    async def stream():
+        async with session.ws_connect(f'{base_url}/ws', max_msg_size=0) as ws:
+            async for msg in ws:
+                if msg.type == aiohttp.WSMsgType.TEXT:
+                    message = json.loads(msg.data)
+                    if message['type'] == 'done':
+                        break
+                    latencies.append(perf_counter() - message['data']['sent'])
+                delivered[0] += 1
+
+    start_time = perf_counter()
+    await asyncio.gather(*(stream() for _ in range(streams)))
+    elapsed = perf_counter() - start_time
+    sent = streams * backend.ws_messages * 2
+    result = summarize(f'WebSocket x{streams}', latencies, elapsed,
+                       streams * backend.ws_messages * PREVIEW_FRAME_SIZE,
+                       messages_per_second=delivered[0] / elapsed,
+                       previews_dropped=sent - delivered[0])
+    # Rate of progress messages rather than of streams
+    result['per_second'] = len(latencies) / elapsed
+    return result
+
+async def bench_cold_start(session, base_url, control_url, count, down_seconds, backend):
+    """
+    Take the backend down, send API requests that the proxy has to hold, then bring the backend up.
+    Measures how long after the backend came up each held request was answered, and whether the
+    backend saw them in the order they were sent.
+    """
+    async with session.post(f'{control_url}/backend/down') as response:
+        response.raise_for_status()
+    backend.prompt_order.clear()
+
+    answered = []
+
+    async def make_request(number):
+        async with session.post(f'{base_url}/prompt', json={'number': number}) as response:
+            await response.read()
+            assert response.status == 200, response.status
+            answered.append(perf_counter())
+
+    requests = []
+    for number in range(count):
+        requests.append(asyncio.create_task(make_request(number)))
+        # Give each request time to be queued so the send order is well defined
+        await asyncio.sleep(0.001)
+
+    await asyncio.sleep(down_seconds)
+    up_time = perf_counter()
+    async with session.post(f'{control_url}/backend/up') as response:
+        response.raise_for_status()
+    await asyncio.gather(*requests)
+
+    elapsed = max(answered) - up_time
+    return summarize('Cold start replay', [t - up_time for t in answered], elapsed,
+                     in_order=backend.prompt_order == list(range(count)))
+
+async def wait_for_proxy(session, base_url, control_url, timeout=30):
+    """Wait until the proxy process is serving and its backend is ready."""
+    start_time = perf_counter()
+    while perf_counter() - start_time < timeout:
+        try:
+            async with session.get(f'{control_url}/state') as response:
+                if all((await response.json()).values()) is True:
+                    return
+        except aiohttp.ClientError:
+            pass
+        await asyncio.sleep(0.1)
+    raise TimeoutError(f'Proxy at {base_url} did not become ready')
+
+async def run_benchmarks(args, proxy_port, backend_port, control_port, backend):
+    """
+    Run the selected scenarios against a proxy process that is already starting.
+
+    Returns:
+        dict: Results of each scenario and the proxy's memory use
+    """
+    backend_runner = web.AppRunner(backend.create_app(), access_log=None)
+    await backend_runner.setup()
+    await web.TCPSite(backend_runner, '127.0.0.1', backend_port).start()
+
+    base_url = f'http://127.0.0.1:{proxy_port}'
+    control_url = f'http://127.0.0.1:{control_port}'
+    connector = aiohttp.TCPConnector(limit=max(args.concurrency, args.streams, args.cold_start_requests))
+    timeout = aiohttp.ClientTimeout(total=300)
+    results = []
+    try:
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+            await wait_for_proxy(session, base_url, control_url)
+            async with session.get(f'{control_url}/memory') as response:
+                memory_start = await response.json()
+
+            if 'http' in args.scenarios:
+                for size in BODY_SIZES:
+                    # Fewer requests for large bodies to keep the run time reasonable
+                    count = max(args.requests * 65536 // max(size, 65536), args.concurrency)
+                    results.append(await bench_http_get(session, base_url, size, count, args.concurrency))
+                    results.append(await bench_http_post(session, base_url, size, count, args.concurrency))
+                results.append(await bench_asset_cache(session, base_url, args.requests, args.concurrency))
+            if 'websocket' in args.scenarios:
+                results.append(await bench_websocket(session, base_url, args.streams, backend))
+            if 'coldstart' in args.scenarios:
+                results.append(await bench_cold_start(session, base_url, control_url, args.cold_start_requests,
+                                                      args.cold_start_down, backend))
+
+            async with session.get(f'{control_url}/memory') as response:
+                memory_end = await response.json()
+    finally:
+        await backend_runner.cleanup()
+
+    return {
+        'results': results,
+        'proxy_rss_mb': {'start': memory_start['rss_mb'], 'end': memory_end['rss_mb'],
+                         'peak': memory_end['peak_rss_mb']},
+    }
+
+def print_report(report, baseline=None):
+    """
+    Print the results as a table, with the change from a baseline run if given.
+    """
+    baseline_results = {result['scenario']: result for result in (baseline or {}).get('results', [])}
+
+    def change(result, key):
+        previous = baseline_results.get(result['scenario'], {}).get(key)
+        if not previous or result[key] is None:
+            return ''
+        return f' ({(result[key] - previous) / previous * 100:+.0f}%)'
+
+    print(f"{'Scenario':<20} {'Count':>6} {'Per sec':>16} {'p50 ms':>16} {'p99 ms':>16} {'MB/s':>8}  Notes")
+    for result in report['results']:
+        notes = ', '.join(f'{key}={result[key]}' for key in ('in_order', 'previews_dropped') if key in result)
+        mb_per_second = f"{result['mb_per_second']:.0f}" if result['mb_per_second'] else '-'
+        print(f"{result['scenario']:<20} {result['count']:>6} "
+              f"{result['per_second']:>8.0f}{change(result, 'per_second'):>8} "
+              f"{result['p50_ms']:>8.2f}{change(result, 'p50_ms'):>8} "
+              f"{result['p99_ms']:>8.2f}{change(result, 'p99_ms'):>8} "
+              f"{mb_per_second:>8}  {notes}")
+
+    rss = report['proxy_rss_mb']
+    print(f"Proxy RSS: {rss['start']:.1f}MB at start, {rss['end']:.1f}MB at end, {rss['peak']:.1f}MB peak")
+
+def find_regressions(report, baseline, tolerance):
+    """
+    Compare a run against a baseline.
+
+    Returns:
+        list: Descriptions of scenarios whose throughput dropped or p99 latency grew by more than
+              tolerance percent
+    """
+    baseline_results = {result['scenario']: result for result in baseline['results']}
+    regressions = []
+    for result in report['results']:
+        previous = baseline_results.get(result['scenario'])
+        if not previous:
+            continue
+        if previous['per_second'] and result['per_second'] < previous['per_second'] * (1 - tolerance / 100):
+            regressions.append(f"{result['scenario']}: {result['per_second']:.0f}/s vs {previous['per_second']:.0f}/s")
+        if previous['p99_ms'] and result['p99_ms'] > previous['p99_ms'] * (1 + tolerance / 100):
+            regressions.append(f"{result['scenario']}: p99 {result['p99_ms']:.2f}ms vs {previous['p99_ms']:.2f}ms")
+    return regressions
+
+def main():
+    """
+    Parse arguments, start the proxy process and run the benchmarks.
+    """
+    parser = argparse.ArgumentParser(description='Benchmark the proxy against a local fake ComfyUI backend')
+    parser.add_argument('--scenarios', nargs='+', default=['http', 'websocket', 'coldstart'],
+                        choices=['http', 'websocket', 'coldstart'], help='Scenarios to run')
+    parser.add_argument('--requests', type=int, default=500, help='Requests per small-body HTTP scenario')
+    parser.add_argument('--concurrency', type=int, default=16, help='Concurrent HTTP requests')
+    parser.add_argument('--streams', type=int, default=8, help='Concurrent WebSocket streams')
+    parser.add_argument('--ws-messages', type=int, default=64, help='Progress updates sent per WebSocket stream')
+    parser.add_argument('--cold-start-requests', type=int, default=32, help='API requests held during the cold start')
+    parser.add_argument('--cold-start-down', type=float, default=1.0, help='Seconds the backend stays down')
+    parser.add_argument('--json', type=Path, help='Save the results to this file')
+    parser.add_argument('--compare', type=Path, help='Compare with results saved by an earlier run')
+    parser.add_argument('--tolerance', type=float, default=20,
+                        help='Percent change from the --compare results reported as a regression')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format='%(levelname)-7s | %(message)s', force=True)
+
+    proxy_port, status_port, backend_port, control_port = (free_port() for _ in range(4))
+    backend = FakeComfyUI()
+    backend.ws_messages = args.ws_messages
+
+    with tempfile.TemporaryDirectory(prefix='pod_on_demand_benchmark_') as work_dir:
+        config = benchmark_config(proxy_port, status_port, backend_port, Path(work_dir))
+        proxy_process = multiprocessing.get_context('spawn').Process(
+            target=run_proxy, args=(config, control_port), daemon=True)
+        proxy_process.start()
+        try:
+            report = asyncio.run(run_benchmarks(args, proxy_port, backend_port, control_port, backend))
+        finally:
+            proxy_process.terminate()
+            proxy_process.join()
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            baseline = json.load(baseline_file)
+    print_report(report, baseline)
+
+    if args.json:
+        with open(args.json, 'w') as json_file:
+            json.dump(report, json_file, indent=1)
+
+    if baseline:
+        regressions = find_regressions(report, baseline, args.tolerance)
+        for regression in regressions:
+            print(f'Regression: {regression}')
+        if regressions:
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+
+# SPDX-FileCopyrightText: Copyright (c) 2025 Richard L. Lynch <rich@richlynch.com>
+# SPDX-License-Identifier: MIT
+
+"""Timestamp the phases of each pod cold start and keep a rolling history of their latencies."""
+
+import json
+import math
+import logging
+import collections
+from time import time
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# Phases of a cold start, in the order they are expected to complete
+PHASES = (
+    'create_resume_api',
+    'pod_running',
+    'ssh_port_published',
+    'ssh_connected',
+    'first_status_line',
+    'first_backend_response',
+)
+
+def percentile(values, pct):
+    """
+    Get the pct percentile of a list of values using the nearest-rank method.
+    """
+    if not values:
+        return None
+    values = sorted(values)
+    rank = max(math.ceil(pct / 100 * len(values)), 1)
+    return values[rank - 1]
+
+class ColdStartTracker:
+    """
+    Record how long each phase of a pod cold start takes and persist a rolling history.
+
+    Args:
+        history_path: JSON file the history is loaded from and saved to
+        max_entries: Number of most recent cold starts to keep
+    """
+    def __init__(self, history_path, max_entries=100):
+        self.history_path = Path(history_path)
+        self.max_entries = max_entries
+        self.current = None
+        self.history = []
+        # Cold starts finished since this process started, by (kind, outcome)
+        self.finished = collections.Counter()
+
+        if self.history_path.exists():
+            try:
+                with open(self.history_path) as history_file:
+                    self.history = json.load(history_file)[-max_entries:]
+            except (OSError, ValueError) as ex:
+                logger.error(f"Failed to load cold start history from {self.history_path}: {ex}")
+
+    def start(self):
+        """
+        Begin timing a new cold start. Any cold start still in progress is recorded as incomplete.
+        """
+        if self.current:
+            self.finish(completed=False)
+        self.current = {'start_time': time(), 'kind': None, 'completed': False, 'phases': {}}
+
+    def mark(self, phase, kind=None):
+        """
+        Record the time at which a phase completed. Ignored if no cold start is in progress or the
+        phase was already recorded, so reconnects after startup don't count.
+
+        Args:
+            phase: Name of the phase from PHASES
+            kind: Optionally record whether the pod was 'create'd or 'resume'd
+        """
+        if not self.current or phase in self.current['phases']:
+            return
+        if kind:
+            self.current['kind'] = kind
+
+        elapsed = time() - self.current['start_time']
+        self.current['phases'][phase] = elapsed
+        logger.info(f"Cold start phase {phase} reached after {elapsed:.1f} seconds")
+
+        if phase == PHASES[-1]:
+            self.finish(completed=True)
+
+    def abort(self):
+        """
+        Stop timing the cold start in progress, e.g. because the pod was shut down before it came up.
+        """
+        if self.current:
+            self.finish(completed=False)
+
+    def finish(self, completed):
+        """
+        Move the cold start in progress to the history and save the history to disk.
+        """
+        self.current['completed'] = completed
+        self.finished[(self.current['kind'] or 'unknown', 'completed' if completed else 'aborted')] += 1
+        self.history.append(self.current)
+        self.history = self.history[-self.max_entries:]
+        self.current = None
+
+        try:
+            tmp_path = self.history_path.with_suffix('.tmp')
+            with open(tmp_path, 'w') as history_file:
+                json.dump(self.history, history_file, indent=1)
+            tmp_path.replace(self.history_path)
+        except OSError as ex:
+            logger.error(f"Failed to save cold start history to {self.history_path}: {ex}")
+
+    def stats(self, kind=None):
+        """
+        Get p50/p95 latencies of each phase over the completed cold starts in the history.
+
+        Args:
+            kind: Only include cold starts where the pod was 'create'd or 'resume'd
+
+        Returns:
+            list: One dict per phase with the duration of the phase itself and the time since the
+                  start of the cold start
+        """
+        completed = [entry for entry in self.history
+                     if entry['completed'] and (kind is None or entry['kind'] == kind)]
+        stats = []
+        for index, phase in enumerate(PHASES):
+            elapsed = []
+            durations = []
+            for entry in completed:
+                phases = entry['phases']
+                if phase not in phases:
+                    continue
+                elapsed.append(phases[phase])
+                previous = [phases[p] for p in PHASES[:index] if p in phases]
+                durations.append(phases[phase] - max(previous, default=0))
+
+            stats.append({
+                'phase': phase,
+                'count': len(elapsed),
+                'duration_p50': percentile(durations, 50),
+                'duration_p95': percentile(durations, 95),
+                'elapsed_p50': percentile(elapsed, 50),
+                'elapsed_p95': percentile(elapsed, 95),
+            })
+        return stats
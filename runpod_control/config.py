@@ -54,6 +54,18 @@ def get_config():
         data = load(stream, Loader=Loader)
     return data
 
+@cache
+def get_config_without_secrets():
+    '''Get configuration from config.yaml with !secret and !file values left empty, for offline tools.'''
+    class PlaceholderLoader(Loader):
+        '''Loader that doesn't read secrets.yaml or referenced files.'''
+    PlaceholderLoader.add_constructor('!secret', lambda loader, node: '')
+    PlaceholderLoader.add_constructor('!file', lambda loader, node: '')
+
+    with open(script_dir / 'config.yaml') as stream:
+        data = load(stream, Loader=PlaceholderLoader)
+    return data
+
 def setup_runpod():
     runpod.api_key = get_config()['runpod']['api_key']
 
@@ -5,30 +5,152 @@
 
 import os
 import logging
+import threading
+from time import monotonic
+from concurrent.futures import ThreadPoolExecutor
 
 import runpod
+from runpod.error import QueryError
 
 from config import get_config, setup_runpod
+from utils import get_pods, invalidate_pods, get_gpu_types, get_gpu_details
 
 logger = logging.getLogger(__name__)
 
-def create_pod():
+# When each (GPU type, cloud type) last failed to create a pod, e.g. because it was out of stock
+_stockouts = {}
+_stockouts_lock = threading.Lock()
+
+def gpu_price(details, cloud_type):
+    """
+    Get the hourly price of a GPU type in a cloud, or None if it isn't offered there or the price
+    is unknown.
+
+    Args:
+        details: GPU type from runpod.get_gpu()
+        cloud_type: SECURE, COMMUNITY or ALL
+    """
+    prices = []
+    if cloud_type in ('SECURE', 'ALL') and details.get('secureCloud', True):
+        prices.append(details.get('securePrice'))
+    if cloud_type in ('COMMUNITY', 'ALL') and details.get('communityCloud', True):
+        prices.append(details.get('communityPrice'))
+    prices = [price for price in prices if price]
+    return min(prices) if prices else None
+
+def gpu_candidates(pod_cfg, selection_cfg):
+    """
+    List the GPU types and clouds to try creating the pod with, in order: the configured GPU types,
+    then with any_matching every other type within the limits, cheapest first. Types that recently
+    failed go after the others, so a stockout costs one failed call rather than one per create.
+
+    Args:
+        pod_cfg: The runpod.pod section of the configuration
+        selection_cfg: The runpod.gpu_selection section of the configuration
+
+    Returns:
+        list: (gpu_type_id, cloud_type) to try
+    """
+    preferred = selection_cfg['gpu_types'] or [pod_cfg['gpu_type_id']]
+    cloud_types = selection_cfg['cloud_types'] or [pod_cfg.get('cloud_type', 'ALL')]
+    min_vram_gb = selection_cfg['min_vram_gb']
+    max_price = selection_cfg['max_price_per_hour']
+
+    memory = {gpu['id']: gpu['memoryInGb'] for gpu in get_gpu_types()}
+    gpu_ids = list(preferred)
+    if selection_cfg['any_matching']:
+        gpu_ids += [gpu_id for gpu_id in memory if gpu_id not in preferred]
+    if min_vram_gb:
+        gpu_ids = [gpu_id for gpu_id in gpu_ids if memory.get(gpu_id, 0) >= min_vram_gb]
+
+    # Prices come from one query per GPU type, so look them up at the same time
+    details = {}
+    if max_price or selection_cfg['any_matching']:
+        def lookup(gpu_id):
+            try:
+                return get_gpu_details(gpu_id)
+            except Exception as ex: # pylint: disable=broad-exception-caught
+                logger.warning(f"Failed to look up GPU type {gpu_id}: {ex}")
+                return None
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            details = dict(zip(gpu_ids, executor.map(lookup, gpu_ids)))
+
+    candidates = []
+    for gpu_id in gpu_ids:
+        for cloud_type in cloud_types:
+            price = gpu_price(details[gpu_id], cloud_type) if details.get(gpu_id) else None
+            if price is None and gpu_id not in preferred:
+                # Not offered in this cloud, or nothing to compare with max_price
+                continue
+            if max_price and price is not None and price > max_price:
+                continue
+            candidates.append((gpu_id, cloud_type, price))
+
+    def order(candidate):
+        gpu_id, _, price = candidate
+        if gpu_id in preferred:
+            return (0, preferred.index(gpu_id), 0)
+        return (1, 0, price)
+    candidates.sort(key=order)
+
+    stockout_backoff = selection_cfg['stockout_backoff']
+    with _stockouts_lock:
+        recently_failed = {key for key, failed_at in _stockouts.items() if monotonic() - failed_at < stockout_backoff}
+    # sorted() is stable, so each group keeps its order
+    candidates.sort(key=lambda candidate: candidate[:2] in recently_failed)
+    return [(gpu_id, cloud_type) for gpu_id, cloud_type, _ in candidates]
+
+def create_pod(name=None):
+    """
+    Create the pod, trying each GPU type from gpu_candidates() until one is in stock.
+
+    Args:
+        name: Name of the pod, defaulting to the name in config.yaml
+
+    Returns:
+        dict: The new pod
+    """
     logger.info("Creating pod...")
 
-    kwargs = get_config()['runpod']['pod']
+    config = get_config()['runpod']
+    kwargs = dict(config['pod'])
+    if name:
+        # e.g. the extra pods of a pool
+        kwargs['name'] = name
     logger.debug(f'Pod configuration: {kwargs}')
 
-    new_pod = runpod.create_pod(**kwargs)
-    logger.info(f'New pod: {new_pod}')
+    candidates = gpu_candidates(config['pod'], config['gpu_selection'])
+    if not candidates:
+        raise ValueError('No GPU type matches runpod.gpu_selection in config.yaml')
+
+    last_error = None
+    for gpu_type_id, cloud_type in candidates:
+        try:
+            new_pod = runpod.create_pod(**dict(kwargs, gpu_type_id=gpu_type_id, cloud_type=cloud_type))
+        except QueryError as ex:
+            # Usually "no longer any instances available" - move on to the next GPU type
+            logger.warning(f"Failed to create pod with {gpu_type_id} in {cloud_type} cloud: {ex}")
+            with _stockouts_lock:
+                _stockouts[(gpu_type_id, cloud_type)] = monotonic()
+            last_error = ex
+            continue
+
+        with _stockouts_lock:
+            _stockouts.pop((gpu_type_id, cloud_type), None)
+        invalidate_pods()
+        logger.info(f'New pod with {gpu_type_id} in {cloud_type} cloud: {new_pod}')
+        return new_pod
 
-    return new_pod
+    invalidate_pods()
+    raise last_error
 
 def main():
     logging.basicConfig(level=logging.INFO)
     setup_runpod()
 
-    pod_list = runpod.get_pods()
-    assert len(pod_list) == 0, "There are already pods running. Please stop them before creating a new one."
+    name = get_config()['runpod']['pod']['name']
+    pod_list = [pod for pod in get_pods() if pod['name'] == name]
+    assert len(pod_list) == 0, f"There is already a pod named {name}. Please terminate it before creating a new one."
 
     new_pod = create_pod()
 
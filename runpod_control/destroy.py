@@ -9,13 +9,14 @@ import logging
 import runpod
 
 from config import get_config, setup_runpod
+from utils import get_pods, invalidate_pods
 
 logger = logging.getLogger(__name__)
 
-def terminate_pod():
-    name = get_config()['runpod']['pod']['name']
+def terminate_pod(name=None):
+    name = name or get_config()['runpod']['pod']['name']
 
-    pod_list = runpod.get_pods()
+    pod_list = get_pods()
     pod_list = [pod for pod in pod_list if pod['name'] == name]
     assert len(pod_list) == 1
 
@@ -23,6 +24,7 @@ def terminate_pod():
     logger.info(f'Terminating pod: {pod}')
 
     runpod.terminate_pod(pod['id'])
+    invalidate_pods()
 
 def main():
     logging.basicConfig(level=logging.INFO)
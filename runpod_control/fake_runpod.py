@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+
+# SPDX-FileCopyrightText: Copyright (c) 2025 Richard L. Lynch <rich@richlynch.com>
+# SPDX-License-Identifier: MIT
+
+"""Local stand-in for the parts of the RunPod API used by this project, for offline runs."""
+
+import random
+import logging
+import itertools
+from time import time
+
+import runpod
+from runpod.error import QueryError
+
+logger = logging.getLogger(__name__)
+
+# Functions of the runpod module replaced by install()
+API_FUNCTIONS = ('get_pods', 'get_pod', 'create_pod', 'resume_pod', 'stop_pod', 'terminate_pod',
+                 'get_gpus', 'get_gpu')
+
+DEFAULT_GPUS = (
+    {'id': 'NVIDIA RTX A5000', 'displayName': 'RTX A5000', 'memoryInGb': 24, 'secureCloud': True,
+     'communityCloud': True, 'securePrice': 0.27, 'communityPrice': 0.16},
+    {'id': 'NVIDIA RTX A6000', 'displayName': 'RTX A6000', 'memoryInGb': 48, 'secureCloud': True,
+     'communityCloud': True, 'securePrice': 0.49, 'communityPrice': 0.33},
+    {'id': 'NVIDIA A40', 'displayName': 'A40', 'memoryInGb': 48, 'secureCloud': True,
+     'communityCloud': False, 'securePrice': 0.40, 'communityPrice': None},
+)
+
+class FakeRunPod:
+    """
+    In-memory pod inventory with the same call signatures and return shapes as the runpod module.
+
+    Pods report desiredStatus RUNNING as soon as they are created or resumed, like the real API,
+    but only get a runtime (and with it a published SSH port) after the boot delay has passed.
+
+    Args:
+        create_delay: Seconds from create_pod until the container is up, including the image pull
+        resume_delay: Seconds from resume_pod until the container is up
+        failure_rates: Probability of each API function raising QueryError, by function name
+        clock: Function returning the current time in seconds, e.g. a simulator's virtual clock
+        seed: Seed for the failure random number generator
+        gpus: GPU types returned by get_gpus
+        cpu_mem_gb: Memory reported for created pods
+        out_of_stock: IDs of GPU types create_pod fails for, like RunPod does when none are available
+    """
+    def __init__(self, create_delay=120, resume_delay=30, failure_rates=None, clock=time, seed=None,
+                 gpus=DEFAULT_GPUS, cpu_mem_gb=62, out_of_stock=()):
+        self.create_delay = create_delay
+        self.resume_delay = resume_delay
+        self.failure_rates = failure_rates or {}
+        self.clock = clock
+        self.random = random.Random(seed)
+        self.gpus = [dict(gpu) for gpu in gpus]
+        self.cpu_mem_gb = cpu_mem_gb
+        self.out_of_stock = set(out_of_stock)
+        self.pods = {}
+        # Per-pod timestamps used to work out when runtimes appear and how long pods were billed
+        self._boot_at = {}
+        self._running_since = {}
+        self._stopped_since = {}
+        self.calls = []
+        self.running_seconds = 0
+        self.stopped_seconds = 0
+        self._ids = itertools.count(1)
+        self._saved = None
+
+    def install(self):
+        """
+        Replace the runpod module's API functions with this fake. Undo with uninstall().
+        """
+        self._saved = {name: getattr(runpod, name) for name in API_FUNCTIONS}
+        for name in API_FUNCTIONS:
+            setattr(runpod, name, getattr(self, name))
+        return self
+
+    def uninstall(self):
+        """Restore the runpod module's API functions."""
+        if self._saved:
+            for name, func in self._saved.items():
+                setattr(runpod, name, func)
+            self._saved = None
+
+    def __enter__(self):
+        return self.install()
+
+    def __exit__(self, *exc_info):
+        self.uninstall()
+
+    def _call(self, name):
+        self.calls.append((self.clock(), name))
+        if self.random.random() < self.failure_rates.get(name, 0):
+            logger.debug(f"Fake RunPod API failing {name}")
+            raise QueryError(f'Simulated failure of {name}')
+
+    def _pod(self, pod_id):
+        if pod_id not in self.pods:
+            raise QueryError(f'Pod {pod_id} not found')
+        return self.pods[pod_id]
+
+    def _update_runtime(self, pod):
+        if pod['desiredStatus'] == 'RUNNING' and pod['runtime'] is None and self.clock() >= self._boot_at[pod['id']]:
+            pod['runtime'] = {
+                'uptimeInSeconds': int(self.clock() - self._boot_at[pod['id']]),
+                'ports': [{'ip': '127.0.0.1', 'isIpPublic': True, 'privatePort': 22,
+                           'publicPort': 20000 + int(pod['id'].rsplit('-', 1)[1]), 'type': 'tcp'}],
+            }
+
+    def _start_billing(self, pod_id):
+        stopped_since = self._stopped_since.pop(pod_id, None)
+        if stopped_since is not None:
+            self.stopped_seconds += self.clock() - stopped_since
+        self._running_since[pod_id] = self.clock()
+
+    def _stop_billing(self, pod_id, stopped):
+        running_since = self._running_since.pop(pod_id, None)
+        if running_since is not None:
+            self.running_seconds += self.clock() - running_since
+        if stopped:
+            self._stopped_since.setdefault(pod_id, self.clock())
+        else:
+            stopped_since = self._stopped_since.pop(pod_id, None)
+            if stopped_since is not None:
+                self.stopped_seconds += self.clock() - stopped_since
+
+    def billed_seconds(self):
+        """
+        Get the total seconds pods have been running and stopped, including pods still in either
+        state.
+
+        Returns:
+            tuple: Running seconds and stopped seconds
+        """
+        now = self.clock()
+        running = self.running_seconds + sum(now - since for since in self._running_since.values())
+        stopped = self.stopped_seconds + sum(now - since for since in self._stopped_since.values())
+        return running, stopped
+
+    def find_pod(self, name):
+        """
+        Get the pod with the given name, or None, without counting as an API call. For use by
+        simulations that need to know what the pod is doing.
+        """
+        for pod in self.pods.values():
+            if pod['name'] == name:
+                self._update_runtime(pod)
+                return pod
+        return None
+
+    def get_pods(self):
+        """Get all pods on the account."""
+        self._call('get_pods')
+        for pod in self.pods.values():
+            self._update_runtime(pod)
+        return [dict(pod) for pod in self.pods.values()]
+
+    def get_pod(self, pod_id):
+        """Get a single pod."""
+        self._call('get_pod')
+        pod = self._pod(pod_id)
+        self._update_runtime(pod)
+        return dict(pod)
+
+    def create_pod(self, name, image_name='', gpu_type_id=DEFAULT_GPUS[0]['id'], **kwargs):
+        """Create and start a pod."""
+        self._call('create_pod')
+        gpu = next((gpu for gpu in self.gpus if gpu['id'] == gpu_type_id), None)
+        if gpu is None:
+            raise QueryError(f'No GPU type {gpu_type_id}')
+        if gpu_type_id in self.out_of_stock:
+            raise QueryError('There are no longer any instances available with the requested specifications. '
+                             'Please refresh and try again.')
+        pod_id = f'fakepod-{next(self._ids)}'
+        self.pods[pod_id] = {
+            'id': pod_id,
+            'name': name,
+            'imageName': image_name,
+            'desiredStatus': 'RUNNING',
+            'memoryInGb': self.cpu_mem_gb,
+            'gpuCount': kwargs.get('gpu_count', 1),
+            'machine': {'gpuDisplayName': gpu['displayName']},
+            'runtime': None,
+        }
+        self._boot_at[pod_id] = self.clock() + self.create_delay
+        self._start_billing(pod_id)
+        logger.debug(f"Fake RunPod created pod {pod_id}")
+        return dict(self.pods[pod_id])
+
+    def resume_pod(self, pod_id, gpu_count):
+        """Start a stopped pod."""
+        self._call('resume_pod')
+        pod = self._pod(pod_id)
+        if pod['desiredStatus'] != 'RUNNING':
+            pod['desiredStatus'] = 'RUNNING'
+            pod['gpuCount'] = gpu_count
+            self._boot_at[pod_id] = self.clock() + self.resume_delay
+            self._start_billing(pod_id)
+        return dict(pod)
+
+    def stop_pod(self, pod_id):
+        """Stop a pod, keeping its volume."""
+        self._call('stop_pod')
+        pod = self._pod(pod_id)
+        if pod['desiredStatus'] == 'RUNNING':
+            self._stop_billing(pod_id, stopped=True)
+        pod['desiredStatus'] = 'EXITED'
+        pod['runtime'] = None
+        return dict(pod)
+
+    def terminate_pod(self, pod_id):
+        """Delete a pod."""
+        self._call('terminate_pod')
+        self._pod(pod_id)
+        self._stop_billing(pod_id, stopped=False)
+        del self.pods[pod_id]
+        self._boot_at.pop(pod_id, None)
+
+    def get_gpus(self):
+        """Get the available GPU types."""
+        self._call('get_gpus')
+        return [{key: gpu[key] for key in ('id', 'displayName', 'memoryInGb')} for gpu in self.gpus]
+
+    def get_gpu(self, gpu_id, gpu_quantity=1):
+        """Get one GPU type."""
+        self._call('get_gpu')
+        for gpu in self.gpus:
+            if gpu['id'] == gpu_id:
+                return dict(gpu)
+        raise QueryError(f'No GPU type {gpu_id}')
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+
+# SPDX-FileCopyrightText: Copyright (c) 2025 Richard L. Lynch <rich@richlynch.com>
+# SPDX-License-Identifier: MIT
+
+"""Decide how long to keep an idle pod stopped before terminating it."""
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+HOURS_PER_MONTH = 730
+
+def stopped_cost_per_hour(idle_cfg, pod_cfg):
+    """
+    Get the hourly cost of keeping the pod stopped, which is the storage for its disks.
+    """
+    disk_gb = pod_cfg.get('container_disk_in_gb', 0) + pod_cfg.get('volume_in_gb', 0)
+    return disk_gb * idle_cfg['storage_price_per_gb_month'] / HOURS_PER_MONTH
+
+def startup_p50(cold_start, kind):
+    """
+    Get the median seconds until the backend answered for cold starts that created or resumed the
+    pod, or None if there are none in the history.
+    """
+    stats = cold_start.stats(kind)
+    return next(phase_stats['elapsed_p50'] for phase_stats in stats if phase_stats['phase'] == 'first_backend_response')
+
+def terminate_after(idle_cfg, pod_cfg, cold_start):
+    """
+    Get the seconds to keep an idle pod stopped before terminating it.
+
+    Unless configured, this is how long it takes for the stopped pod's storage to cost as much as a
+    resume saves over a create. A resume saves its faster startup, both in GPU time billed while
+    booting and in time spent waiting. Terminating at that break-even point never costs more than
+    twice what the best choice in hindsight would have.
+
+    Args:
+        idle_cfg: The web.idle_policy section of the configuration
+        pod_cfg: The runpod.pod section of the configuration
+        cold_start: ColdStartTracker with the measured create and resume times
+
+    Returns:
+        float: Seconds, or 0 to terminate the pod straight away
+    """
+    if idle_cfg['mode'] != 'stop':
+        return 0
+    if idle_cfg['terminate_after'] is not None:
+        return idle_cfg['terminate_after']
+
+    create_time = startup_p50(cold_start, 'create')
+    resume_time = startup_p50(cold_start, 'resume')
+    if create_time is None or resume_time is None:
+        return idle_cfg['default_terminate_after']
+
+    saved_seconds = create_time - resume_time
+    if saved_seconds <= 0:
+        logger.debug(f"Resumes ({resume_time:.0f}s) aren't faster than creates ({create_time:.0f}s), not stopping")
+        return 0
+
+    saving = saved_seconds / 3600 * (idle_cfg['gpu_price_per_hour'] + idle_cfg['wait_cost_per_hour'])
+    storage_cost = stopped_cost_per_hour(idle_cfg, pod_cfg)
+    if storage_cost <= 0:
+        return idle_cfg['max_terminate_after']
+    seconds = saving / storage_cost * 3600
+    return min(max(seconds, idle_cfg['min_terminate_after']), idle_cfg['max_terminate_after'])
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+
+# SPDX-FileCopyrightText: Copyright (c) 2025 Richard L. Lynch <rich@richlynch.com>
+# SPDX-License-Identifier: MIT
+
+"""Minimal counters, gauges and histograms rendered in the Prometheus text exposition format."""
+
+import math
+import bisect
+
+# Content type of the Prometheus text exposition format
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Request latency buckets in seconds. Long requests are output downloads and held requests.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300)
+
+def escape_label_value(value):
+    """Escape a label value for the text exposition format."""
+    return str(value).replace('\\', r'\\').replace('\n', r'\n').replace('"', r'\"')
+
+def format_value(value):
+    """Format a sample value for the text exposition format."""
+    if value is None:
+        return 'NaN'
+    if isinstance(value, bool):
+        return '1' if value else '0'
+    if isinstance(value, float):
+        if math.isinf(value):
+            return '+Inf' if value > 0 else '-Inf'
+        if value.is_integer():
+            return str(int(value))
+    return str(value)
+
+def format_labels(names, values):
+    """Format a label set, or an empty string if there are no labels."""
+    if not names:
+        return ''
+    pairs = ','.join(f'{name}="{escape_label_value(value)}"' for name, value in zip(names, values))
+    return f'{{{pairs}}}'
+
+class Metric:
+    """
+    Base class for a named metric with an optional set of labels. Each distinct combination of
+    label values is a separate child returned by labels().
+
+    Args:
+        name: Metric name
+        description: Help text
+        labelnames: Names of the labels, in the order labels() takes their values
+    """
+    type_name = 'untyped'
+
+    def __init__(self, name, description, labelnames=()):
+        self.name = name
+        self.description = description
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+
+    def labels(self, *values):
+        """
+        Get the child for a combination of label values. Callers on hot paths should look the child
+        up once and keep it.
+        """
+        values = tuple(str(value) for value in values)
+        if len(values) != len(self.labelnames):
+            raise ValueError(f'{self.name} expects labels {self.labelnames}, got {values}')
+        child = self._children.get(values)
+        if child is None:
+            child = self._children[values] = self._new_child()
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def _samples(self, values, child):
+        raise NotImplementedError
+
+    def render(self):
+        """
+        Render the metric and all its children in the text exposition format.
+
+        Returns:
+            list: Lines of text
+        """
+        lines = [f'# HELP {self.name} {self.description}', f'# TYPE {self.name} {self.type_name}']
+        for values, child in sorted(self._children.items()):
+            lines.extend(self._samples(values, child))
+        return lines
+
+class _Value:
+    __slots__ = ('value',)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount=1):
+        """Increase the value."""
+        self.value += amount
+
+    def set(self, value):
+        """Replace the value."""
+        self.value = value
+
+class Counter(Metric):
+    """Monotonically increasing count, e.g. of requests served."""
+    type_name = 'counter'
+
+    def _new_child(self):
+        return _Value()
+
+    def _samples(self, values, child):
+        return [f'{self.name}{format_labels(self.labelnames, values)} {format_value(child.value)}']
+
+class Gauge(Metric):
+    """Value that can go up and down, e.g. whether the pod is running."""
+    type_name = 'gauge'
+
+    def _new_child(self):
+        return _Value()
+
+    def _samples(self, values, child):
+        return [f'{self.name}{format_labels(self.labelnames, values)} {format_value(child.value)}']
+
+class _Buckets:
+    __slots__ = ('bounds', 'counts', 'sum', 'count')
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * len(bounds)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        """Record one observation."""
+        index = bisect.bisect_left(self.bounds, value)
+        if index < len(self.counts):
+            self.counts[index] += 1
+        self.sum += value
+        self.count += 1
+
+class Histogram(Metric):
+    """
+    Distribution of observed values, e.g. request latencies, counted into cumulative buckets.
+
+    Args:
+        buckets: Upper bounds of the buckets, in increasing order. A +Inf bucket is implied.
+    """
+    type_name = 'histogram'
+
+    def __init__(self, name, description, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, description, labelnames)
+        self.buckets = tuple(buckets)
+
+    def _new_child(self):
+        return _Buckets(self.buckets)
+
+    def _samples(self, values, child):
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (math.inf,), child.counts + [child.count - sum(child.counts)]):
+            cumulative += count
+            labels = format_labels(self.labelnames + ('le',), values + (format_value(float(bound)),))
+            lines.append(f'{self.name}_bucket{labels} {cumulative}')
+        labels = format_labels(self.labelnames, values)
+        lines.append(f'{self.name}_sum{labels} {format_value(child.sum)}')
+        lines.append(f'{self.name}_count{labels} {child.count}')
+        return lines
+
+def render(metrics):
+    """
+    Render metrics in the text exposition format.
+
+    Args:
+        metrics: Iterable of Metric objects
+
+    Returns:
+        str: Text to serve from a /metrics endpoint
+    """
+    lines = []
+    for metric in metrics:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+class ProxyMetrics:
+    """
+    Metrics updated as requests pass through the proxies. State such as pod status is sampled
+    when the metrics are scraped instead.
+    """
+    def __init__(self):
+        self.requests = Counter('pod_on_demand_http_requests_total',
+                                'HTTP requests handled by each proxy',
+                                ('proxy', 'method', 'code'))
+        self.request_latency = Histogram('pod_on_demand_http_request_duration_seconds',
+                                         'Time to handle HTTP requests, including streaming the body',
+                                         ('proxy',))
+        self.websocket_messages = Counter('pod_on_demand_websocket_messages_total',
+                                          'WebSocket messages relayed by each proxy',
+                                          ('proxy', 'direction'))
+        self.websocket_previews_dropped = Counter('pod_on_demand_websocket_preview_frames_dropped_total',
+                                                  'Preview frames not sent to slow browsers',
+                                                  ('proxy', 'reason'))
+        self.websocket_connections = Gauge('pod_on_demand_websocket_connections',
+                                           'Open WebSocket connections relayed by each proxy',
+                                           ('proxy',))
+
+    def all(self):
+        """All metrics in this collection."""
+        return [self.requests, self.request_latency, self.websocket_messages, self.websocket_previews_dropped,
+                self.websocket_connections]
@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+
+# SPDX-FileCopyrightText: Copyright (c) 2025 Richard L. Lynch <rich@richlynch.com>
+# SPDX-License-Identifier: MIT
+
+"""Content-addressed local cache of ComfyUI outputs fetched through /view."""
+
+import json
+import hashlib
+import logging
+import tempfile
+import mimetypes
+from time import time
+from email.utils import formatdate
+from pathlib import Path, PurePosixPath
+
+from aiohttp import web
+
+logger = logging.getLogger(__name__)
+
+# Paths ComfyUI serves output files on
+VIEW_PATHS = ('/view', '/api/view')
+
+class OutputCacheWriter:
+    """
+    Hash and write an output file to the cache as it is streamed to the client. Nothing is
+    visible in the cache until commit() is called.
+    """
+    def __init__(self, cache, key, content_type, validators):
+        self.cache = cache
+        self.key = key
+        self.content_type = content_type
+        self.validators = validators
+        self.size = 0
+        self.hash = hashlib.sha256()
+        # Concurrent downloads of the same output each get their own file
+        self.file = tempfile.NamedTemporaryFile(dir=cache.cache_dir / 'tmp', suffix='.tmp', delete=False)
+        self.tmp_path = Path(self.file.name)
+
+    def write(self, chunk):
+        """Append a chunk of the file."""
+        if self.file is None:
+            return
+        self.size += len(chunk)
+        self.hash.update(chunk)
+        self.file.write(chunk)
+
+    def commit(self):
+        """Make the fully written file available in the cache."""
+        if self.file is None:
+            return
+        self.file.close()
+        self.file = None
+        self.cache.store(self.key, self.tmp_path, self.hash.hexdigest(), self.size, self.content_type,
+                         self.validators)
+
+    def abort(self):
+        """Discard a partially written file."""
+        if self.file is None:
+            return
+        try:
+            self.file.close()
+        except OSError:
+            # Flushing the rest failed, e.g. because the disk is full - it is deleted anyway
+            pass
+        self.file = None
+        self.tmp_path.unlink(missing_ok=True)
+
+class OutputCache:
+    """
+    Serve ComfyUI /view requests for finished outputs from local disk, either from the tree the sync
+    task mirrors from the pod or from a content-addressed blob store fed by proxied responses.
+    Outputs are served with sendfile and support Range requests, and don't need the pod to be up.
+
+    ComfyUI reuses file names when its counter restarts, e.g. after outputs are deleted, so a name
+    doesn't identify the content for good. While the backend is up, local copies are revalidated
+    with it, and browsers are told to revalidate with the proxy.
+
+    Args:
+        cache_dir: Directory holding the blob store and its index
+        synced_output_dir: Local mirror of ComfyUI/output/ maintained by the sync task
+        max_bytes: Total size of blobs before the least recently used are evicted
+    """
+    def __init__(self, cache_dir, synced_output_dir, max_bytes):
+        self.cache_dir = Path(cache_dir)
+        self.synced_output_dir = Path(synced_output_dir)
+        self.max_bytes = max_bytes
+        self.index_path = self.cache_dir / 'index.json'
+        self.index = {}
+        self.hits = 0
+        self.misses = 0
+
+        (self.cache_dir / 'blobs').mkdir(parents=True, exist_ok=True)
+        (self.cache_dir / 'tmp').mkdir(exist_ok=True)
+        for tmp_path in (self.cache_dir / 'tmp').glob('*.tmp'):
+            tmp_path.unlink(missing_ok=True)
+        if self.index_path.exists():
+            try:
+                with open(self.index_path) as index_file:
+                    self.index = json.load(index_file)
+            except (OSError, ValueError) as ex:
+                logger.error(f"Failed to load output cache index from {self.index_path}: {ex}")
+
+    @property
+    def total_bytes(self):
+        """Total size of the distinct blobs in the store."""
+        return sum({entry['hash']: entry['size'] for entry in self.index.values()}.values())
+
+    def output_key(self, request):
+        """
+        Get the cache key ('subfolder/filename') for a /view request of an unmodified output file,
+        or None if the request isn't one.
+        """
+        if request.method not in ('GET', 'HEAD') or request.path not in VIEW_PATHS:
+            return None
+        query = request.query
+        # Previews and channel extraction transform the file, and temp files get overwritten
+        if 'preview' in query or 'channel' in query or query.get('type', 'output') != 'output':
+            return None
+        filename = query.get('filename')
+        if not filename:
+            return None
+
+        key = PurePosixPath(query.get('subfolder', '')) / filename
+        if key.is_absolute() or '..' in key.parts:
+            return None
+        return str(key)
+
+    def blob_path(self, content_hash):
+        """Path of the blob holding content with the given SHA-256 hash."""
+        return self.cache_dir / 'blobs' / content_hash[:2] / content_hash
+
+    def lookup(self, key):
+        """
+        Find a local copy of an output.
+
+        Returns:
+            tuple: Path of the file and its content type, or (None, None) if it isn't cached
+        """
+        synced_path = self.synced_output_dir / key
+        if synced_path.is_file():
+            return synced_path, None
+
+        entry = self.index.get(key)
+        if entry and self.blob_path(entry['hash']).is_file():
+            entry['last_used'] = time()
+            return self.blob_path(entry['hash']), entry['content_type']
+
+        self.misses += 1
+        return None, None
+
+    def revalidation_headers(self, key, path):
+        """
+        Headers asking the backend to only send an output if it differs from the local copy found
+        by lookup(), or an empty dict if the local copy can't be revalidated.
+        """
+        entry = self.index.get(key)
+        if entry and path == self.blob_path(entry['hash']):
+            headers = {}
+            validators = entry.get('validators', {})
+            if 'ETag' in validators:
+                headers['If-None-Match'] = validators['ETag']
+            if 'Last-Modified' in validators:
+                headers['If-Modified-Since'] = validators['Last-Modified']
+            return headers
+
+        # The sync task copies the modification time in whole seconds, so the file on the pod was
+        # modified less than a second later. A reused name is written long after the old file.
+        try:
+            return {'If-Modified-Since': formatdate(int(path.stat().st_mtime) + 1, usegmt=True)}
+        except OSError:
+            return {}
+
+    def response(self, key, path, content_type):
+        """
+        Build a zero-copy file response for a cached output. Range and conditional requests are
+        answered from the file.
+        """
+        self.hits += 1
+        content_type = content_type or mimetypes.guess_type(key)[0] or 'application/octet-stream'
+        return web.FileResponse(path, headers={
+            'Content-Type': content_type,
+            # The name may be reused for a new output, so browsers have to check with the proxy
+            'Cache-Control': 'no-cache',
+            'X-Proxy-Cache': 'HIT',
+        })
+
+    def open_writer(self, key, request, backend_response):
+        """
+        Start caching a proxied output, or return None if the response can't be cached.
+        """
+        if request.method != 'GET' or 'Range' in request.headers or backend_response.status != 200:
+            return None
+        content_type = backend_response.headers.get('Content-Type')
+        validators = {name: backend_response.headers[name] for name in ('ETag', 'Last-Modified')
+                      if name in backend_response.headers}
+        return OutputCacheWriter(self, key, content_type, validators)
+
+    def store(self, key, tmp_path, content_hash, size, content_type, validators):
+        """
+        Move a fully written output into the blob store, sharing the blob with identical content.
+        """
+        blob_path = self.blob_path(content_hash)
+        if blob_path.exists():
+            tmp_path.unlink()
+        else:
+            blob_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path.replace(blob_path)
+
+        self.index[key] = {
+            'hash': content_hash,
+            'size': size,
+            'content_type': content_type,
+            'validators': validators,
+            'last_used': time(),
+        }
+        logger.debug(f"Cached output {key} ({size} bytes, sha256 {content_hash})")
+        self._evict()
+        self._save_index()
+
+    def _evict(self):
+        total_bytes = self.total_bytes
+        for key in sorted(self.index, key=lambda key: self.index[key]['last_used']):
+            if total_bytes <= self.max_bytes:
+                break
+            entry = self.index.pop(key)
+            if not any(other['hash'] == entry['hash'] for other in self.index.values()):
+                self.blob_path(entry['hash']).unlink(missing_ok=True)
+                total_bytes -= entry['size']
+            logger.debug(f"Evicted cached output {key}")
+
+    def _save_index(self):
+        tmp_path = self.index_path.with_suffix('.tmp')
+        with open(tmp_path, 'w') as index_file:
+            json.dump(self.index, index_file)
+        tmp_path.replace(self.index_path)
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+
+# SPDX-FileCopyrightText: Copyright (c) 2025 Richard L. Lynch <rich@richlynch.com>
+# SPDX-License-Identifier: MIT
+
+"""Asynchronous wrapper around the blocking RunPod SDK calls used by the proxy."""
+
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from runpod.error import QueryError
+
+from create import create_pod
+from resume import resume_pod
+from destroy import terminate_pod
+from stop import stop_pod
+from config import get_config
+from utils import get_pod_info, get_ssh_ip_port
+
+logger = logging.getLogger(__name__)
+
+class AsyncPodClient:
+    """
+    Run RunPod control plane calls on a bounded thread pool so they never block the event loop.
+
+    Args:
+        name: Name of the pod managed by this client
+        max_workers: Maximum number of concurrent RunPod API calls
+        timeout: Seconds to wait for a single API call before raising TimeoutError
+    """
+    def __init__(self, name, max_workers=4, timeout=60):
+        self.name = name
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='runpod-api')
+
+    async def _run(self, func, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self._executor, partial(func, *args, **kwargs))
+        return await asyncio.wait_for(future, self.timeout)
+
+    async def get_pod_info(self, max_age=None):
+        """Get a summary of the pod, or None if it doesn't exist."""
+        return await self._run(get_pod_info, self.name, max_age)
+
+    async def is_pod_running(self):
+        """
+        Check if the pod is currently running.
+
+        Returns:
+            bool: True if the pod exists and is running, False otherwise
+        """
+        pod = await self.get_pod_info()
+        return pod.is_running if pod else False
+
+    async def create_or_resume_pod(self):
+        """
+        Resume an existing pod if it exists or create a new pod.
+
+        Returns:
+            str: 'resume' if an existing pod was resumed or 'create' if a new pod was created
+        """
+        if await self.get_pod_info():
+            try:
+                await self._run(resume_pod, self.name)
+                return 'resume'
+            except QueryError as ex:
+                # e.g. the GPU on the stopped pod's machine was taken by someone else
+                logger.warning(f"Failed to resume pod, terminating it and creating a new one: {ex}")
+                await self._run(terminate_pod, self.name)
+        await self._run(create_pod, self.name)
+        return 'create'
+
+    async def stop_pod(self):
+        """Stop the pod, keeping its disk so it can be resumed."""
+        return await self._run(stop_pod, self.name)
+
+    async def terminate_pod(self):
+        """Terminate the pod."""
+        return await self._run(terminate_pod, self.name)
+
+    async def get_ssh_ip_port(self, max_age=None):
+        """Get the public IP and port of the pod's SSH server, or (None, None) if not published."""
+        return await self._run(get_ssh_ip_port, self.name, max_age)
+
+    def close(self):
+        """Release the worker threads without waiting for in-flight calls."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+def create_pod_client(name=None):
+    """
+    Create an AsyncPodClient for the named pod, defaulting to the pod in config.yaml.
+    """
+    config = get_config()['runpod']
+    return AsyncPodClient(name or config['pod']['name'],
+                          max_workers=config['api_workers'],
+                          timeout=config['api_timeout'])
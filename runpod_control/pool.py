@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+
+# SPDX-FileCopyrightText: Copyright (c) 2025 Richard L. Lynch <rich@richlynch.com>
+# SPDX-License-Identifier: MIT
+
+"""Spread ComfyUI prompts over a pool of pods, and size the pool by the depth of their queues.
+
+The first pod is the one proxy.py always manages. Further pods are named <name>-2, <name>-3 and
+so on, share its network volume, and each get their own SSH tunnel with the forwarded ports moved
+up by a multiple of port_offset.
+
+New prompts go to the ready pod with the fewest prompts queued, counting prompts sent to it since
+its last status line. ComfyUI sends a prompt's progress over the WebSocket of the client that
+queued it, so each WebSocket stays on one pod and prompts from a client with an open WebSocket go
+to that pod. Prompts from clients without one, like scripts, are free to go anywhere, and their
+history is fetched from the pod that ran them. A pod the pool has let go gets no new work while it
+shuts down, only requests for the history of prompts it ran.
+"""
+
+import re
+import logging
+from collections import OrderedDict, deque
+from urllib.parse import parse_qs
+
+logger = logging.getLogger(__name__)
+
+# Paths that queue a prompt
+PROMPT_PATHS = ('/prompt', '/api/prompt')
+
+# History of a single prompt, e.g. /api/history/<prompt_id>
+HISTORY_PATTERN = re.compile(r'^(?:/api)?/history/(?P<prompt_id>[^/?]+)')
+
+# Seconds a prompt sent to a pod counts towards its load, until status_loop.py has reported it
+QUEUE_REPORT_DELAY = 10
+
+# Most prompts to remember the pod of
+MAX_PROMPT_PINS = 10000
+
+def member_name(name, index):
+    """
+    Get the name of the pod at an index of the pool. The first pod keeps the configured name.
+    """
+    return name if index == 0 else f'{name}-{index + 1}'
+
+class PoolMember:
+    """
+    One pod of the pool, with the state the usual monitoring tasks keep for it.
+
+    Args:
+        index: Position in the pool, 0 for the first pod
+        pod_client: AsyncPodClient for the pod
+        tunnel: SSHTunnel to the pod
+        pod_state: State object tracking pod status
+        ssh_state: State object tracking SSH status and CPU/GPU demand
+        demand: State object whose need_pod says whether the pool wants this pod running
+        cold_start: ColdStartTracker for this pod's starts
+        port_offset: Added to the remote ports for the local ends of this pod's tunnel
+        proxy_state: For the first pod, the pool proxy's state, which tracks its backend readiness
+    """
+    def __init__(self, index, pod_client, tunnel, pod_state, ssh_state, demand, cold_start, port_offset,
+                 proxy_state=None):
+        self.index = index
+        self.name = pod_client.name
+        self.pod_client = pod_client
+        self.tunnel = tunnel
+        self.pod = pod_state
+        self.ssh = ssh_state
+        self.demand = demand
+        self.cold_start = cold_start
+        self.port_offset = port_offset
+        self.proxy_state = proxy_state
+        self.backend_ready = False
+        # Times prompts were sent here, until status_loop.py includes them in the queue
+        self.recent_prompts = deque()
+        self.websockets = 0
+        self.last_busy = 0
+
+    @property
+    def ready(self):
+        """True if the pool proxy's backend on this pod answers through the tunnel."""
+        backend_ready = self.proxy_state.backend_ready if self.proxy_state is not None else self.backend_ready
+        return self.ssh.ssh_running and backend_ready
+
+    @property
+    def routable(self):
+        """
+        True if new work can be sent here: the pod is ready and, for an extra pod, the pool hasn't
+        let it go. A pod that was let go only answers for the prompts it already has.
+        """
+        return self.ready and (self.index == 0 or self.demand.need_pod)
+
+    def load(self, now):
+        """
+        Get the number of prompts queued or running on the pod, including prompts sent to it too
+        recently to have been reported.
+        """
+        while self.recent_prompts and now - self.recent_prompts[0] > QUEUE_REPORT_DELAY:
+            self.recent_prompts.popleft()
+        return (self.ssh.comfyui_queue or 0) + len(self.recent_prompts)
+
+class PodPool:
+    """
+    Pods serving one proxy, with the pods each client and prompt are pinned to.
+
+    Args:
+        members: PoolMember for each pod, the first pod first
+        pool_cfg: The pool section of the configuration
+    """
+    def __init__(self, members, pool_cfg):
+        self.members = members
+        self.cfg = pool_cfg
+        self.last_scale_up = 0
+        # Client ID to [member, open WebSocket count] and prompt ID to member
+        self._clients = {}
+        self._prompts = OrderedDict()
+
+    @property
+    def ready(self):
+        """True if any pod can take new requests."""
+        return any(member.routable for member in self.members)
+
+    def least_loaded(self, now):
+        """
+        Get the routable pod with the fewest prompts, preferring earlier pods on a tie, or None.
+        """
+        candidates = [member for member in self.members if member.routable]
+        return min(candidates, key=lambda member: (member.load(now), member.index), default=None)
+
+    def route_prompt(self, client_id, now):
+        """
+        Pick the pod for a new prompt: the pod of the client's WebSocket, or else the least loaded.
+
+        Returns:
+            PoolMember or None: The pod, or None if no pod is ready
+        """
+        pinned = self._clients.get(client_id)
+        member = pinned[0] if pinned and pinned[0].routable else self.least_loaded(now)
+        if member is not None:
+            member.recent_prompts.append(now)
+        return member
+
+    def pin_prompt(self, prompt_id, member):
+        """
+        Remember which pod runs a prompt, so its history is fetched from there.
+        """
+        self._prompts[prompt_id] = member
+        self._prompts.move_to_end(prompt_id)
+        while len(self._prompts) > MAX_PROMPT_PINS:
+            self._prompts.popitem(last=False)
+
+    def open_websocket(self, client_id, now):
+        """
+        Pick the pod for a client's WebSocket and pin the client to it while it is open.
+
+        Returns:
+            PoolMember or None: The pod, or None if no pod is ready
+        """
+        pinned = self._clients.get(client_id)
+        if pinned and pinned[0].routable:
+            pinned[1] += 1
+            member = pinned[0]
+        else:
+            member = self.least_loaded(now)
+            if member is None:
+                return None
+            if client_id:
+                self._clients[client_id] = [member, 1]
+        member.websockets += 1
+        return member
+
+    def close_websocket(self, client_id, member):
+        """
+        Release a WebSocket opened with open_websocket.
+        """
+        member.websockets -= 1
+        pinned = self._clients.get(client_id)
+        if pinned and pinned[0] is member:
+            pinned[1] -= 1
+            if pinned[1] <= 0:
+                del self._clients[client_id]
+
+    def route_request(self, path, query_string, now):
+        """
+        Pick the pod for any other request: the pod that ran the prompt it asks about, the pod of
+        the client named in the query, or else the least loaded pod.
+
+        Returns:
+            PoolMember or None: The pod, or None if no pod is ready
+        """
+        match = HISTORY_PATTERN.match(path)
+        if match:
+            member = self._prompts.get(match.group('prompt_id'))
+            if member is not None and member.ready:
+                return member
+        client_id = parse_qs(query_string).get('clientId', [None])[0]
+        pinned = self._clients.get(client_id)
+        if pinned and pinned[0].routable:
+            return pinned[0]
+        return self.least_loaded(now)
+
+    def scale(self, demand, now):
+        """
+        Decide which pods should be running.
+
+        While anything needs the pool, the first min_pods pods run. Another pod is started when
+        the prompts queued per running pod exceed scale_up_queue_depth, at most every
+        scale_up_cooldown seconds so a pod that is still booting isn't joined by another one. An
+        extra pod is let go once it has had no prompts and no WebSockets for scale_down_idle
+        seconds, latest started first.
+
+        Args:
+            demand: Whether anything needs the pool, e.g. web activity on a proxy
+            now: Current time
+        """
+        extras = self.members[1:]
+        for member in self.members:
+            # A pod that is still starting hasn't had the chance to take prompts yet
+            if member.load(now) or member.websockets or (member.demand.need_pod and not member.ready):
+                member.last_busy = now
+
+        if not demand:
+            for member in extras:
+                member.demand.need_pod = False
+            return
+
+        running = [member for member in self.members if member.pod.pod_running]
+        queued = sum(member.load(now) for member in running)
+        overloaded = queued > self.cfg['scale_up_queue_depth'] * max(len(running), 1)
+
+        for member in extras:
+            if member.index < self.cfg['min_pods']:
+                member.demand.need_pod = True
+            elif not member.demand.need_pod:
+                if overloaded and now - self.last_scale_up >= self.cfg['scale_up_cooldown']:
+                    logger.info(f"{queued} prompts queued on {len(running)} pods, starting {member.name}")
+                    member.demand.need_pod = True
+                    member.last_busy = now
+                    self.last_scale_up = now
+                # Start at most one more pod at a time
+                break
+
+        for member in reversed(extras):
+            if member.index < self.cfg['min_pods'] or not member.demand.need_pod:
+                continue
+            if now - member.last_busy >= self.cfg['scale_down_idle']:
+                logger.info(f"{member.name} has had no prompts for {now - member.last_busy:.0f} seconds, letting it go")
+                member.demand.need_pod = False
+            # Let go of the latest started pod first
+            break
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+
+# SPDX-FileCopyrightText: Copyright (c) 2025 Richard L. Lynch <rich@richlynch.com>
+# SPDX-License-Identifier: MIT
+
+"""Learn when sessions usually start from past activity and start the pod ahead of them."""
+
+import json
+import logging
+import statistics
+import collections
+from time import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+WEEK = 7 * 86400
+
+class UsageProfile:
+    """
+    Record when sessions start and predict upcoming ones from how often a session started in the
+    same weekday and hour in previous weeks. Also keeps the outcome of each pre-warm so the hit
+    rate can be shown.
+
+    A session starts with the first activity after session_gap seconds without any, so a pre-warm
+    doesn't hide the session it was for.
+
+    Args:
+        history_path: JSON file the history is loaded from and saved to
+        weeks: Weeks of history to learn from
+        session_gap: Seconds without activity after which the next activity starts a new session
+    """
+    def __init__(self, history_path, weeks=8, session_gap=1800):
+        self.history_path = Path(history_path)
+        self.weeks = weeks
+        self.session_gap = session_gap
+        # Start of the history, so weeks before anything was recorded aren't counted as unused
+        self.since = time()
+        self.last_activity = 0
+        self.sessions = []
+        self.prewarms = []
+        self.current = None
+        # Next pre-warm waiting for its start time, for the status page
+        self.next_prediction = None
+
+        if self.history_path.exists():
+            try:
+                with open(self.history_path) as history_file:
+                    history = json.load(history_file)
+                self.since = history['since']
+                self.sessions = history['sessions']
+                self.prewarms = history['prewarms']
+            except (OSError, ValueError, KeyError) as ex:
+                logger.error(f"Failed to load usage history from {self.history_path}: {ex}")
+
+    def record_activity(self, now, start_session=True):
+        """
+        Record web or CPU/GPU activity. Called for every request, so only does real work when a
+        session starts.
+
+        Args:
+            now: Time of the activity
+            start_session: False for activity that only keeps a session going, like a job running
+                           on the GPU, which can't begin without a web request
+
+        Returns:
+            bool: True if this activity started a new session
+        """
+        new_session = start_session and now - self.last_activity > self.session_gap
+        self.last_activity = now
+        if start_session and self.current and not self.current['arrival_time']:
+            self.current['arrival_time'] = now
+            self.current['outcome'] = 'hit'
+            logger.info(f"Pre-warm hit: activity {now - self.current['start_time']:.0f} seconds after starting the pod")
+        if new_session:
+            self.sessions.append(now)
+            self.save(now)
+        return new_session
+
+    def save(self, now=None):
+        """
+        Drop history older than the learning window and save the rest to disk.
+        """
+        if now is not None:
+            cutoff = now - self.weeks * WEEK
+            self.sessions = [start for start in self.sessions if start >= cutoff]
+            self.prewarms = [prewarm for prewarm in self.prewarms if prewarm['start_time'] >= cutoff]
+
+        try:
+            tmp_path = self.history_path.with_suffix('.tmp')
+            with open(tmp_path, 'w') as history_file:
+                json.dump({'since': self.since, 'sessions': self.sessions, 'prewarms': self.prewarms},
+                          history_file, indent=1)
+            tmp_path.replace(self.history_path)
+        except OSError as ex:
+            logger.error(f"Failed to save usage history to {self.history_path}: {ex}")
+
+    def slot_probability(self, slot_start, min_weeks):
+        """
+        Get how likely a session is to start in the hour beginning at slot_start, from the same hour
+        in previous weeks.
+
+        Returns:
+            tuple: Fraction of observed weeks with a session start in the hour, or None if fewer
+                   than min_weeks were observed, and the median seconds into the hour they started
+        """
+        week_starts = [slot_start - week * WEEK for week in range(1, self.weeks + 1)]
+        observed = [start for start in week_starts if start >= self.since]
+        if len(observed) < max(min_weeks, 1):
+            return None, None
+
+        offsets = []
+        for start in observed:
+            in_hour = [session - start for session in self.sessions if start <= session < start + 3600]
+            if in_hour:
+                offsets.append(min(in_hour))
+        if not offsets:
+            return 0.0, None
+        return len(offsets) / len(observed), statistics.median(offsets)
+
+    def predict(self, now, min_weeks, confidence, horizon=2 * 3600):
+        """
+        Find the next session predicted to start within horizon seconds.
+
+        Returns:
+            dict: Predicted start time and confidence, or None
+        """
+        hour_start = datetime.fromtimestamp(now).replace(minute=0, second=0, microsecond=0)
+        for hours in range(horizon // 3600 + 1):
+            slot_start = (hour_start + timedelta(hours=hours)).timestamp()
+            probability, offset = self.slot_probability(slot_start, min_weeks)
+            if probability is None or probability < confidence:
+                continue
+            predicted_time = slot_start + offset
+            # Nothing to do if the session already started this hour, the predicted time has passed
+            # or the pod was already pre-warmed for it
+            if predicted_time < now or self.last_activity >= slot_start:
+                continue
+            if any(slot_start <= prewarm['predicted_time'] < slot_start + 3600 for prewarm in self.prewarms):
+                continue
+            return {'time': predicted_time, 'confidence': probability}
+        return None
+
+    def wasted_seconds(self, now):
+        """
+        Get the pod time spent over the last week on pre-warms nobody used.
+        """
+        return sum(prewarm['end_time'] - prewarm['start_time'] for prewarm in self.prewarms
+                   if prewarm['outcome'] == 'miss' and prewarm['end_time'] >= now - WEEK)
+
+    def start_prewarm(self, now, prediction):
+        """
+        Record a pre-warm started for a predicted session.
+        """
+        self.current = {
+            'start_time': now,
+            'predicted_time': prediction['time'],
+            'confidence': prediction['confidence'],
+            'ready_time': None,
+            'arrival_time': None,
+            'end_time': None,
+            'outcome': 'pending',
+        }
+        self.prewarms.append(self.current)
+        self.save(now)
+
+    def backend_ready(self, now):
+        """
+        Record when the backend came up for the pre-warm in progress.
+        """
+        if self.current and not self.current['ready_time']:
+            self.current['ready_time'] = now
+
+    def end_prewarm(self, now):
+        """
+        Finish the pre-warm in progress once the pod is no longer kept running for it. Without any
+        activity in the meantime it was a miss.
+        """
+        if not self.current:
+            return
+        self.current['end_time'] = now
+        if self.current['outcome'] == 'pending':
+            self.current['outcome'] = 'miss'
+            logger.info(f"Pre-warm miss: no activity in {now - self.current['start_time']:.0f} seconds")
+        self.current = None
+        self.save(now)
+
+    def stats(self):
+        """
+        Get the pre-warm counts, hit rate and the cold start time hidden from the user.
+
+        Returns:
+            dict: Counts by outcome, hit rate, and median seconds of startup hidden per hit
+        """
+        outcomes = collections.Counter(prewarm['outcome'] for prewarm in self.prewarms)
+        hidden = []
+        for prewarm in self.prewarms:
+            if prewarm['outcome'] != 'hit':
+                continue
+            # Time the pod spent starting before the user arrived, which they didn't have to wait for
+            ready_time = prewarm['ready_time'] or prewarm['arrival_time']
+            hidden.append(min(ready_time, prewarm['arrival_time']) - prewarm['start_time'])
+        finished = outcomes['hit'] + outcomes['miss']
+        return {
+            'hits': outcomes['hit'],
+            'misses': outcomes['miss'],
+            'ready_on_arrival': sum(1 for prewarm in self.prewarms if prewarm['outcome'] == 'hit'
+                                    and prewarm['ready_time'] and prewarm['ready_time'] <= prewarm['arrival_time']),
+            'hit_rate': outcomes['hit'] / finished if finished else None,
+            'hidden_p50': statistics.median(hidden) if hidden else None,
+        }
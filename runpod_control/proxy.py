@@ -6,12 +6,10 @@
 """Automatically start and stop RunPod pods based on web activity, reverse proxy traffic to
 apps on RunPod pods."""
 
-import os
 import pprint
 import logging
 import contextlib
 import asyncio
-import subprocess
 import argparse
 import socket
 import json
@@ -27,95 +25,84 @@ import aiohttp_jinja2
 
 import runpod
 
+from asset_cache import AssetCache
+from output_cache import OutputCache
 from config import get_config, setup_runpod
-from create import create_pod
-from resume import resume_pod
-from update_ssh_config import get_ssh_ip_port, update_ssh_config
-from destroy import terminate_pod
+from coldstart import ColdStartTracker
+from idle_policy import terminate_after as get_terminate_after
+from metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, Counter, Gauge, ProxyMetrics, render as render_metrics
+from pod_client import create_pod_client
+from pool import PROMPT_PATHS, PodPool, PoolMember, member_name
+from prewarm import UsageProfile
+from request_queue import HeldRequestQueue, QueueFullError
+from readiness import wait_for_pod_running, wait_for_ssh_port, wait_for_tcp_connect, wait_for_backend
+from scheduler import create_scheduler
+from state import ObservableState, StateChange
+from status_events import stream_state
+from sync_engine import SyncEngine
+from tunnel import SSHTunnel
+from ws_relay import handle_websocket_proxy
+from update_ssh_config import update_ssh_config
 from utils import get_pod_info
 
 logger = logging.getLogger(__name__)
 script_dir = Path(__file__).parent
 
-async def handle_websocket_proxy(ws_client, ws_backend_server, state):
+async def handle_http_proxy(request, client_session, backend_url, chunk_size=65536, asset_cache=None,
+                            output_cache=None):
     """
-    Forward WebSocket messages between client and backend server.
+    Forward HTTP requests to the backend server and stream the response back.
 
-    Args:
-        ws_client: WebSocket connection to the client
-        ws_backend_server: WebSocket connection to the backend server
-        state: State object to track activity
-    """
-    async def forward_messages(ws_from, ws_to, direction):
-        try:
-            async for msg in ws_from:
-                state.last_web_activity = time()
-                payload = f' ({msg.data})' if msg.type == aiohttp.WSMsgType.TEXT else ''
-                logger.debug(f'Forwarding {direction}: {msg.type.name}{payload}')
-
-                if msg.type == aiohttp.WSMsgType.TEXT:
-                    await ws_to.send_str(msg.data)
-                elif msg.type == aiohttp.WSMsgType.BINARY:
-                    await ws_to.send_bytes(msg.data)
-                elif msg.type == aiohttp.WSMsgType.PING:
-                    await ws_to.ping()
-                elif msg.type == aiohttp.WSMsgType.PONG:
-                    await ws_to.pong()
-                elif msg.type == aiohttp.WSMsgType.CLOSE:
-                    if not ws_to.closed:
-                        await ws_to.close(code=msg.data, message=msg.extra)
-                    return  # Exit the loop when close is received
-                else:
-                    logger.warning(f'Unknown message type: {msg.type}')
-
-        except Exception as e: # pylint: disable=broad-exception-caught
-            logger.error(f'Error forwarding {direction} messages: {e}')
-        finally:
-            try:
-                if not ws_to.closed:
-                    await ws_to.close()
-            except asyncio.CancelledError:
-                logger.debug('WebSocket cancelled')
-
-    # Create tasks for bidirectional forwarding
-    client_to_server = asyncio.create_task(
-        forward_messages(ws_client, ws_backend_server, "client->server")
-    )
-    server_to_client = asyncio.create_task(
-        forward_messages(ws_backend_server, ws_client, "server->client")
-    )
-
-    # Wait for either direction to complete
-    _, pending = await asyncio.wait(
-        [client_to_server, server_to_client],
-        return_when=asyncio.FIRST_COMPLETED
-    )
-
-    # Cancel remaining tasks
-    for task in pending:
-        task.cancel()
-        try:
-            await task
-        except asyncio.CancelledError:
-            pass
-
-async def handle_http_proxy(request, client_session, backend_url):
-    """
-    Forward HTTP requests to the backend server and return the response.
+    The request body is uploaded to the backend in chunks as it arrives from the client and the
+    response body is written to the client chunk by chunk, so memory use does not grow with the
+    size of uploads or outputs. Each write waits for the client's transport to drain, which
+    propagates backpressure to the backend connection.
 
     Args:
         request: The incoming HTTP request
         client_session: aiohttp ClientSession for making backend requests
         backend_url: URL of the backend server to forward requests to
+        chunk_size: Maximum number of bytes to read from the backend per write
+        asset_cache: Optional AssetCache to revalidate and store static assets in
+        output_cache: Optional OutputCache to store generated outputs in
 
     Returns:
-        web.Response: The response from the backend server
+        web.StreamResponse: The response from the backend server
     """
     drop_headers = ('Content-Encoding', 'Content-Length', 'Connection', 'Upgrade', 'Transfer-Encoding')
 
     headers = {k: v for k, v in request.headers.items() if k not in drop_headers}
-    data = await request.content.read()
+    data = request.content if request.body_exists else None
+
+    # Revalidate a stale cached asset rather than downloading it again, unless the client is
+    # making its own conditional request
+    cache_key = None
+    cache_entry = None
+    revalidating = False
+    if asset_cache is not None and asset_cache.is_cacheable(request):
+        cache_key = request.path_qs
+        cache_entry = asset_cache.lookup(cache_key)
+        if cache_entry and 'If-None-Match' not in headers and 'If-Modified-Since' not in headers:
+            headers.update(asset_cache.revalidation_headers(cache_entry))
+            revalidating = True
+
+    # Revalidate a local copy of an output, answering the client's own conditional request from
+    # the local copy if it is still current
+    output_key = output_cache.output_key(request) if output_cache is not None else None
+    output_path = None
+    if output_key is not None:
+        output_path, output_content_type = output_cache.lookup(output_key)
+        if output_path is not None:
+            validators = output_cache.revalidation_headers(output_key, output_path)
+            if validators:
+                headers = {k: v for k, v in headers.items()
+                           if k.lower() not in ('if-none-match', 'if-modified-since')}
+                headers.update(validators)
+            else:
+                output_path = None
 
+    response = None
+    cache_writer = None
     try:
         async with client_session.request(
             request.method,
@@ -124,18 +111,121 @@ async def handle_http_proxy(request, client_session, backend_url):
             data=data
         ) as backend_response:
 
+            if revalidating and backend_response.status == 304:
+                asset_cache.refresh(cache_entry, backend_response.headers)
+                return asset_cache.response(cache_entry)
+
+            if output_path is not None and backend_response.status == 304:
+                return output_cache.response(output_key, output_path, output_content_type)
+
+            if cache_key is not None:
+                cache_writer = asset_cache.open_writer(cache_key, backend_response)
+            elif output_key is not None:
+                cache_writer = output_cache.open_writer(output_key, request, backend_response)
+
             headers = {k: v for k, v in backend_response.headers.items() if k not in drop_headers}
-            body = await backend_response.content.read()
-
-            # Create client response with backend's data
-            return web.Response(
-                status=backend_response.status,
-                headers=headers,
-                body=body,
-            )
+            response = web.StreamResponse(status=backend_response.status, headers=headers)
+
+            # The client session decompresses the body, so the backend's length only applies if
+            # the body was sent without a content encoding
+            if 'Content-Encoding' not in backend_response.headers and backend_response.content_length is not None:
+                response.content_length = backend_response.content_length
+
+            await response.prepare(request)
+            async for chunk in backend_response.content.iter_chunked(chunk_size):
+                if cache_writer:
+                    try:
+                        cache_writer.write(chunk)
+                    except OSError as ex:
+                        # e.g. the cache disk is full - stop caching but keep serving the client
+                        logger.error(f'Failed to cache {request.path}: {ex}')
+                        cache_writer.abort()
+                        cache_writer = None
+                await response.write(chunk)
+            await response.write_eof()
+            if cache_writer:
+                try:
+                    cache_writer.commit()
+                except OSError as ex:
+                    logger.error(f'Failed to cache {request.path}: {ex}')
+            return response
+
     except (ConnectionResetError, ConnectionError, aiohttp.ClientError) as ex:
+        if response is not None and response.prepared:
+            # Headers have already been sent so the status can't be changed - just drop the
+            # connection to signal the truncated body
+            logger.error(f'Connection error while streaming response: {ex}')
+            if request.transport is not None:
+                request.transport.close()
+            return response
         logger.error(f'Connection error: {ex}')
         return web.Response(status=502, text='Bad Gateway - Connection error')
+    finally:
+        if cache_writer:
+            cache_writer.abort()
+
+# Event stream of the starting page, served by each proxy instead of being forwarded to the backend
+STARTING_EVENTS_PATH = '/.pod_on_demand/starting-events'
+
+@web.middleware
+async def metrics_middleware(request, handler):
+    """
+    Count requests to a proxy and time them, including streaming the response body. WebSocket
+    connections are counted but not timed, as they stay open for the life of the page. The
+    starting page's event stream isn't a proxied request, so it isn't counted.
+    """
+    if request.path == STARTING_EVENTS_PATH:
+        return await handler(request)
+    metrics = request.app['global_state'].metrics
+    name = request.app['name']
+    start_time = time()
+    status = 500
+    try:
+        response = await handler(request)
+        status = response.status
+        return response
+    except web.HTTPException as ex:
+        status = ex.status
+        raise
+    finally:
+        metrics.requests.labels(name, request.method, status).inc()
+        if status != 101:
+            metrics.request_latency.labels(name).observe(time() - start_time)
+
+# ComfyUI checks these after the websocket reconnects
+DONT_WAKE_PATHS = ('/api/queue', '/api/history')
+
+def wakes_pod(raw_path):
+    """
+    Check if a request to this path counts as activity that starts the pod and keeps it running.
+    """
+    return not any(raw_path.startswith(path) for path in DONT_WAKE_PATHS)
+
+def record_web_activity(proxy_state, raw_path, usage=None):
+    """
+    Mark a proxy as active, so the pod is started if needed and kept running for another
+    shutdown_timeout.
+
+    Args:
+        proxy_state: State of the proxy the request came in on
+        raw_path: Path of the request, for logging
+        usage: Optional UsageProfile learning when sessions start
+    """
+    if not proxy_state.need_pod:
+        logger.info(f"{proxy_state.name} web activity detected, starting pod")
+    proxy_state.last_web_activity = time()
+    proxy_state.need_pod = True
+    if usage is not None:
+        usage.record_activity(proxy_state.last_web_activity)
+    logger.debug(f'Web activity: {raw_path}')
+
+def proxy_ready(app):
+    """
+    Check if requests to a proxy can be forwarded: to any ready pod of its pool, or else to the pod.
+    """
+    if app['pool'] is not None:
+        return app['pool'].ready
+    return app['global_state'].ssh.ssh_running and app['state'].backend_ready
 
 async def handle_proxy_request(request):
     """
@@ -147,48 +237,250 @@ async def handle_proxy_request(request):
     Returns:
         web.Response or WebSocketResponse: Appropriate response based on request type
     """
-    # ComfyUI checks these after the websocket reconnects
-    dont_wake_paths = ('/api/queue', '/api/history')
-
     conn = request.headers.get('connection', '').lower()
     upgrade = request.headers.get('upgrade', '').lower()
 
     is_web_socket = 'upgrade' in conn and upgrade == 'websocket' and request.method == 'GET'
 
-    start_pod = not any(request.raw_path.startswith(path) for path in dont_wake_paths)
+    backend_ready = proxy_ready(request.app)
+
+    # Serve static UI assets from the local cache without touching the tunnel or waking the pod
+    asset_cache = request.app['asset_cache']
+    if asset_cache is not None and not is_web_socket and asset_cache.is_cacheable(request):
+        cache_entry = asset_cache.lookup(request.path_qs)
+        if cache_entry and (asset_cache.is_fresh(cache_entry) or not backend_ready):
+            return asset_cache.response(cache_entry)
+
+    # Serve any local copy of an output without waking the pod. While the backend is up, local
+    # copies are revalidated with it instead, as ComfyUI reuses output names.
+    output_cache = request.app['output_cache']
+    output_key = output_cache.output_key(request) if output_cache is not None else None
+    if output_key and not backend_ready:
+        output_path, content_type = output_cache.lookup(output_key)
+        if output_path:
+            return output_cache.response(output_key, output_path, content_type)
+
+    start_pod = wakes_pod(request.raw_path)
     if not is_web_socket and start_pod:
         # Don't start the pod for websocket connections - only for regular HTTP requests
-        if not request.app['state'].need_pod:
-            logger.info(f"{request.app['name']} web activity detected, starting pod")
-        request.app['state'].last_web_activity = time()
-        request.app['state'].need_pod = True
-        logger.debug(f'Web activity: {request.raw_path}')
-
-    if not request.app['global_state'].ssh.ssh_running:
-        # Show starting page while pod is starting up
+        record_web_activity(request.app['state'], request.raw_path, request.app['global_state'].usage)
+
+    # Park API requests from scripts while the backend starts (and while earlier parked requests
+    # are replayed, to keep them in order) instead of answering them with the starting page
+    held_requests = request.app['held_requests']
+    if held_requests is not None and start_pod and not is_web_socket and not is_browser_navigation(request):
+        if not backend_ready or held_requests.busy:
+            return await hold_and_forward_request(request, held_requests)
+
+    if not backend_ready:
+        # Show starting page while pod and backend are starting up
         context = {
             'name': request.app['name'],
+            'stage': starting_state(request.app)['stage'],
+            'events_path': STARTING_EVENTS_PATH,
         }
         response = aiohttp_jinja2.render_template("starting.html", request,
                                         context=context)
         return response
 
-    # Pod and SSH are up - forward request to backend server
+    return await forward_request(request, is_web_socket)
+
+def starting_state(app):
+    """
+    Get the state shown on the starting page: which stage of startup the pod is in, and whether the
+    backend is ready so the page can load it.
+    """
+    global_state = app['global_state']
+    ready = proxy_ready(app)
+    if ready:
+        stage = f"{app['name']} is ready"
+    elif global_state.ssh.ssh_running:
+        stage = f"Waiting for {app['name']} to start on the pod"
+    elif global_state.pod.pod_running:
+        stage = 'Connecting to the pod'
+    else:
+        stage = 'Starting the pod'
+    return {'ready': ready, 'stage': stage}
+
+async def handle_starting_events(request):
+    """
+    Stream the starting page's state, so the page loads the backend as soon as it is ready.
+
+    While the page is open it counts as web activity, as the page it replaces did by refreshing.
+    """
+    app = request.app
+
+    def on_sample():
+        record_web_activity(app['state'], request.raw_path, app['global_state'].usage)
+
+    return await stream_state(request, app['global_state'].change, lambda: starting_state(app),
+                              app['config']['web']['status_events']['interval'], on_sample)
+
+def is_browser_navigation(request):
+    """
+    Check if a request is a browser loading a page, as opposed to an API call from a script or
+    from JavaScript running in the page.
+    """
+    if request.headers.get('Sec-Fetch-Mode', '').lower() == 'navigate':
+        return True
+    return request.method == 'GET' and 'text/html' in request.headers.get('Accept', '')
+
+async def hold_and_forward_request(request, held_requests):
+    """
+    Hold a request until the backend is ready and it is this request's turn, then forward it.
+
+    Args:
+        request: The incoming request
+        held_requests: HeldRequestQueue for this proxy
+
+    Returns:
+        web.StreamResponse: The backend's response, or 503 if the request couldn't be held
+    """
+    logger.info(f"{request.app['name']} backend not ready, holding {request.method} {request.raw_path} "
+                f"({len(held_requests)} already waiting)")
+    try:
+        async with held_requests.hold():
+            return await forward_request(request, is_web_socket=False)
+
+    except QueueFullError:
+        logger.warning(f"{request.app['name']} held request queue is full, rejecting {request.raw_path}")
+        message = 'Backend is starting and too many requests are waiting'
+    except asyncio.TimeoutError:
+        logger.warning(f"{request.app['name']} backend not ready after {held_requests.max_wait} seconds, "
+                       f"giving up on {request.raw_path}")
+        message = 'Backend did not become ready in time'
+
+    return web.json_response({'error': message}, status=503,
+                             headers={'Retry-After': str(request.app['config']['web']['readiness']['max_delay'])})
+
+async def forward_request(request, is_web_socket):
+    """
+    Forward a request to the backend server once the pod, SSH and backend are up.
+
+    Args:
+        request: The incoming request
+        is_web_socket: True if the request is a WebSocket upgrade
+
+    Returns:
+        web.StreamResponse or WebSocketResponse: The backend's response
+    """
+    pool = request.app['pool']
+    if pool is not None:
+        return await forward_to_pool(request, pool, is_web_socket)
+    return await forward_to_port(request, is_web_socket, request.app['port_cfg']['remote_port'])
+
+async def forward_to_pool(request, pool, is_web_socket):
+    """
+    Forward a request to the pod of the pool it belongs on: prompts to the least loaded pod,
+    WebSockets and requests about a client or prompt to the pod they are pinned to.
+
+    Args:
+        request: The incoming request
+        pool: PodPool serving this proxy
+        is_web_socket: True if the request is a WebSocket upgrade
+
+    Returns:
+        web.StreamResponse or WebSocketResponse: The backend's response
+    """
+    now = time()
     remote_port = request.app['port_cfg']['remote_port']
-    backend_url = f"http://127.0.0.1:{remote_port}{request.raw_path}"
+    retry_after = {'Retry-After': str(request.app['config']['web']['readiness']['max_delay'])}
+
+    if is_web_socket:
+        client_id = request.query.get('clientId')
+        member = pool.open_websocket(client_id, now)
+        if member is None:
+            return web.json_response({'error': 'No pod is ready'}, status=503, headers=retry_after)
+        logger.debug(f"WebSocket of client {client_id} on {member.name}")
+        try:
+            return await forward_to_port(request, is_web_socket, remote_port + member.port_offset)
+        finally:
+            pool.close_websocket(client_id, member)
+
+    if request.method == 'POST' and request.path in PROMPT_PATHS:
+        return await forward_prompt(request, pool, now)
+
+    member = pool.route_request(request.path, request.query_string, now)
+    if member is None:
+        return web.json_response({'error': 'No pod is ready'}, status=503, headers=retry_after)
+    return await forward_to_port(request, is_web_socket, remote_port + member.port_offset)
+
+async def forward_prompt(request, pool, now):
+    """
+    Queue a prompt on a pod of the pool, and remember which pod runs it so its history is fetched
+    from there. Prompts are small, so unlike other requests the body isn't streamed.
+
+    Args:
+        request: The incoming POST to /prompt
+        pool: PodPool serving this proxy
+        now: Current time
+
+    Returns:
+        web.Response: The backend's response
+    """
+    body = await request.read()
+    try:
+        client_id = json.loads(body).get('client_id')
+    except (ValueError, AttributeError):
+        # Let ComfyUI reject it
+        client_id = None
+
+    member = pool.route_prompt(client_id, now)
+    if member is None:
+        return web.json_response({'error': 'No pod is ready'}, status=503,
+                                 headers={'Retry-After': str(request.app['config']['web']['readiness']['max_delay'])})
+
+    remote_port = request.app['port_cfg']['remote_port'] + member.port_offset
+    drop_headers = ('Content-Encoding', 'Content-Length', 'Connection', 'Upgrade', 'Transfer-Encoding')
+    headers = {k: v for k, v in request.headers.items() if k not in drop_headers}
+    try:
+        async with request.app['client_session'].post(f"http://127.0.0.1:{remote_port}{request.raw_path}",
+                                                      headers=headers, data=body) as backend_response:
+            response_body = await backend_response.read()
+            response_headers = {k: v for k, v in backend_response.headers.items() if k not in drop_headers}
+    except (ConnectionResetError, ConnectionError, aiohttp.ClientError) as ex:
+        logger.error(f'Connection error queueing prompt on {member.name}: {ex}')
+        return web.Response(status=502, text='Bad Gateway - Connection error')
+
+    try:
+        prompt_id = json.loads(response_body).get('prompt_id')
+    except (ValueError, AttributeError):
+        prompt_id = None
+    if prompt_id:
+        pool.pin_prompt(prompt_id, member)
+        logger.debug(f"Prompt {prompt_id} of client {client_id} queued on {member.name}")
+
+    return web.Response(status=backend_response.status, body=response_body, headers=response_headers)
+
+async def forward_to_port(request, is_web_socket, local_port):
+    """
+    Forward a request to the local end of a tunnel to the backend.
+
+    Args:
+        request: The incoming request
+        is_web_socket: True if the request is a WebSocket upgrade
+        local_port: Local port forwarded to the backend
+
+    Returns:
+        web.StreamResponse or WebSocketResponse: The backend's response
+    """
+    backend_url = f"http://127.0.0.1:{local_port}{request.raw_path}"
 
     client_session = request.app['client_session']
 
     if is_web_socket:
-        ws_client = web.WebSocketResponse()
+        ws_cfg = request.app['config']['web']['websocket']
+        ws_client = web.WebSocketResponse(compress=ws_cfg['client_compress'])
         await ws_client.prepare(request)
         logger.info(f'Client WebSocket connection established to {pprint.pformat(ws_client)}')
 
         try:
-            async with client_session.ws_connect(backend_url, headers={'cookie': request.headers.get('cookie', '')}) as ws_backend_server:
+            async with client_session.ws_connect(backend_url, headers={'cookie': request.headers.get('cookie', '')},
+                                                 compress=15 if ws_cfg['backend_compress'] else 0) as ws_backend_server:
                 logger.info('Upstream WebSocket connection established')
 
-                await handle_websocket_proxy(ws_client, ws_backend_server, request.app['state'])
+                await handle_websocket_proxy(ws_client, ws_backend_server, request.app['state'],
+                                             request.app['global_state'].metrics, ws_cfg)
 
         except Exception as e: # pylint: disable=broad-exception-caught
             logger.error(f'Failed to connect to upstream server: {e}')
@@ -197,21 +489,13 @@ async def handle_proxy_request(request):
         return ws_client
 
     else:
-        return await handle_http_proxy(request, client_session, backend_url)
-
-def is_pod_running(name):
-    """
-    Check if RunPod pod for this application is currently running.
-
-    Returns:
-        bool: True if at least one pod is running, False otherwise
-    """
-    pod = get_pod_info(name)
-    return pod.is_running if pod else False
+        chunk_size = request.app['config']['web']['stream_chunk_size']
+        return await handle_http_proxy(request, client_session, backend_url, chunk_size,
+                                       request.app['asset_cache'], request.app['output_cache'])
 
 async def status_reporter(global_state):
     """
-    Periodically report the status of pod and SSH connections.
+    Report the status of pod and SSH connections when they change, and periodically otherwise.
 
     Args:
         global_state: Global application state containing pod and SSH status
@@ -222,10 +506,11 @@ async def status_reporter(global_state):
     max_report_interval = 60
 
     while True:
+        version = global_state.change.version
         do_report = False
         state_change = False
 
-        if time() - last_report_time > max_report_interval:
+        if time() - last_report_time >= max_report_interval:
             do_report = True
 
         if last_pod_running != global_state.pod.pod_running:
@@ -254,81 +539,123 @@ async def status_reporter(global_state):
             last_pod_running = global_state.pod.pod_running
             last_ssh_running = global_state.ssh.ssh_running
 
-        await asyncio.sleep(1)
+        await global_state.change.wait(version, last_report_time + max_report_interval - time())
 
-def create_or_resume_pod(name):
+async def flush_sync(sync_engine, ssh_state, sync_cfg):
     """
-    Resume an existing pod if it exists or create a new pod.
+    Copy everything not yet synced before the pod goes away, giving up after final_flush_timeout
+    seconds so a stuck transfer can't keep an unused pod running.
     """
+    if sync_engine is None or not ssh_state.ssh_running:
+        return
+    logger.info("Syncing files before shutting down the pod...")
+    try:
+        await asyncio.wait_for(sync_engine.flush(), sync_cfg['final_flush_timeout'])
+    except Exception as ex: # pylint: disable=broad-exception-caught
+        logger.error(f"Final sync failed, shutting down the pod anyway: {ex!r}")
 
-    if get_pod_info(name):
-        return resume_pod()
-    else:
-        return create_pod()
-
-async def monitor_pod(pod_state, proxies_state, ssh_state, config):
+async def monitor_pod(pod_state, proxies_state, ssh_state, pod_client, cold_start, config, sync_engine=None):
     """
     Monitor pod status and automatically start/stop pods based on demand.
 
+    With the 'stop' idle policy, a pod nobody needs is stopped and only terminated once it has
+    been stopped for terminate_after seconds, so short breaks end with a resume rather than a
+    create. If the pod can't be stopped, e.g. because it uses a network volume, it is terminated.
+
     Args:
         pod_state: State object tracking pod status
         proxies_state: List of proxy states to check for pod demand
+        ssh_state: State object tracking SSH status and CPU/GPU demand
+        pod_client: AsyncPodClient used to query and control the pod
+        cold_start: ColdStartTracker timing each phase of pod startup
         config: Application configuration
+        sync_engine: Optional SyncEngine to flush before the pod is stopped or terminated
     """
     last_pod_running_check = 0
-    startup_wait_time = config['web']['startup_wait_time']
+    readiness_cfg = config['web']['readiness']
+    idle_cfg = config['web']['idle_policy']
     check_pod_interval = config['web']['check_pod_interval']
-    periodic_tasks = config['periodic_tasks']
-    for task_name, task in periodic_tasks.items():
-        task['last_run'] = 0
+    # Set while a started pod hasn't been reported running yet, so SSH waits for it
+    pod_starting = False
+
+    def pod_needed():
+        return any(proxy.need_pod for proxy in proxies_state) or ssh_state.need_pod
 
     while True:
+        version = pod_state.change.version
         try:
-            if time() - last_pod_running_check > check_pod_interval:
-                pod_state.pod_running = is_pod_running(config['runpod']['pod']['name'])
+            if time() - last_pod_running_check >= check_pod_interval:
+                pod_state.pod_running = await pod_client.is_pod_running()
                 last_pod_running_check = time()
+            timeout = last_pod_running_check + check_pod_interval - time()
 
-            pod_state.need_ssh = pod_state.pod_running
+            pod_state.need_ssh = pod_state.pod_running and not pod_starting
 
-            need_pod = any(proxy.need_pod for proxy in proxies_state) or ssh_state.need_pod
+            need_pod = pod_needed()
             if need_pod and not pod_state.pod_running:
                 logger.info("Pod is not running, starting pod...")
-                create_or_resume_pod(config['runpod']['pod']['name'])
-                pod_info = get_pod_info(config['runpod']['pod']['name'])
+                cold_start.start()
+                start_kind = await pod_client.create_or_resume_pod()
+                cold_start.mark('create_resume_api', kind=start_kind)
+                pod_info = await pod_client.get_pod_info()
                 pod_state.pod_running = True
                 pod_state.pod_start_time = time()
                 pod_state.cpu_mem_gb = pod_info.cpu_mem_gb
                 pod_state.gpu_mem_gb = pod_info.gpu_mem_gb
-                # Give it a little time to start
-                await asyncio.sleep(startup_wait_time)
-                pod_state.need_ssh = True
+                pod_state.pod_stopped_since = 0
+                pod_starting = True
 
-            if pod_state.pod_running:
-                # Check if any periodic tasks need to run
-                for task_name, task in periodic_tasks.items():
-                    if time() - task['last_run'] >= task['interval']:
-                        logger.debug(f'Running periodic task "{task_name}": {task["command"]}')
-                        cp = subprocess.run(task['command'],
-                                            shell=True, check=False,
-                                            stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-                        if cp.returncode != 0:
-                            for line in cp.stdout.decode('utf-8', errors='ignore').splitlines():
-                                logger.error(f'{task_name}: {line}')
-                            logger.error(f'Periodic task "{task_name}" failed with code {cp.returncode}')
-                        else:
-                            logger.debug(f'Periodic task "{task_name}" completed successfully')
-                        task['last_run'] = time()
+            if pod_starting and need_pod:
+                if not await wait_for_pod_running(pod_client, readiness_cfg, pod_needed):
+                    # Nothing needs the pod any more, or it timed out - decide again rather than
+                    # connecting SSH to a pod that isn't up
+                    continue
+                cold_start.mark('pod_running')
+                pod_starting = False
+                pod_state.need_ssh = True
 
             if pod_state.pod_running and not need_pod:
-                logger.info("Destroying pod...")
-                terminate_pod()
+                cold_start.abort()
+                await flush_sync(sync_engine, ssh_state, config['sync'])
+                if pod_needed():
+                    # Someone came back while the files were syncing
+                    logger.info("Pod is needed again, keeping it running")
+                    continue
+                stop_seconds = get_terminate_after(idle_cfg, config['runpod']['pod'], cold_start)
+                stopped = False
+                if stop_seconds > 0:
+                    logger.info(f"Stopping pod, terminating it if still unused after {stop_seconds/3600:.1f} hours...")
+                    try:
+                        await pod_client.stop_pod()
+                        stopped = True
+                    except Exception as ex: # pylint: disable=broad-exception-caught
+                        logger.warning(f"Failed to stop pod, terminating it instead: {ex}")
+                if not stopped:
+                    logger.info("Destroying pod...")
+                    await pod_client.terminate_pod()
                 pod_state.pod_running = False
+                pod_starting = False
+                pod_state.pod_stopped_since = time() if stopped else 0
                 pod_state.pod_start_time = 0
                 pod_state.cpu_mem_gb = 0
                 pod_state.gpu_mem_gb = 0
                 pod_state.need_ssh = False
 
-            await asyncio.sleep(10)
+            if pod_state.pod_stopped_since and not need_pod:
+                stop_seconds = get_terminate_after(idle_cfg, config['runpod']['pod'], cold_start)
+                stopped_time = time() - pod_state.pod_stopped_since
+                if stopped_time >= stop_seconds:
+                    logger.info(f"Pod has been stopped for {stopped_time/3600:.1f} hours, terminating it...")
+                    # It may have been terminated some other way in the meantime
+                    if await pod_client.get_pod_info(max_age=0):
+                        await pod_client.terminate_pod()
+                    pod_state.pod_stopped_since = 0
+                else:
+                    timeout = min(timeout, stop_seconds - stopped_time)
+
+            # Act as soon as the demand for the pod changes; otherwise only wake to recheck whether
+            # the pod is running or to terminate a stopped pod
+            await pod_state.change.wait(version, timeout)
 
         except Exception as ex: # pylint: disable=broad-exception-caught
             logger.error(f"Error in pod monitoring: {ex}")
@@ -336,9 +663,42 @@ async def monitor_pod(pod_state, proxies_state, ssh_state, config):
             pod_state.need_ssh = False
             await asyncio.sleep(30)
 
-async def handle_ssh_output(proc, ssh_state, ssh_config):
+def apps_busy(ssh_state):
+    """
+    Check if an app on the pod reports work: prompts in ComfyUI's queue, a kohya_ss training job or
+    a model loaded in Ollama.
+    """
+    return bool(ssh_state.comfyui_queue or ssh_state.training_jobs or ssh_state.ollama_models)
+
+def apps_idle(ssh_state):
+    """
+    Check if the apps on the pod report no work. Needs ComfyUI or Ollama to answer, as otherwise
+    only the utilization says whether the pod is in use.
+    """
+    answering = ssh_state.comfyui_queue is not None or ssh_state.ollama_models is not None
+    return answering and not apps_busy(ssh_state)
+
+def clear_status(ssh_state):
+    """
+    Reset the values from status_loop.py once the SSH connection is gone.
+    """
+    for metric in ('cpu_util', 'gpu_util', 'cpu_mem_gb', 'gpu_mem_gb'):
+        setattr(ssh_state, metric, 0)
+    ssh_state.gpus = []
+    for signal in ('training_jobs', 'comfyui_queue', 'comfyui_prompt', 'ollama_models'):
+        setattr(ssh_state, signal, None)
+    ssh_state.apps_idle = False
+
+async def handle_ssh_output(proc, ssh_state, ssh_config, cold_start, usage=None):
     """
     Handle the utilization metrics from status_loop.py on the pod.
+
+    Each line only has the values that changed since the previous one, so values not in a line are
+    kept. Every line, even an empty one, runs the idle check.
+
+    The pod counts as active while an app reports work, even if the job is waiting on e.g. a model
+    download and barely uses the CPU or GPU. When the apps report no work, the shorter
+    app_idle_shutdown_timeout applies instead of shutdown_timeout.
     """
     last_was_active = None
     while True:
@@ -357,101 +717,125 @@ async def handle_ssh_output(proc, ssh_state, ssh_config):
             logger.error(f"{ex}: Failed to decode JSON from SSH output: {line}")
             continue
 
+        cold_start.mark('first_status_line')
         for key, value in data.items():
             setattr(ssh_state, key, value)
 
-        is_active = ssh_state.cpu_util >= ssh_config['cpu_util_threshold'] or ssh_state.gpu_util >= ssh_config['gpu_util_threshold']
+        ssh_state.apps_idle = apps_idle(ssh_state)
+        is_active = apps_busy(ssh_state) or ssh_state.cpu_util >= ssh_config['cpu_util_threshold'] or ssh_state.gpu_util >= ssh_config['gpu_util_threshold']
         if is_active != last_was_active:
             logger.debug(f"CPU/GPU status changed to: {'active' if is_active else 'idle'}")
             last_was_active = is_active
         if is_active:
             if not ssh_state.need_pod:
-                logger.info(f"CPU usage: {ssh_state.cpu_util:.0f}%, GPU usage: {ssh_state.gpu_util:.0f}% - setting need_pod to True")
+                logger.info(f"CPU usage: {ssh_state.cpu_util:.0f}%, GPU usage: {ssh_state.gpu_util:.0f}%, "
+                            f"ComfyUI queue: {ssh_state.comfyui_queue}, training jobs: {ssh_state.training_jobs}, "
+                            f"Ollama models: {ssh_state.ollama_models} - setting need_pod to True")
                 ssh_state.need_pod = True
             ssh_state.last_activity = time()
+            if usage is not None:
+                # Long jobs keep the session going without web requests
+                usage.record_activity(ssh_state.last_activity, start_session=False)
 
         idle_time = time() - ssh_state.last_activity
-        if idle_time > ssh_config['shutdown_timeout'] and ssh_state.need_pod:
+        shutdown_timeout = ssh_config['app_idle_shutdown_timeout'] if ssh_state.apps_idle else ssh_config['shutdown_timeout']
+        if idle_time > shutdown_timeout and ssh_state.need_pod:
             if ssh_state.last_activity:
-                logger.info(f"CPU and GPU have been idle for {idle_time:.0f} seconds, setting need_pod to False")
+                logger.info(f"CPU, GPU{' and apps' if ssh_state.apps_idle else ''} have been idle for {idle_time:.0f} seconds, setting need_pod to False")
             else:
                 logger.info("Immediate shutdown requested, setting need_pod to False for SSH")
             ssh_state.need_pod = False
 
-async def monitor_ssh(ssh_state, pod_state, config):
+async def monitor_ssh(ssh_state, pod_state, pod_client, tunnel, cold_start, config, usage=None):
     """
-    Monitor and maintain SSH port forwarding connections to pod.
+    Monitor and maintain the SSH connection to the pod that carries the forwarded ports and the
+    status command.
 
     Args:
         ssh_state: State object tracking SSH connection status
         pod_state: State object tracking pod status
+        pod_client: AsyncPodClient used to look up the pod's SSH address
+        tunnel: SSHTunnel forwarding the proxied ports over the SSH connection
+        cold_start: ColdStartTracker timing each phase of pod startup
         config: Application configuration containing port forwarding settings
+        usage: Optional UsageProfile to record CPU/GPU activity in
     """
-    metrics = ('cpu_util', 'gpu_util', 'cpu_mem_gb', 'gpu_mem_gb')
+    readiness_cfg = config['web']['readiness']
+    reconnect_delay = config['ssh']['reconnect_delay']
     while True:
+        version = pod_state.change.version
         try:
             if pod_state.need_ssh:
-                ssh_state.ssh_ip, ssh_state.ssh_port = get_ssh_ip_port()
-                if ssh_state.ssh_ip is None or ssh_state.ssh_port is None:
-                    logger.error("SSH IP or port not found, retrying...")
-                    await asyncio.sleep(30)
+                def keep_waiting():
+                    return pod_state.need_ssh
+
+                ssh_address = await wait_for_ssh_port(pod_client, readiness_cfg, keep_waiting)
+                if not ssh_address:
+                    continue
+                cold_start.mark('ssh_port_published')
+                ssh_state.ssh_ip, ssh_state.ssh_port = ssh_address
+                if not await wait_for_tcp_connect(ssh_state.ssh_ip, ssh_state.ssh_port, readiness_cfg, keep_waiting):
                     continue
 
                 logger.debug(f"Seconds since pod start: {time()-pod_state.pod_start_time:.0f}")
                 logger.info(f"Establishing SSH connection to pod at {ssh_state.ssh_ip}:{ssh_state.ssh_port}...")
+                await tunnel.connect(ssh_state.ssh_ip, ssh_state.ssh_port)
+                cold_start.mark('ssh_connected')
                 ssh_state.ssh_running = True
 
-                port_forward_args = []
-                for _, port_cfg in config['web']['proxies'].items():
-                    remote_port = port_cfg['remote_port']
-                    if remote_port:
-                        port_forward_args += ['-L', f'{remote_port}:127.0.0.1:{remote_port}']
-
-                cmd = [
-                    'ssh',
-                    '-o', 'StrictHostKeyChecking=no',
-                    '-o', 'UserKnownHostsFile=/dev/null',
-                    '-o', 'ServerAliveInterval=60',
-                    '-o', 'ServerAliveCountMax=3',
-                    '-o', 'ConnectTimeout=10'
-                ] + port_forward_args + [
-                    '-p', str(ssh_state.ssh_port),
-                    f'root@{ssh_state.ssh_ip}',
-                    config['ssh']['status_command']
-                ]
-                logger.info(f"Running command: {' '.join(cmd)}")
-                proc = await asyncio.create_subprocess_exec(*cmd, preexec_fn=os.setpgrp,
-                                                            stdout=asyncio.subprocess.PIPE,
-                                                            stderr=asyncio.subprocess.STDOUT)
-
-                await handle_ssh_output(proc, ssh_state, config['ssh'])
-                await proc.wait()
+                logger.info(f"Running command: {config['ssh']['status_command']}")
+                proc = await tunnel.run_command(config['ssh']['status_command'])
+
+                await handle_ssh_output(proc, ssh_state, config['ssh'], cold_start, usage)
+                tunnel.disconnect()
                 ssh_state.ssh_running = False
-                for metric in metrics:
-                    setattr(ssh_state, metric, 0)
+                clear_status(ssh_state)
                 logger.info("SSH connection closed.")
-                await asyncio.sleep(10)
+                await asyncio.sleep(reconnect_delay)
             else:
-                await asyncio.sleep(30)
+                await pod_state.change.wait(version)
         except Exception as ex: # pylint: disable=broad-exception-caught
             logger.error(f"Error in SSH monitoring: {ex}")
+            tunnel.disconnect()
             ssh_state.ssh_running = False
-            for metric in metrics:
-                setattr(ssh_state, metric, 0)
-            await asyncio.sleep(30)
+            clear_status(ssh_state)
+            await asyncio.sleep(reconnect_delay)
 
-async def update_ssh_config_task(ssh_state):
+async def sync_files(ssh_state, sync_engine, config):
+    """
+    Run the sync engine for as long as each SSH connection is up.
+
+    Args:
+        ssh_state: State object tracking SSH connection status
+        sync_engine: SyncEngine mirroring the synced directories
+        config: Application configuration
+    """
+    while True:
+        version = ssh_state.change.version
+        if ssh_state.ssh_running:
+            try:
+                await sync_engine.run()
+            except Exception as ex: # pylint: disable=broad-exception-caught
+                logger.error(f"Error in file sync: {ex}")
+            # Don't restart straight away if the index command exits, e.g. because it is missing
+            await asyncio.sleep(config['ssh']['reconnect_delay'])
+        else:
+            await ssh_state.change.wait(version)
+
+async def update_ssh_config_task(ssh_state, pod_client):
     """
     Task to automatically update SSH configuration when SSH connection status changes.
 
     Args:
         ssh_state: State object tracking SSH connection status
+        pod_client: AsyncPodClient used to look up the pod's SSH address
     """
     last_ssh_running = False
     while True:
+        version = ssh_state.change.version
         try:
             if not last_ssh_running and ssh_state.ssh_running:
-                await update_ssh_config(wait=True, replace=True, prompt_replace=False)
+                await update_ssh_config(wait=True, replace=True, prompt_replace=False, pod_client=pod_client)
                 last_ssh_running = True
 
             if last_ssh_running and not ssh_state.ssh_running:
@@ -460,7 +844,7 @@ async def update_ssh_config_task(ssh_state):
         except Exception as ex: # pylint: disable=broad-exception-caught
             logger.error(f"Error in SSH config update: {ex}")
 
-        await asyncio.sleep(5)
+        await ssh_state.change.wait(version)
 
 def immediate_shutdown(global_state):
     """
@@ -471,20 +855,38 @@ def immediate_shutdown(global_state):
     for proxy_state in global_state.proxies:
         proxy_state.last_web_activity = 0
     global_state.ssh.last_activity = 0
+    if global_state.pool is not None:
+        for member in global_state.pool.members[1:]:
+            member.ssh.last_activity = 0
+    # Activity times aren't watched, as they change with every request
+    global_state.change.notify()
 
 async def proxy_idle_detection(app: web.Application):
     """
     Monitor proxy activity and mark pods as not needed after idle timeout.
 
+    Sleeps until the idle or scheduled shutdown deadline, or until the state changes. Web activity
+    only moves the idle deadline later, so it doesn't need to wake this task.
+
+    While the apps on the pod report no work, the shorter ssh.app_idle_shutdown_timeout applies, so
+    an open browser tab that stopped being used doesn't keep an idle pod up.
+
     Args:
         app: The web application instance containing state and configuration
     """
-    shutdown_timeout = app['config']['web']['shutdown_timeout']
+    change = app['global_state'].change
+    ssh_state = app['global_state'].ssh
     while True:
+        version = change.version
+        shutdown_timeout = app['config']['web']['shutdown_timeout']
+        usage = app['global_state'].usage
+        # A pre-warmed pod waits for its user with the full timeout
+        if ssh_state.apps_idle and not (usage.current and usage.current['outcome'] == 'pending'):
+            shutdown_timeout = min(shutdown_timeout, app['config']['ssh']['app_idle_shutdown_timeout'])
         try:
             if app['state'].need_pod and time() - app['state'].last_web_activity > shutdown_timeout:
                 if app['state'].last_web_activity:
-                    logger.info(f"No {app['state'].name} web activity for {app['config']['web']['shutdown_timeout']//60} minutes, setting need_pod to False...")
+                    logger.info(f"No {app['state'].name} web activity for {shutdown_timeout//60} minutes, setting need_pod to False...")
                 else:
                     logger.info(f"Immediate shutdown requested, setting need_pod to False for {app['state'].name}...")
                 app['state'].need_pod = False
@@ -497,7 +899,185 @@ async def proxy_idle_detection(app: web.Application):
         except Exception as ex: # pylint: disable=broad-exception-caught
             logger.error(f"Error in proxy idle detection: {ex}")
 
-        await asyncio.sleep(10)
+        deadlines = []
+        if app['state'].need_pod:
+            deadlines.append(app['state'].last_web_activity + shutdown_timeout)
+        if app['state'].scheduled_shutdown:
+            deadlines.append(app['state'].scheduled_shutdown)
+        # Wake just after the deadline, as the checks above need it to have passed
+        timeout = max(min(deadlines) - time(), 0) + 1 if deadlines else None
+        await change.wait(version, timeout)
+
+def prewarm_lead_time(prewarm_cfg, cold_start):
+    """
+    Get how many seconds before a predicted session to start the pod: the configured lead_time, or
+    else the p95 time for the backend to come up over the cold start history.
+    """
+    if prewarm_cfg['lead_time'] is not None:
+        return prewarm_cfg['lead_time']
+    backend_stats = next(phase_stats for phase_stats in cold_start.stats()
+                         if phase_stats['phase'] == 'first_backend_response')
+    return backend_stats['elapsed_p95'] or 300
+
+async def prewarm_pod(global_state, config):
+    """
+    Start the pod ahead of sessions predicted from the usage history.
+
+    A pre-warm marks the configured proxy active as a web request would, so the pod is started
+    through the usual path and shuts down again after shutdown_timeout if nobody comes. Pre-warms
+    are skipped once those unused ones have cost max_wasted_hours_per_week over the last week.
+
+    Args:
+        global_state: Global application state
+        config: Application configuration
+    """
+    prewarm_cfg = config['web']['prewarm']
+    shutdown_timeout = config['web']['shutdown_timeout']
+    usage = global_state.usage
+    change = global_state.change
+    proxy_state = next(state for state in global_state.proxies if state.name == prewarm_cfg['proxy'])
+    skipped_prediction = None
+
+    while True:
+        version = change.version
+        now = time()
+        # Predictions change on the hour
+        timeout = 3600 - now % 3600
+        try:
+            if usage.current:
+                if proxy_state.backend_ready:
+                    usage.backend_ready(now)
+                if not proxy_state.need_pod:
+                    usage.end_prewarm(now)
+
+            demand = any(state.need_pod for state in global_state.proxies) or global_state.ssh.need_pod
+            usage.next_prediction = None
+            if not usage.current and not demand and not global_state.pod.pod_running:
+                lead_time = prewarm_lead_time(prewarm_cfg, global_state.cold_start)
+                prediction = usage.predict(now, prewarm_cfg['min_weeks'], prewarm_cfg['confidence'],
+                                           horizon=int(lead_time) + 3600)
+                if prediction:
+                    prediction['start_time'] = prediction['time'] - lead_time
+                    usage.next_prediction = prediction
+                    budget = prewarm_cfg['max_wasted_hours_per_week'] * 3600 - usage.wasted_seconds(now)
+                    if now < prediction['start_time']:
+                        timeout = min(timeout, prediction['start_time'] - now)
+                    elif lead_time + shutdown_timeout > budget:
+                        if skipped_prediction != prediction['time']:
+                            logger.info(f"Not pre-warming for predicted session at {format_timestamp(prediction['time'])}: "
+                                        f"unused pre-warms used up the weekly budget")
+                            skipped_prediction = prediction['time']
+                    else:
+                        logger.info(f"Pre-warming pod for {proxy_state.name} session predicted at "
+                                    f"{format_timestamp(prediction['time'])} ({prediction['confidence']:.0%} confidence)")
+                        usage.start_prewarm(now, prediction)
+                        usage.next_prediction = None
+                        proxy_state.last_web_activity = now
+                        proxy_state.need_pod = True
+
+        except Exception as ex: # pylint: disable=broad-exception-caught
+            logger.error(f"Error in pod pre-warming: {ex}")
+
+        await change.wait(version, timeout)
+
+async def backend_readiness(app: web.Application):
+    """
+    Probe the backend through the SSH tunnel once it is up and mark the proxy ready when the
+    backend answers, so requests aren't forwarded to an app that is still starting.
+
+    Args:
+        app: The web application instance containing state and configuration
+    """
+    readiness_cfg = app['config']['web']['readiness']
+    ssh_state = app['global_state'].ssh
+    backend_url = f"http://127.0.0.1:{app['port_cfg']['remote_port']}/"
+
+    def keep_waiting():
+        return ssh_state.ssh_running
+
+    while True:
+        version = ssh_state.change.version
+        retry = False
+        try:
+            if ssh_state.ssh_running and not app['state'].backend_ready:
+                if await wait_for_backend(app['client_session'], backend_url, readiness_cfg, keep_waiting):
+                    logger.info(f"{app['name']} backend is ready")
+                    app['global_state'].cold_start.mark('first_backend_response')
+                    if app['held_requests'] is not None:
+                        app['held_requests'].release_next()
+                    app['state'].backend_ready = True
+                else:
+                    retry = True
+            elif not ssh_state.ssh_running:
+                app['state'].backend_ready = False
+
+        except Exception as ex: # pylint: disable=broad-exception-caught
+            logger.error(f"Error in {app['name']} backend readiness check: {ex}")
+            retry = True
+
+        # Nothing to do until SSH connects or disconnects, unless the backend never answered
+        await ssh_state.change.wait(version, readiness_cfg['initial_delay'] if retry else None)
+
+async def pool_member_readiness(member, remote_port, config):
+    """
+    Probe the backend on an extra pod of the pool through its tunnel once it is up, like
+    backend_readiness does for the first pod.
+
+    Args:
+        member: PoolMember of the pod
+        remote_port: Port of the pool's proxy on the pod
+        config: Application configuration
+    """
+    readiness_cfg = config['web']['readiness']
+    ssh_state = member.ssh
+    backend_url = f"http://127.0.0.1:{remote_port + member.port_offset}/"
+
+    def keep_waiting():
+        return ssh_state.ssh_running
+
+    async with aiohttp.ClientSession() as client_session:
+        while True:
+            version = ssh_state.change.version
+            retry = False
+            try:
+                if ssh_state.ssh_running and not member.backend_ready:
+                    if await wait_for_backend(client_session, backend_url, readiness_cfg, keep_waiting):
+                        logger.info(f"{member.name} backend is ready")
+                        member.cold_start.mark('first_backend_response')
+                        member.backend_ready = True
+                        # Not a watched attribute, but the starting page and the pool check it
+                        ssh_state.change.notify()
+                    else:
+                        retry = True
+                elif not ssh_state.ssh_running:
+                    member.backend_ready = False
+
+            except Exception as ex: # pylint: disable=broad-exception-caught
+                logger.error(f"Error in {member.name} backend readiness check: {ex}")
+                retry = True
+
+            await ssh_state.change.wait(version, readiness_cfg['initial_delay'] if retry else None)
+
+async def scale_pool(global_state, config):
+    """
+    Start and let go of the extra pods of the pool as the prompts queued on the pods change, for as
+    long as anything needs the first pod.
+
+    Args:
+        global_state: Global application state with the pool
+        config: Application configuration
+    """
+    pool = global_state.pool
+    while True:
+        version = global_state.change.version
+        try:
+            demand = any(proxy.need_pod for proxy in global_state.proxies) or global_state.ssh.need_pod
+            pool.scale(demand, time())
+        except Exception as ex: # pylint: disable=broad-exception-caught
+            logger.error(f"Error in pool scaling: {ex}")
+
+        # Queue depths change without notifying, so check them every check_interval seconds
+        await global_state.change.wait(version, config['pool']['check_interval'])
 
 async def background_tasks(app: web.Application):
     """
@@ -512,6 +1092,7 @@ async def background_tasks(app: web.Application):
     for name, key in app['state'].app_keys.items():
         coro = {
             'proxy_idle_detection': proxy_idle_detection,
+            'backend_readiness': backend_readiness,
         }[name]
         app[key] = asyncio.create_task(coro(app))
 
@@ -551,6 +1132,140 @@ async def handle_immediate_shutdown(request):
     immediate_shutdown(request.app['global_state'])
     return web.json_response({'status': 'success'})
 
+async def handle_cold_starts(request):
+    """API endpoint returning cold start phase latencies and history"""
+    cold_start = request.app['global_state'].cold_start
+    return web.json_response({
+        'in_progress': cold_start.current,
+        'stats': cold_start.stats(),
+        'history': cold_start.history,
+    })
+
+def collect_state_metrics(global_state):
+    """
+    Sample pod, SSH, tunnel, cache and task state as metrics.
+
+    Returns:
+        list: Metric objects holding the current values
+    """
+    pod_running = Gauge('pod_on_demand_pod_running', 'Whether the pod is running')
+    pod_running.labels().set(global_state.pod.pod_running)
+    pod_stopped = Gauge('pod_on_demand_pod_stopped', 'Whether the pod is stopped by the idle policy, waiting to be resumed or terminated')
+    pod_stopped.labels().set(bool(global_state.pod.pod_stopped_since))
+    pod_uptime = Gauge('pod_on_demand_pod_uptime_seconds', 'Seconds since the pod started')
+    pod_uptime.labels().set(time() - global_state.pod.pod_start_time if global_state.pod.pod_running else 0)
+    ssh_running = Gauge('pod_on_demand_ssh_connected', 'Whether the SSH connection to the pod is up')
+    ssh_running.labels().set(global_state.ssh.ssh_running)
+
+    # Values streamed from status_loop.py on the pod
+    utilization = Gauge('pod_on_demand_utilization_percent', 'CPU and GPU utilization on the pod',
+                        ('device',))
+    utilization.labels('cpu').set(global_state.ssh.cpu_util)
+    utilization.labels('gpu').set(global_state.ssh.gpu_util)
+    memory_used = Gauge('pod_on_demand_memory_used_gb', 'Memory in use on the pod', ('device',))
+    memory_used.labels('cpu').set(global_state.ssh.cpu_mem_gb)
+    memory_used.labels('gpu').set(global_state.ssh.gpu_mem_gb)
+    gpu_utilization = Gauge('pod_on_demand_gpu_utilization_percent', 'Utilization of each GPU on the pod', ('gpu',))
+    gpu_memory_used = Gauge('pod_on_demand_gpu_memory_used_gb', 'Memory in use on each GPU on the pod', ('gpu',))
+    for index, (gpu_util, gpu_mem_gb) in enumerate(global_state.ssh.gpus):
+        gpu_utilization.labels(str(index)).set(gpu_util)
+        gpu_memory_used.labels(str(index)).set(gpu_mem_gb)
+    app_work = Gauge('pod_on_demand_app_work', 'Work reported by the apps on the pod: ComfyUI prompts queued or '
+                     'running, kohya_ss training jobs and Ollama models loaded', ('app',))
+    # Older versions of status_loop.py don't report the apps
+    if global_state.ssh.training_jobs is not None:
+        app_work.labels('comfyui').set(global_state.ssh.comfyui_queue or 0)
+        app_work.labels('kohya_ss').set(global_state.ssh.training_jobs)
+        app_work.labels('ollama').set(len(global_state.ssh.ollama_models or []))
+    memory_total = Gauge('pod_on_demand_memory_total_gb', 'Memory available on the pod', ('device',))
+    memory_total.labels('cpu').set(global_state.pod.cpu_mem_gb)
+    memory_total.labels('gpu').set(global_state.pod.gpu_mem_gb)
+
+    need_pod = Gauge('pod_on_demand_proxy_need_pod', 'Whether the proxy is keeping the pod running',
+                     ('proxy',))
+    backend_ready = Gauge('pod_on_demand_proxy_backend_ready', 'Whether the backend answers through the tunnel',
+                          ('proxy',))
+    bytes_sent = Counter('pod_on_demand_tunnel_sent_bytes_total', 'Bytes sent to the pod through the tunnel',
+                         ('proxy',))
+    bytes_received = Counter('pod_on_demand_tunnel_received_bytes_total',
+                             'Bytes received from the pod through the tunnel', ('proxy',))
+    channels = Counter('pod_on_demand_tunnel_channels_total', 'SSH channels opened through the tunnel',
+                       ('proxy', 'result'))
+    for proxy_state in global_state.proxies:
+        need_pod.labels(proxy_state.name).set(proxy_state.need_pod)
+        if not proxy_state.remote_port:
+            continue
+        backend_ready.labels(proxy_state.name).set(proxy_state.backend_ready)
+        stats = global_state.tunnel.stats[proxy_state.remote_port]
+        bytes_sent.labels(proxy_state.name).set(stats.bytes_sent)
+        bytes_received.labels(proxy_state.name).set(stats.bytes_received)
+        channels.labels(proxy_state.name, 'opened').set(stats.channels_opened)
+        channels.labels(proxy_state.name, 'failed').set(stats.channels_failed)
+
+    cold_starts = Counter('pod_on_demand_cold_starts_total', 'Pod cold starts since the proxy started',
+                          ('kind', 'outcome'))
+    for (kind, outcome), count in global_state.cold_start.finished.items():
+        cold_starts.labels(kind, outcome).set(count)
+    cold_start_in_progress = Gauge('pod_on_demand_cold_start_in_progress', 'Whether a cold start is in progress')
+    cold_start_in_progress.labels().set(global_state.cold_start.current is not None)
+    cold_start_elapsed = Gauge('pod_on_demand_cold_start_phase_elapsed_seconds',
+                               'Seconds from the start of a cold start until each phase completed, over the history',
+                               ('phase', 'quantile'))
+    for phase_stats in global_state.cold_start.stats():
+        if phase_stats['count']:
+            cold_start_elapsed.labels(phase_stats['phase'], '0.5').set(phase_stats['elapsed_p50'])
+            cold_start_elapsed.labels(phase_stats['phase'], '0.95').set(phase_stats['elapsed_p95'])
+
+    prewarms = Counter('pod_on_demand_prewarms_total', 'Pre-warms for predicted sessions by outcome', ('outcome',))
+    prewarm_stats = global_state.usage.stats()
+    prewarms.labels('hit').set(prewarm_stats['hits'])
+    prewarms.labels('miss').set(prewarm_stats['misses'])
+
+    task_runs = Counter('pod_on_demand_task_runs_total', 'Runs of each periodic task', ('task',))
+    task_skips = Counter('pod_on_demand_task_skips_total', 'Periodic task runs skipped because the previous run was still going', ('task',))
+    task_exit_code = Gauge('pod_on_demand_task_last_exit_code', 'Exit code of the last run of each periodic task', ('task',))
+    for task in global_state.tasks:
+        task_runs.labels(task.name).set(task.run_count)
+        task_skips.labels(task.name).set(task.skip_count)
+        if task.last_exit_code is not None:
+            task_exit_code.labels(task.name).set(task.last_exit_code)
+
+    sync_files = Counter('pod_on_demand_sync_files_total', 'Files transferred by the sync engine', ('direction',))
+    sync_bytes = Counter('pod_on_demand_sync_bytes_total', 'Bytes transferred by the sync engine', ('direction',))
+    sync_failures = Counter('pod_on_demand_sync_failures_total', 'Failed sync transfers')
+    sync_pending = Gauge('pod_on_demand_sync_pending_files', 'Files waiting to be transferred by the sync engine')
+    if global_state.sync is not None:
+        sync_stats = global_state.sync.stats
+        sync_files.labels('download').set(sync_stats.files_downloaded)
+        sync_files.labels('upload').set(sync_stats.files_uploaded)
+        sync_bytes.labels('download').set(sync_stats.bytes_downloaded)
+        sync_bytes.labels('upload').set(sync_stats.bytes_uploaded)
+        sync_failures.labels().set(sync_stats.failures)
+        sync_pending.labels().set(global_state.sync.pending)
+
+    pool_running = Gauge('pod_on_demand_pool_pod_running', 'Whether each pod of the pool is running', ('pod',))
+    pool_ready = Gauge('pod_on_demand_pool_pod_ready', 'Whether each pod of the pool takes requests', ('pod',))
+    pool_queued = Gauge('pod_on_demand_pool_prompts_queued', 'Prompts queued or running on each pod of the pool',
+                        ('pod',))
+    if global_state.pool is not None:
+        now = time()
+        for member in global_state.pool.members:
+            pool_running.labels(member.name).set(member.pod.pod_running)
+            pool_ready.labels(member.name).set(member.ready)
+            pool_queued.labels(member.name).set(member.load(now))
+
+    return [pod_running, pod_stopped, pod_uptime, ssh_running, utilization, memory_used, memory_total,
+            gpu_utilization, gpu_memory_used, app_work, need_pod,
+            backend_ready, bytes_sent, bytes_received, channels, cold_starts, cold_start_in_progress,
+            cold_start_elapsed, prewarms, task_runs, task_skips, task_exit_code,
+            sync_files, sync_bytes, sync_failures, sync_pending, pool_running, pool_ready, pool_queued]
+
+async def handle_metrics(request):
+    """API endpoint exposing proxy and pod metrics in the Prometheus text format"""
+    global_state = request.app['global_state']
+    text = render_metrics(global_state.metrics.all() + collect_state_metrics(global_state))
+    return web.Response(body=text.encode('utf-8'), headers={'Content-Type': METRICS_CONTENT_TYPE})
+
 def format_timestamp(timestamp):
     """
     Format a unix timestamp into a human-readable string.
@@ -567,16 +1282,32 @@ def format_duration(raw_seconds):
     minutes, seconds = divmod(remainder, 60)
     return f"{int(hours):02d}:{int(minutes):02d}:{int(seconds):02d}"
 
-async def handle_status(request):
+def indicator_class(running):
     """
-    Serve the status page with current pod and SSH information.
+    Get the CSS class of a status indicator for something that is either running or not.
     """
-    global_state = request.app['global_state']
+    return 'status-running' if running else 'status-stopped'
+
+def status_context(app):
+    """
+    Collect the current pod and SSH information shown on the status page.
+
+    Only plain values are used, so the same context can be rendered by the template or sent to
+    an open page as JSON.
+    """
+    global_state = app['global_state']
+    config = app['config']
 
     # Calculate uptime if pod is running
     pod_uptime = None
+    pod_status = 'Terminated'
     if global_state.pod.pod_running:
         pod_uptime = format_duration(time() - global_state.pod.pod_start_time)
+        pod_status = 'Running'
+    elif global_state.pod.pod_stopped_since:
+        terminate_time = global_state.pod.pod_stopped_since + get_terminate_after(
+            config['web']['idle_policy'], config['runpod']['pod'], global_state.cold_start)
+        pod_status = f'Stopped, terminating at {format_timestamp(terminate_time)} if unused'
 
     proxies = []
     for proxy_state in global_state.proxies:
@@ -586,9 +1317,20 @@ async def handle_status(request):
             minutes_ago = (time() - proxy_state.last_web_activity) / 60
             last_web_activity = f"{minutes_ago:.1f} minutes ago"
 
+        channel_stats = global_state.tunnel.stats.get(proxy_state.remote_port)
+        tunnel_info = None
+        if channel_stats:
+            avg_latency = channel_stats.avg_open_latency
+            tunnel_info = {
+                'channels': f'{channel_stats.channels_active} active / {channel_stats.channels_opened} opened / {channel_stats.channels_failed} failed',
+                'bytes': f'{channel_stats.bytes_sent/1e6:.1f}MB sent / {channel_stats.bytes_received/1e6:.1f}MB received',
+                'open_latency': f'{avg_latency*1000:.0f}ms avg / {channel_stats.max_open_latency*1000:.0f}ms max' if avg_latency is not None else None,
+            }
+
         proxies.append({
             'name': proxy_state.name,
-            'active': global_state.ssh.ssh_running, # TODO
+            'tunnel': tunnel_info,
+            'indicator': indicator_class(global_state.ssh.ssh_running and proxy_state.backend_ready),
             'last_activity_time': last_web_activity,
             'local_port': proxy_state.local_port,
             'remote_port': proxy_state.remote_port,
@@ -599,8 +1341,122 @@ async def handle_status(request):
         minutes_ago = (time() - global_state.ssh.last_activity) / 60
         last_pod_activity = f"{minutes_ago:.1f} minutes ago"
 
-    context = {
+    tasks = []
+    for task in global_state.tasks:
+        if task.running:
+            task_status = 'Running'
+        elif task.last_timed_out:
+            task_status = 'Timed out'
+        elif task.last_exit_code is None:
+            task_status = 'Not run'
+        else:
+            task_status = f'Exit code {task.last_exit_code}'
+
+        task_ok = task.last_exit_code == 0 and not task.last_timed_out
+        tasks.append({
+            'name': task.name,
+            'indicator': 'status-unknown' if task_status == 'Not run' else indicator_class(task_ok),
+            'status': task_status,
+            'last_run_time': format_timestamp(task.last_run),
+            'last_duration': f'{task.last_duration:.1f} seconds' if task.last_duration is not None else None,
+            'last_output_size': f'{task.last_output_size} bytes' if task.last_output_size is not None else None,
+            'skip_count': task.skip_count,
+        })
+
+    def format_seconds(seconds):
+        return f'{seconds:.1f}s' if seconds is not None else 'N/A'
+
+    cold_start_stats = []
+    for phase_stats in global_state.cold_start.stats():
+        cold_start_stats.append({
+            'phase': phase_stats['phase'],
+            'count': phase_stats['count'],
+            'duration_p50': format_seconds(phase_stats['duration_p50']),
+            'duration_p95': format_seconds(phase_stats['duration_p95']),
+            'elapsed_p50': format_seconds(phase_stats['elapsed_p50']),
+            'elapsed_p95': format_seconds(phase_stats['elapsed_p95']),
+        })
+
+    usage = global_state.usage
+    prewarm_stats = usage.stats()
+    next_prediction = usage.next_prediction
+    next_session = None
+    if next_prediction:
+        next_session = (f"{format_timestamp(next_prediction['time'])} ({next_prediction['confidence']:.0%}), "
+                        f"starting pod at {format_timestamp(next_prediction['start_time'])}")
+    prewarm = {
+        'enabled': config['web']['prewarm']['enabled'],
+        'indicator': ('status-starting' if usage.current is not None
+                      else 'status-running' if config['web']['prewarm']['enabled'] else 'status-unknown'),
+        'next_session': next_session,
+        'hits': prewarm_stats['hits'],
+        'misses': prewarm_stats['misses'],
+        'ready_on_arrival': prewarm_stats['ready_on_arrival'],
+        'hit_rate': f"{prewarm_stats['hit_rate']:.0%}" if prewarm_stats['hit_rate'] is not None else 'N/A',
+        'hidden_p50': format_seconds(prewarm_stats['hidden_p50']),
+        'wasted_hours': f"{usage.wasted_seconds(time()) / 3600:.1f}/{config['web']['prewarm']['max_wasted_hours_per_week']}",
+        'recent': [{
+            'start_time': format_timestamp(entry['start_time']),
+            'predicted_time': format_timestamp(entry['predicted_time']),
+            'confidence': f"{entry['confidence']:.0%}",
+            'outcome': entry['outcome'],
+            'arrival': format_seconds(entry['arrival_time'] - entry['start_time']) if entry['arrival_time'] else None,
+        } for entry in reversed(usage.prewarms[-10:])],
+    }
+
+    sync = None
+    if global_state.sync is not None:
+        sync_stats = global_state.sync.stats
+        if sync_stats.watching:
+            sync_status = f'Following changes, {global_state.sync.pending} files pending'
+        else:
+            sync_status = 'Waiting for SSH'
+        sync = {
+            'indicator': indicator_class(sync_stats.watching),
+            'status': sync_status,
+            'downloaded': f'{sync_stats.files_downloaded} files / {sync_stats.bytes_downloaded/1e6:.1f}MB',
+            'uploaded': f'{sync_stats.files_uploaded} files / {sync_stats.bytes_uploaded/1e6:.1f}MB',
+            'last_transfer_time': format_timestamp(sync_stats.last_transfer),
+            'last_flush': (f'{format_timestamp(sync_stats.last_flush)} ({format_seconds(sync_stats.last_flush_duration)})'
+                           if sync_stats.last_flush else None),
+            'failures': sync_stats.failures,
+            'last_error': sync_stats.last_error,
+        }
+
+    pool = None
+    if global_state.pool is not None:
+        now = time()
+        pool = []
+        for member in global_state.pool.members:
+            if member.ready:
+                member_status = 'Ready'
+            elif member.pod.pod_running or member.demand.need_pod:
+                member_status = 'Starting'
+            else:
+                member_status = 'Stopped'
+            pool.append({
+                'name': member.name,
+                'indicator': {'Ready': 'status-running', 'Starting': 'status-starting'}.get(member_status, 'status-stopped'),
+                'status': member_status,
+                'queued': member.load(now),
+                'websockets': member.websockets,
+            })
+
+    app_status = None
+    if global_state.ssh.training_jobs is not None:
+        ssh_state = global_state.ssh
+        app_status = ', '.join([
+            f"ComfyUI {f'{ssh_state.comfyui_queue} queued' if ssh_state.comfyui_queue is not None else 'not answering'}",
+            f"{ssh_state.training_jobs} training jobs",
+            f"Ollama {', '.join(ssh_state.ollama_models) or 'no models loaded'}" if ssh_state.ollama_models is not None
+            else 'Ollama not answering',
+        ])
+
+    scheduled_shutdown = app['state'].scheduled_shutdown
+    return {
         'pod_running': global_state.pod.pod_running,
+        'pod_indicator': indicator_class(global_state.pod.pod_running),
+        'pod_status': pod_status,
         'pod_start_time': format_timestamp(global_state.pod.pod_start_time),
         'pod_uptime': pod_uptime,
         'pod_last_activity_time': last_pod_activity,
@@ -608,16 +1464,37 @@ async def handle_status(request):
         'gpu_util': f'{global_state.ssh.gpu_util:.0f}%',
         'cpu_mem': f'{global_state.ssh.cpu_mem_gb:.1f}/{global_state.pod.cpu_mem_gb:.1f}GB',
         'gpu_mem': f'{global_state.ssh.gpu_mem_gb:.1f}/{global_state.pod.gpu_mem_gb:.1f}GB',
+        'app_status': app_status,
         'ssh_running': global_state.ssh.ssh_running,
+        'ssh_indicator': indicator_class(global_state.ssh.ssh_running),
+        'ssh_status': 'Connected' if global_state.ssh.ssh_running else 'Disconnected',
         'ssh_ip': global_state.ssh.ssh_ip,
         'ssh_port': global_state.ssh.ssh_port,
-        'scheduled_shutdown_time': format_timestamp(request.app['state'].scheduled_shutdown) if request.app['state'].scheduled_shutdown else None,
-        'shutdown_countdown': format_duration(request.app['state'].scheduled_shutdown - time()) if request.app['state'].scheduled_shutdown else None,
+        'scheduled_shutdown_time': format_timestamp(scheduled_shutdown) if scheduled_shutdown else None,
+        'shutdown_countdown': format_duration(scheduled_shutdown - time()) if scheduled_shutdown else None,
         'proxies': proxies,
+        'tasks': tasks,
+        'cold_start_stats': cold_start_stats,
+        'cold_start_indicator': 'status-starting' if global_state.cold_start.current is not None else 'status-unknown',
+        'prewarm': prewarm,
+        'sync': sync,
+        'pool': pool,
         'current_time': format_timestamp(time())
     }
 
-    return aiohttp_jinja2.render_template('status.html', request, context)
+async def handle_status(request):
+    """
+    Serve the status page with current pod and SSH information.
+    """
+    return aiohttp_jinja2.render_template('status.html', request, status_context(request.app))
+
+async def handle_status_events(request):
+    """
+    Stream changes to the status page's information, so open pages update in place.
+    """
+    app = request.app
+    return await stream_state(request, app['global_state'].change, lambda: status_context(app),
+                              app['config']['web']['status_events']['interval'])
 
 async def create_app(name, port_cfg, global_state, proxy_state, config):
     """
@@ -631,7 +1508,7 @@ async def create_app(name, port_cfg, global_state, proxy_state, config):
     Returns:
         web.Application: Configured web application
     """
-    app = web.Application()
+    app = web.Application(middlewares=[metrics_middleware] if port_cfg['remote_port'] else [])
 
     app['name'] = name
     app['config'] = config
@@ -639,6 +1516,30 @@ async def create_app(name, port_cfg, global_state, proxy_state, config):
     app['global_state'] = global_state
     app['state'] = proxy_state
     app['client_session'] = aiohttp.ClientSession()
+    app['pool'] = None
+    if global_state.pool is not None and name == config['pool']['proxy']:
+        app['pool'] = global_state.pool
+
+    cache_cfg = config['web']['asset_cache']
+    app['asset_cache'] = None
+    if port_cfg['remote_port'] and cache_cfg['enabled']:
+        app['asset_cache'] = AssetCache(script_dir / cache_cfg['path'] / name,
+                                        max_bytes=cache_cfg['max_size_mb'] * 10**6,
+                                        max_entry_bytes=cache_cfg['max_entry_size_mb'] * 10**6,
+                                        default_max_age=cache_cfg['default_max_age'],
+                                        extensions=cache_cfg['extensions'])
+
+    output_cfg = config['web']['output_cache']
+    app['output_cache'] = None
+    if port_cfg['remote_port'] and port_cfg.get('output_cache') and output_cfg['enabled']:
+        app['output_cache'] = OutputCache(script_dir / output_cfg['path'] / name,
+                                          synced_output_dir=script_dir / port_cfg['output_cache'],
+                                          max_bytes=output_cfg['max_size_mb'] * 10**6)
+
+    hold_cfg = config['web']['hold_requests']
+    app['held_requests'] = None
+    if port_cfg['remote_port'] and hold_cfg['enabled']:
+        app['held_requests'] = HeldRequestQueue(hold_cfg['max_queue'], hold_cfg['max_wait'])
 
     aiohttp_jinja2.setup(app, loader=jinja2.FileSystemLoader(script_dir / 'templates'))
 
@@ -648,21 +1549,165 @@ async def create_app(name, port_cfg, global_state, proxy_state, config):
     app.on_cleanup.append(cleanup_session)
 
     if app['port_cfg']['remote_port']:
+        app.router.add_get(STARTING_EVENTS_PATH, handle_starting_events)
         app.router.add_route('*', '/{path:.*}', handle_proxy_request)
     else:
         app.router.add_get('/', lambda request: web.HTTPFound('/status'))
         app.router.add_get('/status', handle_status)
+        app.router.add_get('/api/status-events', handle_status_events)
         app.router.add_post('/api/schedule-shutdown', handle_schedule_shutdown)
         app.router.add_post('/api/cancel-shutdown', handle_cancel_shutdown)
         app.router.add_post('/api/immediate-shutdown', handle_immediate_shutdown)
+        app.router.add_get('/api/cold-starts', handle_cold_starts)
+        app.router.add_get('/metrics', handle_metrics)
 
-    for name in ('proxy_idle_detection',):
+    task_names = ['proxy_idle_detection']
+    if app['port_cfg']['remote_port']:
+        task_names.append('backend_readiness')
+    for name in task_names:
         app['state'].app_keys[name] = web.AppKey(name, asyncio.Task[None])
 
     app.cleanup_ctx.append(background_tasks)
 
     return app
 
+def create_pod_state(change, initial_pod_info):
+    """
+    Create the state tracking a pod.
+
+    Args:
+        change: StateChange notified when the pod comes up or goes down
+        initial_pod_info: Pod info at startup, or None if there is no pod
+    """
+    initial_pod_running = initial_pod_info.is_running if initial_pod_info else False
+    return ObservableState(
+        change, ('pod_running', 'need_ssh'),
+        pod_running=initial_pod_running,
+        pod_start_time=time() if initial_pod_running else 0,
+        # When the idle policy stopped the pod, or 0. A pod already stopped at startup may have
+        # been stopped by hand, so it is never terminated unless this proxy stops it again.
+        pod_stopped_since=0,
+        cpu_mem_gb=initial_pod_info.cpu_mem_gb if initial_pod_info else 0,
+        gpu_mem_gb=initial_pod_info.gpu_mem_gb if initial_pod_info else 0,
+        need_ssh=initial_pod_running,
+    )
+
+def create_ssh_state(change):
+    """
+    Create the state tracking the SSH connection to a pod and the status lines received over it.
+
+    Args:
+        change: StateChange notified when SSH connects or disconnects or the demand changes
+    """
+    return ObservableState(
+        change, ('ssh_running', 'need_pod', 'apps_idle'),
+        ssh_running=False,
+        cpu_util=0, gpu_util=0, cpu_mem_gb=0, gpu_mem_gb=0,
+        # (utilization, memory GB) of each GPU
+        gpus=[],
+        # Apps' busy signals, None until status_loop.py reports them
+        training_jobs=None, comfyui_queue=None, comfyui_prompt=None, ollama_models=None,
+        # Whether the apps report no work, which shortens the idle timeouts
+        apps_idle=False,
+        last_activity=0, need_pod=False,
+        ssh_ip=None, ssh_port=None,
+    )
+
+def create_global_state(config, initial_pod_info, tasks):
+    """
+    Create the state shared by the proxies and the monitoring tasks, with one proxy state per
+    configured proxy.
+
+    Args:
+        config: Full configuration
+        initial_pod_info: Pod info at startup, or None if there is no pod
+        tasks: PeriodicTask objects shown on the status page
+
+    Returns:
+        SimpleNamespace: Global application state
+    """
+    initial_pod_running = initial_pod_info.is_running if initial_pod_info else False
+
+    # Tasks wait on this instead of polling; it fires when the demand for the pod, the pod, SSH or
+    # a backend comes up or goes down
+    change = StateChange()
+    global_state = SimpleNamespace(
+        change=change,
+        pod=create_pod_state(change, initial_pod_info),
+        ssh=create_ssh_state(change),
+        proxies=[],
+        tasks=tasks,
+        metrics=ProxyMetrics(),
+        tunnel=SSHTunnel([port_cfg['remote_port'] for port_cfg in config['web']['proxies'].values()
+                          if port_cfg['remote_port']], config['ssh']),
+        cold_start=ColdStartTracker(script_dir / config['web']['cold_start_history']['path'],
+                                    config['web']['cold_start_history']['max_entries']),
+        usage=UsageProfile(script_dir / config['web']['prewarm']['path'], config['web']['prewarm']['weeks'],
+                           session_gap=config['web']['shutdown_timeout']),
+        sync=None,
+        # Set by create_pool if the pool is enabled
+        pool=None,
+    )
+    if config['sync']['enabled']:
+        global_state.sync = SyncEngine(global_state.tunnel, config['sync'], script_dir / config['sync']['local_root'],
+                                       script_dir / config['sync']['manifest_path'])
+
+    for port_name, port_cfg in config['web']['proxies'].items():
+        # Keep the pod running if it was running at startup
+        proxy_state = ObservableState(
+            change, ('need_pod', 'scheduled_shutdown', 'backend_ready'),
+            need_pod=initial_pod_running,
+            last_web_activity=time() if initial_pod_running else 0,
+            scheduled_shutdown=None,
+            backend_ready=False,
+            app_keys={},
+            name=port_name, local_port=port_cfg['local_port'],
+            remote_port=port_cfg['remote_port'],
+        )
+        global_state.proxies.append(proxy_state)
+
+    return global_state
+
+def create_pool(global_state, config, pod_client):
+    """
+    Create the pool of pods serving the pool's proxy. The first pod is the one global_state
+    already tracks; the others get their own pod client, tunnel, state and cold start history.
+
+    Args:
+        global_state: Global application state
+        config: Full configuration
+        pod_client: AsyncPodClient of the first pod
+
+    Returns:
+        PodPool: The pool
+    """
+    pool_cfg = config['pool']
+    pool_proxy = next(proxy_state for proxy_state in global_state.proxies if proxy_state.name == pool_cfg['proxy'])
+    change = global_state.change
+    members = [PoolMember(0, pod_client, global_state.tunnel, global_state.pod, global_state.ssh,
+                          pool_proxy, global_state.cold_start, 0, proxy_state=pool_proxy)]
+
+    cold_start_path = script_dir / config['web']['cold_start_history']['path']
+    for index in range(1, pool_cfg['max_pods']):
+        name = member_name(pod_client.name, index)
+        member_client = create_pod_client(name)
+        initial_pod_info = get_pod_info(name)
+        port_offset = index * pool_cfg['port_offset']
+        members.append(PoolMember(
+            index, member_client,
+            SSHTunnel([pool_proxy.remote_port], config['ssh'], port_offset=port_offset),
+            create_pod_state(change, initial_pod_info), create_ssh_state(change),
+            # Keep a pod that was running at startup until the pool lets it go
+            ObservableState(change, ('need_pod',),
+                            need_pod=initial_pod_info.is_running if initial_pod_info else False),
+            ColdStartTracker(cold_start_path.with_name(f'{cold_start_path.stem}.{name}{cold_start_path.suffix}'),
+                             config['web']['cold_start_history']['max_entries']),
+            port_offset,
+        ))
+
+    logger.info(f"Spreading {pool_cfg['proxy']} prompts over up to {len(members)} pods")
+    return PodPool(members, pool_cfg)
+
 runners = []
 async def start_site(name, port_cfg, global_state, proxy_state, config):
     """
@@ -712,51 +1757,44 @@ def main():
     logging.basicConfig(level=log_level, format=log_format, datefmt=log_datefmt, force=True)
     logger.setLevel(log_level)
     logging.getLogger('aiohttp.access').setLevel(http_log_level)
+    logging.getLogger('asyncssh').setLevel(http_log_level)
 
     loop = asyncio.get_event_loop()
 
-    initial_pod_info = get_pod_info(config['runpod']['pod']['name'])
-    initial_pod_running = is_pod_running(config['runpod']['pod']['name'])
+    pod_client = create_pod_client()
+    scheduler = create_scheduler(config)
 
-    global_state = SimpleNamespace(
-        pod=SimpleNamespace(
-            pod_running=initial_pod_running,
-            pod_start_time=time() if initial_pod_running else 0,
-            cpu_mem_gb=initial_pod_info.cpu_mem_gb if initial_pod_info else 0,
-            gpu_mem_gb=initial_pod_info.gpu_mem_gb if initial_pod_info else 0,
-            need_ssh=initial_pod_running,
-        ),
-
-        ssh=SimpleNamespace(
-            ssh_running=False,
-            cpu_util=0, gpu_util=0, cpu_mem_gb=0, gpu_mem_gb=0,
-            last_activity=0, need_pod=False,
-            ssh_ip=None, ssh_port=None,
-        ),
-
-        proxies=[]
-    )
-
-    for port_name, port_cfg in config['web']['proxies'].items():
-        # Keep the pod running if it was running at startup
-        proxy_state = SimpleNamespace(
-            need_pod=initial_pod_running,
-            last_web_activity=time() if initial_pod_running else 0,
-            scheduled_shutdown=None,
-            app_keys={},
-            name=port_name, local_port=port_cfg['local_port'],
-            remote_port=port_cfg['remote_port'],
-        )
-        global_state.proxies.append(proxy_state)
+    initial_pod_info = get_pod_info(pod_client.name)
+    global_state = create_global_state(config, initial_pod_info, scheduler.tasks)
+    if config['pool']['enabled']:
+        global_state.pool = create_pool(global_state, config, pod_client)
 
-        loop.create_task(start_site(name=port_name, port_cfg=port_cfg, global_state=global_state,
+    for proxy_state in global_state.proxies:
+        port_cfg = config['web']['proxies'][proxy_state.name]
+        loop.create_task(start_site(name=proxy_state.name, port_cfg=port_cfg, global_state=global_state,
                                     proxy_state=proxy_state, config=config))
 
-    loop.create_task(monitor_pod(global_state.pod, global_state.proxies, global_state.ssh, config))
-    loop.create_task(monitor_ssh(global_state.ssh, global_state.pod, config))
+    loop.create_task(monitor_pod(global_state.pod, global_state.proxies, global_state.ssh, pod_client,
+                                 global_state.cold_start, config, global_state.sync))
+    loop.create_task(monitor_ssh(global_state.ssh, global_state.pod, pod_client, global_state.tunnel,
+                                 global_state.cold_start, config, global_state.usage))
+    if config['web']['prewarm']['enabled']:
+        loop.create_task(prewarm_pod(global_state, config))
+    if global_state.sync is not None:
+        loop.create_task(sync_files(global_state.ssh, global_state.sync, config))
+    loop.create_task(scheduler.run(lambda: global_state.pod.pod_running, global_state.change))
     loop.create_task(status_reporter(global_state))
     if config['ssh']['update_ssh_config']:
-        loop.create_task(update_ssh_config_task(global_state.ssh))
+        loop.create_task(update_ssh_config_task(global_state.ssh, pod_client))
+    if global_state.pool is not None:
+        remote_port = config['web']['proxies'][config['pool']['proxy']]['remote_port']
+        for member in global_state.pool.members[1:]:
+            loop.create_task(monitor_pod(member.pod, [member.demand], member.ssh, member.pod_client,
+                                         member.cold_start, config))
+            loop.create_task(monitor_ssh(member.ssh, member.pod, member.pod_client, member.tunnel,
+                                         member.cold_start, config))
+            loop.create_task(pool_member_readiness(member, remote_port, config))
+        loop.create_task(scale_pool(global_state, config))
 
     try:
         loop.run_forever()
@@ -765,6 +1803,12 @@ def main():
     finally:
         for runner in runners:
             loop.run_until_complete(runner.cleanup())
+        loop.run_until_complete(global_state.tunnel.close())
+        pod_client.close()
+        if global_state.pool is not None:
+            for member in global_state.pool.members[1:]:
+                loop.run_until_complete(member.tunnel.close())
+                member.pod_client.close()
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+
+# SPDX-FileCopyrightText: Copyright (c) 2025 Richard L. Lynch <rich@richlynch.com>
+# SPDX-License-Identifier: MIT
+
+"""Probe each stage of pod startup with exponential backoff instead of fixed sleeps."""
+
+import asyncio
+import logging
+from time import time
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+async def wait_until(check, description, readiness_cfg, keep_waiting=None):
+    """
+    Repeatedly run a check until it returns a truthy value, backing off exponentially between
+    attempts up to a low ceiling so the wait ends shortly after the condition becomes true.
+
+    Args:
+        check: Coroutine function returning a truthy value once the stage is ready
+        description: Description of the stage for log messages
+        readiness_cfg: Readiness configuration with initial_delay, max_delay and timeout
+        keep_waiting: Optional callable returning False to abandon the wait early
+
+    Returns:
+        The value returned by check, or None if the wait timed out or was abandoned
+    """
+    delay = readiness_cfg['initial_delay']
+    start_time = time()
+    logged = False
+    while True:
+        if keep_waiting and not keep_waiting():
+            logger.debug(f"No longer waiting for {description}")
+            return None
+
+        try:
+            result = await check()
+        except Exception as ex: # pylint: disable=broad-exception-caught
+            logger.debug(f"Readiness check for {description} failed: {ex}")
+            result = None
+
+        if result:
+            logger.debug(f"{description} ready after {time()-start_time:.1f} seconds")
+            return result
+
+        if time() - start_time > readiness_cfg['timeout']:
+            logger.error(f"Timed out after {readiness_cfg['timeout']} seconds waiting for {description}")
+            return None
+
+        if not logged:
+            logger.info(f"Waiting for {description}...")
+            logged = True
+
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, readiness_cfg['max_delay'])
+
+async def wait_for_pod_running(pod_client, readiness_cfg, keep_waiting=None):
+    """
+    Wait for RunPod to report the pod's container as started.
+    """
+    async def check():
+        pod_info = await pod_client.get_pod_info(max_age=0)
+        return pod_info and pod_info.is_running and pod_info.is_started
+
+    return await wait_until(check, 'pod to be running', readiness_cfg, keep_waiting)
+
+async def wait_for_ssh_port(pod_client, readiness_cfg, keep_waiting=None):
+    """
+    Wait for RunPod to publish the pod's SSH port.
+
+    Returns:
+        tuple: SSH IP and port, or None if the wait timed out or was abandoned
+    """
+    async def check():
+        ssh_ip, ssh_port = await pod_client.get_ssh_ip_port(max_age=0)
+        return (ssh_ip, ssh_port) if ssh_ip and ssh_port else None
+
+    return await wait_until(check, 'SSH port to be published', readiness_cfg, keep_waiting)
+
+async def wait_for_tcp_connect(host, port, readiness_cfg, keep_waiting=None):
+    """
+    Wait for a TCP connection to host:port to succeed.
+    """
+    async def check():
+        _, writer = await asyncio.wait_for(asyncio.open_connection(host, port), readiness_cfg['max_delay'])
+        writer.close()
+        await writer.wait_closed()
+        return True
+
+    return await wait_until(check, f'SSH server at {host}:{port} to accept connections',
+                            readiness_cfg, keep_waiting)
+
+async def wait_for_backend(client_session, url, readiness_cfg, keep_waiting=None):
+    """
+    Wait for a backend web server to answer a GET request with HTTP 200.
+    """
+    timeout = aiohttp.ClientTimeout(total=readiness_cfg['max_delay'])
+
+    async def check():
+        async with client_session.get(url, timeout=timeout, allow_redirects=False) as response:
+            return response.status == 200
+
+    return await wait_until(check, f'backend at {url}', readiness_cfg, keep_waiting)
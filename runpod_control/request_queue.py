@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+
+# SPDX-FileCopyrightText: Copyright (c) 2025 Richard L. Lynch <rich@richlynch.com>
+# SPDX-License-Identifier: MIT
+
+"""Park API requests while the backend starts and replay them in arrival order once it is up."""
+
+import asyncio
+import logging
+import contextlib
+from collections import deque
+from time import time
+
+logger = logging.getLogger(__name__)
+
+class QueueFullError(Exception):
+    """Raised when a request can't be held because the queue is at capacity."""
+
+class HeldRequestQueue:
+    """
+    Bounded FIFO of requests waiting for the backend to become ready. Requests are released one at
+    a time, each after the previous one has been forwarded, so the backend sees them in the order
+    the clients sent them.
+
+    Args:
+        max_size: Maximum number of requests to hold at once
+        max_wait: Maximum seconds a request is held before giving up
+    """
+    def __init__(self, max_size, max_wait):
+        self.max_size = max_size
+        self.max_wait = max_wait
+        self._waiters = deque()
+        self._active = False
+
+    @property
+    def busy(self):
+        """True while requests are waiting or being replayed."""
+        return bool(self._waiters) or self._active
+
+    def __len__(self):
+        return len(self._waiters)
+
+    @contextlib.asynccontextmanager
+    async def hold(self):
+        """
+        Wait for this request's turn. The request should be forwarded inside the context; leaving
+        the context releases the next request.
+
+        Raises:
+            QueueFullError: If the queue is already at capacity
+            asyncio.TimeoutError: If the backend wasn't ready before the deadline
+        """
+        if len(self._waiters) >= self.max_size:
+            raise QueueFullError(f'{len(self._waiters)} requests already waiting')
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        start_time = time()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.max_wait)
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            if waiter.done() and not waiter.cancelled():
+                # Our turn came just as we gave up - pass it on
+                self._active = False
+                self.release_next()
+            else:
+                waiter.cancel()
+                with contextlib.suppress(ValueError):
+                    self._waiters.remove(waiter)
+            raise
+
+        logger.debug(f'Replaying held request after {time()-start_time:.1f} seconds')
+        try:
+            yield
+        finally:
+            self._active = False
+            self.release_next()
+
+    def release_next(self):
+        """
+        Let the oldest waiting request proceed if none is currently being replayed. Call when the
+        backend becomes ready.
+        """
+        if self._active:
+            return
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self._active = True
+                waiter.set_result(None)
+                return
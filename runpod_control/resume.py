@@ -8,20 +8,24 @@ import logging
 import runpod
 
 from config import get_config, setup_runpod
+from utils import get_pods, invalidate_pods
 
 logger = logging.getLogger(__name__)
 
-def resume_pod():
-    name = get_config()['runpod']['pod']['name']
+def resume_pod(name=None):
+    name = name or get_config()['runpod']['pod']['name']
 
-    pod_list = runpod.get_pods()
+    pod_list = get_pods()
     pod_list = [pod for pod in pod_list if pod['name'] == name]
     assert len(pod_list) == 1
 
     pod = pod_list[0]
     logger.info(f'Resuming pod: {pod}')
 
-    return runpod.resume_pod(pod['id'], gpu_count=1)
+    new_pod = runpod.resume_pod(pod['id'], gpu_count=1)
+    invalidate_pods()
+
+    return new_pod
 
 def main():
     logging.basicConfig(level=logging.INFO)
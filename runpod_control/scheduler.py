@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+
+# SPDX-FileCopyrightText: Copyright (c) 2025 Richard L. Lynch <rich@richlynch.com>
+# SPDX-License-Identifier: MIT
+
+"""Run periodic shell commands as asynchronous subprocesses without blocking the event loop."""
+
+import os
+import signal
+import random
+import contextlib
+import asyncio
+import logging
+from time import time
+
+logger = logging.getLogger(__name__)
+
+class PeriodicTask:
+    """
+    A shell command run periodically by the TaskScheduler, along with statistics from its last run.
+
+    Args:
+        name: Name of the task shown in logs and on the status page
+        command: Shell command to run
+        interval: Seconds between the start of consecutive runs
+        timeout: Seconds to let the command run before killing it, or None for no limit
+        jitter: Fraction of the interval to randomly add or subtract from each delay
+    """
+    def __init__(self, name, command, interval, timeout=None, jitter=0.0):
+        self.name = name
+        self.command = command
+        self.interval = interval
+        self.timeout = timeout
+        self.jitter = jitter
+
+        self.next_run = 0
+        self.running = False
+        self.run_count = 0
+        self.skip_count = 0
+        self.last_run = 0
+        self.last_duration = None
+        self.last_exit_code = None
+        self.last_output_size = None
+        self.last_timed_out = False
+
+    def schedule_next(self, now):
+        """
+        Pick the time of the next run, spreading runs out by the configured jitter.
+        """
+        delay = self.interval * (1 + random.uniform(-self.jitter, self.jitter))
+        self.next_run = now + max(delay, 0)
+
+class TaskScheduler:
+    """
+    Run PeriodicTasks on their intervals while enabled, skipping a run if the previous one is still
+    going and limiting how many tasks run at once.
+
+    Args:
+        tasks: List of PeriodicTask objects
+        max_concurrent: Maximum number of tasks running at the same time
+    """
+    def __init__(self, tasks, max_concurrent=1):
+        self.tasks = tasks
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self._running = set()
+
+    async def run(self, is_enabled, change=None, poll_interval=1):
+        """
+        Start tasks as they become due for as long as this coroutine runs.
+
+        Args:
+            is_enabled: Callable returning True when tasks should run (e.g. while the pod is up)
+            change: StateChange notified when is_enabled may have changed. Without it, is_enabled
+                    is polled every poll_interval.
+            poll_interval: Maximum seconds to sleep between checks
+        """
+        try:
+            while True:
+                version = change.version if change else None
+                now = time()
+                if is_enabled():
+                    for task in self.tasks:
+                        if now < task.next_run:
+                            continue
+                        task.schedule_next(now)
+                        if task.running:
+                            logger.debug(f'Periodic task "{task.name}" is still running, skipping this run')
+                            task.skip_count += 1
+                            continue
+                        task.running = True
+                        job = asyncio.create_task(self.run_task(task))
+                        self._running.add(job)
+                        job.add_done_callback(self._running.discard)
+
+                    next_run = min((task.next_run for task in self.tasks), default=None)
+                    if change:
+                        await change.wait(version, next_run - time() if next_run is not None else None)
+                    else:
+                        await asyncio.sleep(min(max(next_run - time(), 0), poll_interval)
+                                            if next_run is not None else poll_interval)
+                elif change:
+                    await change.wait(version)
+                else:
+                    await asyncio.sleep(poll_interval)
+        finally:
+            for job in self._running:
+                job.cancel()
+
+    async def run_task(self, task):
+        """
+        Run a single task to completion or timeout and record its statistics.
+        """
+        try:
+            async with self._semaphore:
+                logger.debug(f'Running periodic task "{task.name}": {task.command}')
+                start_time = time()
+                task.last_run = start_time
+                proc = await asyncio.create_subprocess_shell(task.command,
+                                                             stdout=asyncio.subprocess.PIPE,
+                                                             stderr=asyncio.subprocess.STDOUT,
+                                                             start_new_session=True)
+                try:
+                    output, _ = await asyncio.wait_for(proc.communicate(), task.timeout)
+                except (asyncio.TimeoutError, asyncio.CancelledError):
+                    # Kill the whole process group so children like rsync and ssh go too
+                    with contextlib.suppress(ProcessLookupError):
+                        os.killpg(proc.pid, signal.SIGKILL)
+                    await proc.wait()
+                    raise
+
+                task.last_duration = time() - start_time
+                task.last_exit_code = proc.returncode
+                task.last_output_size = len(output)
+                task.last_timed_out = False
+                task.run_count += 1
+
+                if proc.returncode != 0:
+                    for line in output.decode('utf-8', errors='ignore').splitlines():
+                        logger.error(f'{task.name}: {line}')
+                    logger.error(f'Periodic task "{task.name}" failed with code {proc.returncode}')
+                else:
+                    logger.debug(f'Periodic task "{task.name}" completed successfully in {task.last_duration:.1f} seconds')
+
+        except asyncio.TimeoutError:
+            task.last_duration = time() - task.last_run
+            task.last_exit_code = None
+            task.last_output_size = None
+            task.last_timed_out = True
+            task.run_count += 1
+            logger.error(f'Periodic task "{task.name}" timed out after {task.timeout} seconds')
+        except Exception as ex: # pylint: disable=broad-exception-caught
+            logger.error(f'Error running periodic task "{task.name}": {ex}')
+        finally:
+            task.running = False
+
+def create_scheduler(config):
+    """
+    Create a TaskScheduler from the periodic_tasks and scheduler sections of the configuration.
+    """
+    tasks = []
+    # The section may be left with only commented out tasks
+    for task_name, task_cfg in (config['periodic_tasks'] or {}).items():
+        tasks.append(PeriodicTask(task_name, task_cfg['command'], task_cfg['interval'],
+                                  timeout=task_cfg.get('timeout'),
+                                  jitter=task_cfg.get('jitter', 0.0)))
+    return TaskScheduler(tasks, max_concurrent=config['scheduler']['max_concurrent'])
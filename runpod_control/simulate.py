@@ -0,0 +1,530 @@
+#!/usr/bin/env python3
+
+# SPDX-FileCopyrightText: Copyright (c) 2025 Richard L. Lynch <rich@richlynch.com>
+# SPDX-License-Identifier: MIT
+
+"""Replay recorded web traffic through the pod lifecycle logic on virtual time.
+
+Runs the real monitor_pod, proxy_idle_detection and handle_ssh_output against the fake RunPod API
+on an event loop whose clock jumps straight to the next timer, so days of traffic replay in
+seconds. Sweeping shutdown_timeout and the utilization thresholds shows how they trade GPU hours
+against cold starts.
+
+With --pool-pods, prompts are routed by the real PodPool over that many pods, each with its own
+simulated ComfyUI reporting its queue depth, and scale_pool starts and lets go of the extra pods.
+
+Access logs in the Common Log Format are accepted, e.g. from the proxy's aiohttp access log
+(enabled with --debug) or from a reverse proxy in front of it:
+
+    127.0.0.1 [16/Oct/2026:20:41:41 +0000] "POST /prompt HTTP/1.1" 200 ...
+"""
+
+import re
+import sys
+import copy
+import json
+import random
+import asyncio
+import logging
+import argparse
+import itertools
+import selectors
+import tempfile
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+from types import SimpleNamespace
+
+import coldstart
+import proxy
+import readiness
+import utils
+import create
+from coldstart import percentile
+from config import get_config_without_secrets
+from fake_runpod import FakeRunPod
+from idle_policy import stopped_cost_per_hour
+from pod_client import AsyncPodClient
+
+logger = logging.getLogger(__name__)
+
+ACCESS_LOG_PATTERN = re.compile(
+    r'\[(?P<time>\d{2}/\w{3}/\d{4}:\d{2}:\d{2}:\d{2} [+-]\d{4})\] '
+    r'"(?P<method>[A-Z]+) (?P<path>\S+)[^"]*" (?P<status>\d{3})'
+)
+
+# Requests that queue a generation on the GPU
+PROMPT_PATHS = ('/prompt', '/api/prompt')
+
+class VirtualClock:
+    """
+    Clock for the simulation, starting at a given unix time and only moving when advanced.
+
+    The event loop runs on the seconds elapsed since the start rather than on unix time, as adding
+    small timeouts to a unix timestamp loses too much precision for timers to fire reliably.
+    """
+    def __init__(self, start):
+        self.start = start
+        self.elapsed = 0.0
+
+    def time(self):
+        """Get the current virtual unix time."""
+        return self.start + self.elapsed
+
+    def advance(self, seconds):
+        """Move the clock forward."""
+        self.elapsed += seconds
+
+class VirtualSelector(selectors.SelectSelector):
+    """
+    Selector that advances the virtual clock by the event loop's timeout instead of waiting, so the
+    loop skips straight to its next timer.
+    """
+    def __init__(self, clock):
+        super().__init__()
+        self.clock = clock
+
+    def select(self, timeout=None):
+        ready = super().select(0)
+        if ready:
+            return ready
+        if timeout is None:
+            raise RuntimeError('Simulation deadlocked: nothing is scheduled')
+        self.clock.advance(timeout)
+        return []
+
+class VirtualTimeLoop(asyncio.SelectorEventLoop):
+    """
+    Event loop running on a VirtualClock. Only suitable for code that waits on timers, not on
+    sockets or threads.
+    """
+    def __init__(self, clock):
+        super().__init__(VirtualSelector(clock))
+        self.clock = clock
+
+    def time(self):
+        return self.clock.elapsed
+
+class InlinePodClient(AsyncPodClient):
+    """
+    AsyncPodClient that calls the (fake) RunPod API directly instead of on worker threads, which
+    the virtual time loop can't wait for.
+    """
+    async def _run(self, func, *args, **kwargs):
+        return func(*args, **kwargs)
+
+class Workload:
+    """
+    Model of ComfyUI running queued prompts one at a time, and of the utilization it reports.
+
+    Args:
+        job_seconds: GPU time taken by each prompt
+        busy_util: (cpu, gpu) utilization while a prompt runs
+        idle_util: Maximum (cpu, gpu) utilization while idle; actual values are random up to this
+        seed: Seed for the idle utilization noise
+    """
+    def __init__(self, job_seconds, busy_util, idle_util, seed=None):
+        self.job_seconds = job_seconds
+        self.busy_util = busy_util
+        self.idle_util = idle_util
+        self.random = random.Random(seed)
+        self.pending = deque()
+        self.busy_until = 0
+        self.ready_since = float('inf')
+        self.waits = []
+
+    def submit(self, now):
+        """Queue a prompt."""
+        self.pending.append(now)
+
+    def backend_ready(self, now):
+        """The backend came up and can start running queued prompts."""
+        self.ready_since = now
+
+    def backend_down(self, now):
+        """The backend went away; queued prompts wait for the next start."""
+        self.advance(now)
+        self.ready_since = float('inf')
+
+    def advance(self, now):
+        """Start every queued prompt whose turn came by now."""
+        while self.pending:
+            start_time = max(self.busy_until, self.pending[0], self.ready_since)
+            if start_time > now:
+                break
+            self.waits.append(start_time - self.pending.popleft())
+            self.busy_until = start_time + self.job_seconds
+
+    def queue_depth(self, now):
+        """Get the number of prompts queued or running, as ComfyUI's queue reports it."""
+        self.advance(now)
+        return len(self.pending) + (now < self.busy_until)
+
+    def utilization(self, now):
+        """
+        Get the (cpu, gpu) utilization percentages at a time.
+        """
+        self.advance(now)
+        if now < self.busy_until:
+            return self.busy_util
+        return tuple(self.random.uniform(0, limit) for limit in self.idle_util)
+
+class SimulatedStatusProcess:
+    """
+    Stand-in for status_loop.py running over SSH, printing a JSON status line every interval while
+    the pod is up.
+    """
+    def __init__(self, fake, pod_name, workload, clock, interval, gpu_mem_gb):
+        self.stdout = self
+        self.fake = fake
+        self.pod_name = pod_name
+        self.workload = workload
+        self.clock = clock
+        self.interval = interval
+        self.gpu_mem_gb = gpu_mem_gb
+
+    async def readline(self):
+        """Wait for and return the next status line, or b'' once the pod is gone."""
+        await asyncio.sleep(self.interval)
+        pod = self.fake.find_pod(self.pod_name)
+        if not pod or not pod['runtime']:
+            return b''
+        cpu_util, gpu_util = self.workload.utilization(self.clock.time())
+        status = {
+            'cpu_util': cpu_util,
+            'gpu_util': gpu_util,
+            'cpu_mem_gb': 8,
+            'gpu_mem_gb': self.gpu_mem_gb * gpu_util / 100,
+            'comfyui_queue': self.workload.queue_depth(self.clock.time()),
+        }
+        return (json.dumps(status) + '\n').encode('utf-8')
+
+async def simulate_ssh(pod_state, ssh_state, cold_start, set_backend_ready, fake, pod_name, workload, clock,
+                       config, sim_cfg):
+    """
+    Stand-in for monitor_ssh: connect once the pod's container is up, run the status lines through
+    handle_ssh_output, and mark the backend ready after its start delay.
+
+    Args:
+        set_backend_ready: Called with True once the backend answers and False when it goes away
+    """
+    while True:
+        pod = fake.find_pod(pod_name)
+        if not pod_state.need_ssh or not pod or not pod['runtime']:
+            await asyncio.sleep(1)
+            continue
+
+        cold_start.mark('ssh_port_published')
+        await asyncio.sleep(sim_cfg.ssh_connect_delay)
+        cold_start.mark('ssh_connected')
+        ssh_state.ssh_running = True
+
+        async def start_backend():
+            await asyncio.sleep(sim_cfg.backend_start_delay)
+            set_backend_ready(True)
+            workload.backend_ready(clock.time())
+            cold_start.mark('first_backend_response')
+        backend_task = asyncio.create_task(start_backend())
+
+        proc = SimulatedStatusProcess(fake, pod_name, workload, clock, sim_cfg.status_interval,
+                                      pod_state.gpu_mem_gb or 24)
+        await proxy.handle_ssh_output(proc, ssh_state, config['ssh'], cold_start)
+
+        backend_task.cancel()
+        set_backend_ready(False)
+        workload.backend_down(clock.time())
+        ssh_state.ssh_running = False
+        proxy.clear_status(ssh_state)
+        await asyncio.sleep(config['ssh']['reconnect_delay'])
+
+async def replay_requests(requests, proxy_state, submit_prompt, clock, counters):
+    """
+    Feed recorded requests to the proxy's activity tracking at their recorded times.
+
+    Args:
+        submit_prompt: Called with the time of each prompt to queue it on a pod
+    """
+    for request in requests:
+        await asyncio.sleep(max(0, request.time - clock.time()))
+        if request.status == 101:
+            # WebSocket upgrades don't start the pod
+            continue
+        if proxy.wakes_pod(request.path):
+            if not proxy_state.backend_ready:
+                counters['cold_requests'] += 1
+            proxy.record_web_activity(proxy_state, request.path)
+        if request.method == 'POST' and request.path.split('?')[0] in PROMPT_PATHS:
+            submit_prompt(clock.time())
+
+def parse_access_log(lines):
+    """
+    Parse Common Log Format lines.
+
+    Returns:
+        list: Requests with time, method, path and status, in time order
+    """
+    requests = []
+    for line in lines:
+        match = ACCESS_LOG_PATTERN.search(line)
+        if not match:
+            continue
+        requests.append(SimpleNamespace(
+            time=datetime.strptime(match['time'], '%d/%b/%Y:%H:%M:%S %z').timestamp(),
+            method=match['method'],
+            path=match['path'],
+            status=int(match['status']),
+        ))
+    return sorted(requests, key=lambda request: request.time)
+
+def synthetic_requests(days, sessions_per_day, seed=None):
+    """
+    Generate traffic for testing without a recorded log: sessions at random times of day, each
+    loading the UI and queueing prompts every few minutes.
+    """
+    rng = random.Random(seed)
+    start_time = datetime(2025, 1, 6).timestamp()
+    requests = []
+    for day in range(days):
+        for _ in range(rng.randint(0, sessions_per_day * 2)):
+            now = start_time + day * 86400 + rng.uniform(8, 23) * 3600
+            end_time = now + rng.uniform(15, 120) * 60
+            requests.append(SimpleNamespace(time=now, method='GET', path='/', status=200))
+            while now < end_time:
+                requests.append(SimpleNamespace(time=now, method='POST', path='/api/prompt', status=200))
+                requests.append(SimpleNamespace(time=now + 1, method='GET', path='/api/queue', status=200))
+                now += rng.expovariate(1 / 180)
+    return sorted(requests, key=lambda request: request.time)
+
+def patch_clocks(clock):
+    """
+    Point the modules' time functions at the virtual clock.
+
+    Returns:
+        list: (module, name, original) tuples to restore afterwards
+    """
+    patches = [(proxy, 'time'), (readiness, 'time'), (coldstart, 'time'), (utils, 'monotonic')]
+    saved = [(module, name, getattr(module, name)) for module, name in patches]
+    for module, name in patches:
+        setattr(module, name, clock.time)
+    return saved
+
+def run_simulation(requests, config, sim_cfg, proxy_name='ComfyUI'):
+    """
+    Replay requests through the pod lifecycle with one set of configuration values.
+
+    Returns:
+        dict: GPU hours, cold starts and user-visible waits
+    """
+    clock = VirtualClock(requests[0].time - 60)
+    loop = VirtualTimeLoop(clock)
+    saved = patch_clocks(clock)
+    # The pod lifecycle code reads the pod settings and cache TTL from the configuration
+    saved += [(create, 'get_config', create.get_config), (utils, 'get_config', utils.get_config),
+              (proxy, 'create_pod_client', proxy.create_pod_client)]
+    create.get_config = utils.get_config = lambda: config
+    # The extra pods of a pool get their own clients
+    proxy.create_pod_client = InlinePodClient
+    utils.get_pod_cache.cache_clear()
+
+    fake = FakeRunPod(create_delay=sim_cfg.create_delay, resume_delay=sim_cfg.resume_delay,
+                      failure_rates=sim_cfg.failure_rates, clock=clock.time, seed=sim_cfg.seed)
+    pod_name = config['runpod']['pod']['name']
+    pod_client = InlinePodClient(pod_name)
+    pod_count = config['pool']['max_pods'] if config['pool']['enabled'] else 1
+    # A simulated ComfyUI per pod
+    workloads = [Workload(sim_cfg.job_seconds, (sim_cfg.busy_cpu, sim_cfg.busy_gpu),
+                          (sim_cfg.idle_cpu, sim_cfg.idle_gpu), seed=sim_cfg.seed + index)
+                 for index in range(pod_count)]
+    counters = {'cold_requests': 0}
+    pod_clients = [pod_client]
+
+    async def simulate():
+        global_state = proxy.create_global_state(config, None, [])
+        proxy_state = next(state for state in global_state.proxies if state.name == proxy_name)
+        tasks = [
+            asyncio.create_task(proxy.monitor_pod(global_state.pod, global_state.proxies, global_state.ssh,
+                                                  pod_client, global_state.cold_start, config)),
+            asyncio.create_task(simulate_ssh(global_state.pod, global_state.ssh, global_state.cold_start,
+                                             lambda ready: setattr(proxy_state, 'backend_ready', ready),
+                                             fake, pod_name, workloads[0], clock, config, sim_cfg)),
+        ]
+        for state in global_state.proxies:
+            app = {'state': state, 'config': config, 'global_state': global_state}
+            tasks.append(asyncio.create_task(proxy.proxy_idle_detection(app)))
+
+        submit_prompt = workloads[0].submit
+        pods = [(global_state.pod, pod_name)]
+        if config['pool']['enabled']:
+            global_state.pool = proxy.create_pool(global_state, config, pod_client)
+            for member in global_state.pool.members[1:]:
+                def set_backend_ready(ready, member=member):
+                    member.backend_ready = ready
+                    member.ssh.change.notify()
+                tasks += [
+                    asyncio.create_task(proxy.monitor_pod(member.pod, [member.demand], member.ssh,
+                                                          member.pod_client, member.cold_start, config)),
+                    asyncio.create_task(simulate_ssh(member.pod, member.ssh, member.cold_start, set_backend_ready,
+                                                     fake, member.name, workloads[member.index], clock,
+                                                     config, sim_cfg)),
+                ]
+                pods.append((member.pod, member.name))
+                pod_clients.append(member.pod_client)
+            tasks.append(asyncio.create_task(proxy.scale_pool(global_state, config)))
+
+            def submit_prompt(now):
+                member = global_state.pool.route_prompt(None, now)
+                # With no pod ready the proxy holds the prompt until the first pod is up
+                workloads[member.index if member else 0].submit(now)
+
+        await replay_requests(requests, proxy_state, submit_prompt, clock, counters)
+        # Let the pods shut down after the last request
+        while any(pod_state.pod_running or fake.find_pod(name) for pod_state, name in pods):
+            await asyncio.sleep(60)
+            if clock.time() - requests[-1].time > sim_cfg.max_tail:
+                break
+
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        return global_state
+
+    with fake:
+        try:
+            global_state = loop.run_until_complete(simulate())
+        finally:
+            for module, name, original in saved:
+                setattr(module, name, original)
+            utils.get_pod_cache.cache_clear()
+            loop.close()
+            for client in pod_clients:
+                client.close()
+
+    running_seconds, stopped_seconds = fake.billed_seconds()
+    calls = [name for _, name in fake.calls]
+    trackers = [global_state.cold_start]
+    if global_state.pool is not None:
+        trackers += [member.cold_start for member in global_state.pool.members[1:]]
+    cold_starts = sum(count for tracker in trackers for (_, outcome), count in tracker.finished.items()
+                      if outcome == 'completed')
+    waits = [wait for workload in workloads for wait in workload.waits]
+    return {
+        'gpu_hours': running_seconds / 3600,
+        'stopped_hours': stopped_seconds / 3600,
+        'busy_hours': (len(waits) * sim_cfg.job_seconds) / 3600,
+        'cold_starts': cold_starts,
+        'creates': calls.count('create_pod'),
+        'resumes': calls.count('resume_pod'),
+        'cold_requests': counters['cold_requests'],
+        'prompts': len(waits),
+        'prompts_per_pod': [len(workload.waits) for workload in workloads],
+        'wait_p50': percentile(waits, 50),
+        'wait_p95': percentile(waits, 95),
+        'api_calls': len(calls),
+    }
+
+def main():
+    """
+    Parse arguments and run a simulation for every combination of the swept values.
+    """
+    parser = argparse.ArgumentParser(description='Simulate pod start/stop decisions against recorded traffic')
+    parser.add_argument('access_logs', nargs='*', type=Path, help='Access logs in Common Log Format')
+    parser.add_argument('--synthetic-days', type=int, default=0,
+                        help='Generate this many days of traffic instead of reading logs')
+    parser.add_argument('--sessions-per-day', type=int, default=3, help='Average sessions per synthetic day')
+    parser.add_argument('--proxy', default='ComfyUI', help='Proxy the traffic was recorded on')
+    parser.add_argument('--shutdown-timeout', type=int, nargs='+',
+                        help='Values of shutdown_timeout to try, in seconds (default: config.yaml)')
+    parser.add_argument('--cpu-threshold', type=float, nargs='+',
+                        help='Values of cpu_util_threshold to try (default: config.yaml)')
+    parser.add_argument('--gpu-threshold', type=float, nargs='+',
+                        help='Values of gpu_util_threshold to try (default: config.yaml)')
+    parser.add_argument('--idle-mode', nargs='+', choices=('stop', 'terminate'),
+                        help='Idle policy modes to try (default: config.yaml)')
+    parser.add_argument('--pool-pods', type=int, nargs='+',
+                        help='Most pods of the pool to try, 1 for no pool (default: config.yaml)')
+    parser.add_argument('--job-seconds', type=float, default=60, help='GPU seconds per queued prompt')
+    parser.add_argument('--busy-cpu', type=float, default=30, help='CPU utilization while a prompt runs')
+    parser.add_argument('--busy-gpu', type=float, default=95, help='GPU utilization while a prompt runs')
+    parser.add_argument('--idle-cpu', type=float,
+                        help='Maximum CPU utilization while idle (default: half of cpu_util_threshold)')
+    parser.add_argument('--idle-gpu', type=float,
+                        help='Maximum GPU utilization while idle (default: half of gpu_util_threshold)')
+    parser.add_argument('--create-delay', type=float, default=180, help='Seconds for a created pod to boot')
+    parser.add_argument('--resume-delay', type=float, default=45, help='Seconds for a resumed pod to boot')
+    parser.add_argument('--ssh-connect-delay', type=float, default=5, help='Seconds to connect SSH')
+    parser.add_argument('--backend-start-delay', type=float, default=30,
+                        help='Seconds from SSH connecting until the backend answers')
+    parser.add_argument('--failure-rate', type=float, default=0, help='Probability of each RunPod API call failing')
+    parser.add_argument('--hourly-price', type=float, default=0.27, help='GPU price per hour')
+    parser.add_argument('--seed', type=int, default=1, help='Random seed')
+    parser.add_argument('--verbose', action='store_true', help='Log lifecycle decisions')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING,
+                        format='%(message)s', force=True)
+
+    if args.synthetic_days:
+        requests = synthetic_requests(args.synthetic_days, args.sessions_per_day, args.seed)
+    else:
+        if not args.access_logs:
+            parser.error('Give access logs or --synthetic-days')
+        lines = []
+        for path in args.access_logs:
+            with open(path, errors='replace') as log_file:
+                lines.extend(log_file)
+        requests = parse_access_log(lines)
+    if not requests:
+        sys.exit('No requests to replay')
+
+    base_config = copy.deepcopy(get_config_without_secrets())
+    shutdown_timeouts = args.shutdown_timeout or [base_config['web']['shutdown_timeout']]
+    cpu_thresholds = args.cpu_threshold or [base_config['ssh']['cpu_util_threshold']]
+    gpu_thresholds = args.gpu_threshold or [base_config['ssh']['gpu_util_threshold']]
+    idle_modes = args.idle_mode or [base_config['web']['idle_policy']['mode']]
+    pool_pods = args.pool_pods or [base_config['pool']['max_pods'] if base_config['pool']['enabled'] else 1]
+    hours = (requests[-1].time - requests[0].time) / 3600
+    print(f'Replaying {len(requests)} requests over {hours:.1f} hours')
+
+    print(f"{'Idle':>9} {'Timeout':>8} {'CPU%':>5} {'GPU%':>5} {'Pods':>5} {'GPU h':>7} {'Stop h':>7} {'Cost':>7} {'Util':>5} "
+          f"{'Starts':>7} {'Create':>7} {'Resume':>7} {'Cold req':>9} {'Wait p50':>9} {'Wait p95':>9} Prompts/pod")
+    with tempfile.TemporaryDirectory(prefix='pod_on_demand_simulate_') as work_dir:
+        for index, (idle_mode, shutdown_timeout, cpu_threshold, gpu_threshold, max_pods) in enumerate(itertools.product(
+                idle_modes, shutdown_timeouts, cpu_thresholds, gpu_thresholds, pool_pods)):
+            config = copy.deepcopy(base_config)
+            config['web']['shutdown_timeout'] = config['ssh']['shutdown_timeout'] = shutdown_timeout
+            config['ssh']['cpu_util_threshold'] = cpu_threshold
+            config['ssh']['gpu_util_threshold'] = gpu_threshold
+            config['web']['idle_policy']['mode'] = idle_mode
+            config['pool']['enabled'] = max_pods > 1
+            config['pool']['max_pods'] = max_pods
+            config['pool']['proxy'] = args.proxy
+            # Each run learns its own create and resume times
+            config['web']['cold_start_history']['path'] = str(Path(work_dir) / f'cold_start_history_{index}.json')
+            config['web']['prewarm']['path'] = str(Path(work_dir) / f'usage_history_{index}.json')
+            # There's no pod to sync files with
+            config['sync']['enabled'] = False
+
+            sim_cfg = SimpleNamespace(
+                job_seconds=args.job_seconds, busy_cpu=args.busy_cpu, busy_gpu=args.busy_gpu,
+                # Idle noise stays below the thresholds unless asked for, so it doesn't count as activity
+                idle_cpu=args.idle_cpu if args.idle_cpu is not None else cpu_threshold / 2,
+                idle_gpu=args.idle_gpu if args.idle_gpu is not None else gpu_threshold / 2,
+                create_delay=args.create_delay, resume_delay=args.resume_delay,
+                ssh_connect_delay=args.ssh_connect_delay, backend_start_delay=args.backend_start_delay,
+                status_interval=5,
+                failure_rates={name: args.failure_rate
+                               for name in ('get_pods', 'create_pod', 'resume_pod', 'stop_pod', 'terminate_pod')},
+                seed=args.seed, max_tail=max(shutdown_timeout * 4, 3600),
+            )
+            result = run_simulation(requests, config, sim_cfg, args.proxy)
+            utilization = result['busy_hours'] / result['gpu_hours'] * 100 if result['gpu_hours'] else 0
+            cost = (result['gpu_hours'] * args.hourly_price +
+                    result['stopped_hours'] * stopped_cost_per_hour(config['web']['idle_policy'], config['runpod']['pod']))
+            print(f"{idle_mode:>9} {shutdown_timeout:>8} {cpu_threshold:>5.0f} {gpu_threshold:>5.0f} {max_pods:>5} "
+                  f"{result['gpu_hours']:>7.1f} {result['stopped_hours']:>7.1f} {cost:>7.2f} {utilization:>4.0f}% "
+                  f"{result['cold_starts']:>7} {result['creates']:>7} {result['resumes']:>7} "
+                  f"{result['cold_requests']:>9} {result['wait_p50'] or 0:>8.0f}s {result['wait_p95'] or 0:>8.0f}s "
+                  f"{'/'.join(str(prompts) for prompts in result['prompts_per_pod'])}")
+
+if __name__ == '__main__':
+    main()
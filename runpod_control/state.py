@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+
+# SPDX-FileCopyrightText: Copyright (c) 2025 Richard L. Lynch <rich@richlynch.com>
+# SPDX-License-Identifier: MIT
+
+"""State objects that wake waiting tasks when they change, so tasks don't have to poll them."""
+
+import asyncio
+from types import SimpleNamespace
+
+class StateChange:
+    """
+    Signal shared by the state objects, set whenever a watched attribute of any of them changes.
+
+    Tasks read version before looking at the state, then wait(version) after acting on it, so a
+    change made while they were busy isn't missed.
+    """
+    def __init__(self):
+        self.version = 0
+        self._event = None
+
+    def notify(self):
+        """Wake every task waiting for a change."""
+        self.version += 1
+        if self._event is not None:
+            self._event.set()
+            self._event = None
+
+    async def wait(self, since, timeout=None):
+        """
+        Wait for a change after version since, or until timeout seconds have passed.
+
+        Args:
+            since: Value of version when the caller last looked at the state
+            timeout: Maximum seconds to wait, or None to wait indefinitely
+
+        Returns:
+            bool: True if the state changed, False if the timeout was reached
+        """
+        if self.version != since or (timeout is not None and timeout <= 0):
+            # Still give other tasks a turn, so a caller looping on this can't starve them
+            await asyncio.sleep(0)
+            return self.version != since
+        if self._event is None:
+            self._event = asyncio.Event()
+        try:
+            await asyncio.wait_for(self._event.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+class ObservableState(SimpleNamespace):
+    """
+    SimpleNamespace that notifies a StateChange when one of the watched attributes is assigned a
+    different value. Other attributes, like utilization figures updated every second, change
+    silently.
+
+    Args:
+        change: StateChange to notify
+        watched: Names of the attributes that wake waiting tasks
+        **kwargs: Initial attribute values
+    """
+    def __init__(self, change, watched, **kwargs):
+        object.__setattr__(self, '_change', change)
+        object.__setattr__(self, '_watched', frozenset(watched))
+        super().__init__(**kwargs)
+
+    @property
+    def change(self):
+        """The StateChange notified by this object."""
+        return self._change
+
+    def __setattr__(self, name, value):
+        notify = name in self._watched and getattr(self, name, None) != value
+        super().__setattr__(name, value)
+        if notify:
+            self._change.notify()
+
+    def __repr__(self):
+        values = ', '.join(f'{name}={value!r}' for name, value in vars(self).items() if not name.startswith('_'))
+        return f'{type(self).__name__}({values})'
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+
+# SPDX-FileCopyrightText: Copyright (c) 2025 Richard L. Lynch <rich@richlynch.com>
+# SPDX-License-Identifier: MIT
+
+"""Push state changes to open pages as server-sent events, instead of having them reload."""
+
+import json
+import logging
+
+from aiohttp import web
+
+logger = logging.getLogger(__name__)
+
+def flatten(value, prefix=''):
+    """
+    Flatten nested dicts and lists into a dict of dotted keys, e.g. proxies.0.name, so a change to
+    one value deep in a page's context is sent on its own.
+
+    Args:
+        value: Dict, list or plain value to flatten
+        prefix: Key of value, or '' at the top level
+
+    Returns:
+        dict: Dotted key to plain value
+    """
+    if isinstance(value, dict):
+        items = value.items()
+    elif isinstance(value, (list, tuple)):
+        items = enumerate(value)
+    else:
+        return {prefix: value}
+
+    flat = {}
+    for key, item in items:
+        flat.update(flatten(item, f'{prefix}.{key}' if prefix else str(key)))
+    # Empty containers still have a key, so emptying one changes the keys like filling one does
+    if not flat and prefix:
+        flat[prefix] = None
+    return flat
+
+def diff(old, new):
+    """
+    Get the values of new that are different from or missing in old.
+    """
+    return {key: value for key, value in new.items() if key not in old or old[key] != value}
+
+def format_event(data, event=None):
+    """
+    Format a server-sent event carrying data as JSON.
+    """
+    lines = f'event: {event}\n' if event else ''
+    return f'{lines}data: {json.dumps(data, separators=(",", ":"))}\n\n'.encode('utf-8')
+
+async def stream_state(request, change, snapshot, interval, on_sample=None):
+    """
+    Stream a page's state as server-sent events: the full state on connect, then whenever it
+    changes only the values that changed. When values are added or removed, e.g. a list grows or a
+    section appears, a layout event tells the page to reload, as it can't update that in place.
+
+    Values like utilization and uptime change without notifying change, so the state is also
+    sampled every interval seconds, and an empty comment is sent if nothing changed to keep
+    proxies and the browser from dropping the connection.
+
+    Args:
+        request: The EventSource request
+        change: StateChange notified when watched state changes
+        snapshot: Function returning the page's state as a dict of plain values
+        interval: Maximum seconds between samples of the state
+        on_sample: Optional function called each time the state is sampled
+
+    Returns:
+        web.StreamResponse: The event stream, once the client has disconnected
+    """
+    response = web.StreamResponse(headers={
+        'Content-Type': 'text/event-stream',
+        'Cache-Control': 'no-cache',
+        # Stop buffering reverse proxies from holding events back
+        'X-Accel-Buffering': 'no',
+    })
+    await response.prepare(request)
+
+    last_state = {}
+    try:
+        while True:
+            version = change.version
+            state = flatten(snapshot())
+            changes = diff(last_state, state)
+            if on_sample is not None:
+                on_sample()
+            if last_state and state.keys() != last_state.keys():
+                await response.write(format_event(changes, event='layout'))
+            elif changes:
+                await response.write(format_event(changes))
+            else:
+                await response.write(b':\n\n')
+            last_state = state
+            await change.wait(version, interval)
+    except ConnectionResetError:
+        logger.debug(f'Event stream {request.path} closed by the page')
+    return response
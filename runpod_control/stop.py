@@ -8,13 +8,14 @@ import logging
 import runpod
 
 from config import get_config, setup_runpod
+from utils import get_pods, invalidate_pods
 
 logger = logging.getLogger(__name__)
 
-def stop_pod():
-    name = get_config()['runpod']['pod']['name']
+def stop_pod(name=None):
+    name = name or get_config()['runpod']['pod']['name']
 
-    pod_list = runpod.get_pods()
+    pod_list = get_pods()
     pod_list = [pod for pod in pod_list if pod['name'] == name]
     assert len(pod_list) == 1
 
@@ -22,6 +23,7 @@ def stop_pod():
     logger.info(f'Stopping pod: {pod}')
 
     runpod.stop_pod(pod['id'])
+    invalidate_pods()
 
 def main():
     logging.basicConfig(level=logging.INFO)
@@ -0,0 +1,328 @@
+#!/usr/bin/env python3
+
+# SPDX-FileCopyrightText: Copyright (c) 2025 Richard L. Lynch <rich@richlynch.com>
+# SPDX-License-Identifier: MIT
+
+"""Mirror directories between the pod and this machine, transferring only files that changed.
+
+container/sync_index.py runs on the pod over the SSH connection and prints the size, modification
+time and hash of every file under the downloaded directories, then each change as it happens. Files
+are fetched over SFTP on the same connection, several at a time. A manifest of what has already
+been transferred in each direction is kept on disk, so restarts and reconnects don't transfer
+anything again. Like rsync without --delete, files deleted on one side are kept on the other.
+"""
+
+import os
+import json
+import shlex
+import asyncio
+import hashlib
+import logging
+from time import time
+from pathlib import Path
+
+import asyncssh
+
+logger = logging.getLogger(__name__)
+
+def hash_file(path, chunk_size=1 << 20):
+    """
+    Get the SHA-256 of a file's contents as a hex string.
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        while chunk := file.read(chunk_size):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def same_mtime(mtime_a, mtime_b):
+    """
+    Compare modification times to the second, as SFTP only carries whole seconds.
+    """
+    return int(mtime_a) == int(mtime_b)
+
+def scan_dirs(root, dirs):
+    """
+    Get the size and modification time of every file under directories.
+
+    Returns:
+        dict: Path relative to root to (size, mtime)
+    """
+    files = {}
+    for directory in dirs:
+        for dir_path, _, file_names in os.walk(root / directory):
+            for file_name in file_names:
+                path = Path(dir_path) / file_name
+                try:
+                    stat = path.stat()
+                except OSError:
+                    continue
+                files[path.relative_to(root).as_posix()] = (stat.st_size, stat.st_mtime)
+    return files
+
+class SyncStats:
+    """
+    Counters shown on the status page and exported as metrics.
+    """
+    def __init__(self):
+        self.watching = False
+        self.files_downloaded = 0
+        self.files_uploaded = 0
+        self.bytes_downloaded = 0
+        self.bytes_uploaded = 0
+        self.failures = 0
+        self.last_transfer = 0
+        self.last_flush = 0
+        self.last_flush_duration = None
+        self.last_error = None
+
+class SyncEngine:
+    """
+    Keep local copies of directories on the pod up to date while SSH is connected, and copy local
+    directories to the pod.
+
+    Args:
+        tunnel: SSHTunnel whose connection runs the index command and the SFTP transfers
+        sync_cfg: The sync section of the configuration
+        local_root: Local directory the synced directories are under
+        manifest_path: JSON file recording what has been transferred
+    """
+    def __init__(self, tunnel, sync_cfg, local_root, manifest_path):
+        self.tunnel = tunnel
+        self.cfg = sync_cfg
+        self.local_root = Path(local_root)
+        self.remote_root = sync_cfg['remote_root'].rstrip('/')
+        self.download_dirs = [directory.strip('/') for directory in sync_cfg['download']]
+        self.upload_dirs = [directory.strip('/') for directory in sync_cfg['upload']]
+        self.manifest_path = Path(manifest_path)
+        self.stats = SyncStats()
+
+        self.manifest = {'download': {}, 'upload': {}}
+        if self.manifest_path.exists():
+            try:
+                with open(self.manifest_path) as manifest_file:
+                    self.manifest.update(json.load(manifest_file))
+            except (OSError, ValueError) as ex:
+                logger.error(f"Failed to load sync manifest from {self.manifest_path}: {ex}")
+
+        self._sftp = None
+        self._semaphore = asyncio.Semaphore(sync_cfg['parallel'])
+        # Files waiting to be downloaded, with the entry to download, and the task downloading each
+        self._pending = {}
+        self._active = {}
+        self._failed = {}
+        self._dirty = False
+
+    @property
+    def pending(self):
+        """Number of files waiting for or in the middle of a transfer."""
+        return len(self._pending.keys() | self._active.keys())
+
+    def index_command(self, watch):
+        """
+        Get the command printing the index of the downloaded directories on the pod.
+        """
+        args = ['--root', self.remote_root]
+        if watch:
+            args.append('--watch')
+        # The configured command may have its own options
+        return f"{self.cfg['index_command']} {shlex.join(args + self.download_dirs)}"
+
+    def save_manifest(self):
+        """
+        Save the manifest to disk if anything was transferred since it was last saved.
+        """
+        if not self._dirty:
+            return
+        try:
+            tmp_path = self.manifest_path.with_suffix('.tmp')
+            with open(tmp_path, 'w') as manifest_file:
+                json.dump(self.manifest, manifest_file, separators=(',', ':'))
+            tmp_path.replace(self.manifest_path)
+            self._dirty = False
+        except OSError as ex:
+            logger.error(f"Failed to save sync manifest to {self.manifest_path}: {ex}")
+
+    async def run(self):
+        """
+        Follow the changes on the pod and download them, and upload local changes every
+        upload_interval seconds, until the SSH connection closes.
+        """
+        self._sftp = await self.tunnel.start_sftp()
+        proc = await self.tunnel.run_command(self.index_command(watch=True))
+        uploader = asyncio.create_task(self._upload_loop())
+        try:
+            self.stats.watching = True
+            while True:
+                line = await proc.stdout.readline()
+                if not line:
+                    break  # EOF
+                line = line.decode('utf-8', errors='ignore').strip()
+                if not line.startswith('{'):
+                    logger.info(f"Sync index: {line}")
+                    continue
+                try:
+                    self.apply(json.loads(line)['files'])
+                except (ValueError, KeyError) as ex:
+                    logger.error(f"{ex}: Failed to decode sync index line: {line[:200]}")
+        finally:
+            self.stats.watching = False
+            uploader.cancel()
+            proc.close()
+            # Whatever didn't finish is listed again when the index restarts
+            for task in self._active.values():
+                task.cancel()
+            self._active.clear()
+            self._pending.clear()
+            self.save_manifest()
+            self._sftp = None
+
+    async def flush(self):
+        """
+        Bring both sides fully up to date and wait for the transfers to finish, e.g. before the
+        pod is stopped or terminated. Rather than relying on the change feed, the whole index is
+        read again, so changes it hasn't reported yet are included.
+        """
+        start_time = time()
+        watching = self._sftp is not None
+        if not watching:
+            self._sftp = await self.tunnel.start_sftp()
+        try:
+            proc = await self.tunnel.run_command(self.index_command(watch=False))
+            output, _ = await proc.communicate()
+            for line in output.decode('utf-8', errors='ignore').splitlines():
+                if line.startswith('{'):
+                    self.apply(json.loads(line)['files'], retry_failed=True)
+            await self.upload_changes()
+            await self.wait_idle()
+        finally:
+            self.save_manifest()
+            if not watching:
+                self._sftp = None
+        self.stats.last_flush = time()
+        self.stats.last_flush_duration = self.stats.last_flush - start_time
+        logger.info(f"Sync flush completed in {self.stats.last_flush_duration:.1f} seconds")
+
+    def apply(self, files, retry_failed=False):
+        """
+        Queue downloads for files on the pod that don't match what was last downloaded.
+
+        Args:
+            files: Path relative to the remote root to [size, mtime, hash], or None if deleted
+            retry_failed: Also retry files whose download failed and that haven't changed since
+        """
+        for rel_path, entry in files.items():
+            if entry is None:
+                # Deletions aren't mirrored
+                continue
+            entry = list(entry)
+            if self.manifest['download'].get(rel_path) == entry:
+                continue
+            if self._failed.get(rel_path) == entry and not retry_failed:
+                continue
+            local_path = self.local_root / rel_path
+            if rel_path not in self.manifest['download']:
+                # Already there, e.g. copied by rsync before the manifest existed
+                try:
+                    stat = local_path.stat()
+                    if stat.st_size == entry[0] and same_mtime(stat.st_mtime, entry[1]):
+                        self.manifest['download'][rel_path] = entry
+                        self._dirty = True
+                        continue
+                except OSError:
+                    pass
+            self._queue_download(rel_path, entry)
+
+    def _queue_download(self, rel_path, entry):
+        self._pending[rel_path] = entry
+        self._failed.pop(rel_path, None)
+        if rel_path not in self._active:
+            self._active[rel_path] = asyncio.create_task(self._download_worker(rel_path))
+
+    async def _download_worker(self, rel_path):
+        try:
+            # Take the newest entry each time, in case the file changed again while queued
+            while rel_path in self._pending:
+                async with self._semaphore:
+                    entry = self._pending.pop(rel_path, None)
+                    if entry is not None:
+                        await self._download(rel_path, entry)
+        finally:
+            self._active.pop(rel_path, None)
+
+    async def _download(self, rel_path, entry):
+        local_path = self.local_root / rel_path
+        tmp_path = local_path.with_name(f'.{local_path.name}.sync')
+        try:
+            local_path.parent.mkdir(parents=True, exist_ok=True)
+            await self._sftp.get(f'{self.remote_root}/{rel_path}', tmp_path, preserve=True)
+            if await asyncio.to_thread(hash_file, tmp_path) != entry[2]:
+                # Changed while being copied - the index reports it again once it is written
+                logger.debug(f"Sync: {rel_path} changed during download, waiting for the next version")
+                tmp_path.unlink(missing_ok=True)
+                return
+            tmp_path.replace(local_path)
+        except (asyncssh.Error, OSError) as ex:
+            logger.error(f"Sync: failed to download {rel_path}: {ex}")
+            tmp_path.unlink(missing_ok=True)
+            self._failed[rel_path] = entry
+            self.stats.failures += 1
+            self.stats.last_error = f'{rel_path}: {ex}'
+            return
+
+        self.manifest['download'][rel_path] = entry
+        self._dirty = True
+        self.stats.files_downloaded += 1
+        self.stats.bytes_downloaded += entry[0]
+        self.stats.last_transfer = time()
+        logger.debug(f"Sync: downloaded {rel_path} ({entry[0]} bytes)")
+
+    async def wait_idle(self):
+        """
+        Wait for every queued download to finish.
+        """
+        while self._active:
+            await asyncio.gather(*self._active.values(), return_exceptions=True)
+
+    async def upload_changes(self):
+        """
+        Upload local files that changed since they were last uploaded, several at a time.
+        """
+        local_files = await asyncio.to_thread(scan_dirs, self.local_root, self.upload_dirs)
+        changed = [(rel_path, size, mtime) for rel_path, (size, mtime) in local_files.items()
+                   if (uploaded := self.manifest['upload'].get(rel_path)) is None
+                   or uploaded[0] != size or not same_mtime(uploaded[1], mtime)]
+        await asyncio.gather(*(self._upload(*file) for file in changed))
+
+    async def _upload(self, rel_path, size, mtime):
+        async with self._semaphore:
+            remote_path = f'{self.remote_root}/{rel_path}'
+            try:
+                await self._sftp.makedirs(remote_path.rsplit('/', 1)[0], exist_ok=True)
+                await self._sftp.put(self.local_root / rel_path, remote_path, preserve=True)
+            except (asyncssh.Error, OSError) as ex:
+                logger.error(f"Sync: failed to upload {rel_path}: {ex}")
+                self.stats.failures += 1
+                self.stats.last_error = f'{rel_path}: {ex}'
+                return
+
+            self.manifest['upload'][rel_path] = [size, mtime]
+            self._dirty = True
+            self.stats.files_uploaded += 1
+            self.stats.bytes_uploaded += size
+            self.stats.last_transfer = time()
+            logger.debug(f"Sync: uploaded {rel_path} ({size} bytes)")
+
+    async def _upload_loop(self):
+        """
+        Upload local changes, retry failed downloads and save the manifest every upload_interval.
+        """
+        while True:
+            try:
+                await self.upload_changes()
+                for rel_path, entry in list(self._failed.items()):
+                    self._queue_download(rel_path, entry)
+                self.save_manifest()
+            except Exception as ex: # pylint: disable=broad-exception-caught
+                logger.error(f"Error in sync upload: {ex}")
+            await asyncio.sleep(self.cfg['upload_interval'])
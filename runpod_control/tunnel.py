@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+
+# SPDX-FileCopyrightText: Copyright (c) 2025 Richard L. Lynch <rich@richlynch.com>
+# SPDX-License-Identifier: MIT
+
+"""In-process SSH tunnel to the pod, opening a forwarding channel per proxied connection."""
+
+import asyncio
+import logging
+import contextlib
+from time import monotonic
+
+import asyncssh
+
+logger = logging.getLogger(__name__)
+
+class ChannelStats:
+    """
+    Counters for the SSH channels forwarded to one remote port.
+    """
+    def __init__(self, remote_port):
+        self.remote_port = remote_port
+        self.channels_opened = 0
+        self.channels_active = 0
+        self.channels_failed = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.last_open_latency = None
+        self.max_open_latency = None
+        self.total_open_latency = 0
+
+    @property
+    def avg_open_latency(self):
+        """Average seconds taken to open a channel to the remote port."""
+        if not self.channels_opened:
+            return None
+        return self.total_open_latency / self.channels_opened
+
+    def record_open(self, latency):
+        """Record a successfully opened channel and how long it took to open."""
+        self.channels_opened += 1
+        self.channels_active += 1
+        self.last_open_latency = latency
+        self.max_open_latency = max(latency, self.max_open_latency or 0)
+        self.total_open_latency += latency
+
+class SSHTunnel:
+    """
+    Single SSH connection to the pod carrying the status command and one direct-tcpip channel per
+    proxied TCP connection.
+
+    Local listeners stay bound across reconnects. Connections accepted while SSH is down are
+    closed immediately, so clients see a fast failure rather than a hang.
+
+    Args:
+        remote_ports: Ports on the pod to make available locally
+        ssh_cfg: The ssh section of the configuration
+        listen_host: Local address to bind the forwarded ports to
+        port_offset: Added to each remote port to get its local port, so tunnels to several pods
+                     can be up at once
+    """
+    def __init__(self, remote_ports, ssh_cfg, listen_host='127.0.0.1', port_offset=0):
+        self.remote_ports = remote_ports
+        self.ssh_cfg = ssh_cfg
+        self.listen_host = listen_host
+        self.port_offset = port_offset
+        self.stats = {port: ChannelStats(port) for port in remote_ports}
+        self._conn = None
+        self._servers = []
+
+    @property
+    def connected(self):
+        """True while the SSH connection is up."""
+        return self._conn is not None
+
+    async def connect(self, host, port):
+        """
+        Connect to the pod's SSH server and start forwarding the remote ports.
+
+        Raises:
+            asyncssh.Error or OSError: If the connection fails
+        """
+        await self.start_listeners()
+        self._conn = await asyncssh.connect(
+            host, port,
+            username=self.ssh_cfg['username'],
+            known_hosts=None,
+            keepalive_interval=self.ssh_cfg['keepalive_interval'],
+            keepalive_count_max=self.ssh_cfg['keepalive_count_max'],
+            connect_timeout=self.ssh_cfg['connect_timeout'],
+        )
+        logger.info(f"SSH connection established to {host}:{port}")
+
+    async def start_listeners(self):
+        """
+        Bind a local listener for each remote port, if not already bound.
+        """
+        if self._servers:
+            return
+        for remote_port in self.remote_ports:
+            async def handle_connection(reader, writer, remote_port=remote_port):
+                await self._forward_connection(remote_port, reader, writer)
+            server = await asyncio.start_server(handle_connection, self.listen_host, remote_port + self.port_offset)
+            self._servers.append(server)
+
+    async def run_command(self, command):
+        """
+        Run a command on the pod in its own channel.
+
+        Returns:
+            asyncssh.SSHClientProcess: Process whose stdout yields bytes lines
+        """
+        return await self._conn.create_process(command, encoding=None,
+                                               stderr=asyncssh.STDOUT)
+
+    async def start_sftp(self):
+        """
+        Start an SFTP session on the pod in its own channel.
+
+        Returns:
+            asyncssh.SFTPClient: Client for transferring files
+        """
+        return await self._conn.start_sftp_client()
+
+    def disconnect(self):
+        """
+        Close the SSH connection, dropping all forwarded channels. Local listeners stay bound.
+        """
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    async def close(self):
+        """
+        Close the SSH connection and stop listening on the forwarded ports.
+        """
+        self.disconnect()
+        for server in self._servers:
+            server.close()
+            await server.wait_closed()
+        self._servers = []
+
+    async def _forward_connection(self, remote_port, local_reader, local_writer):
+        stats = self.stats[remote_port]
+        conn = self._conn
+        if conn is None:
+            stats.channels_failed += 1
+            local_writer.close()
+            return
+
+        start_time = monotonic()
+        try:
+            remote_reader, remote_writer = await conn.open_connection('127.0.0.1', remote_port)
+        except (asyncssh.Error, OSError) as ex:
+            logger.debug(f"Failed to open SSH channel to port {remote_port}: {ex}")
+            stats.channels_failed += 1
+            local_writer.close()
+            return
+
+        stats.record_open(monotonic() - start_time)
+        try:
+            await asyncio.gather(
+                self._pipe(local_reader, remote_writer, stats, 'bytes_sent'),
+                self._pipe(remote_reader, local_writer, stats, 'bytes_received'),
+            )
+        finally:
+            stats.channels_active -= 1
+            remote_writer.close()
+            local_writer.close()
+
+    async def _pipe(self, reader, writer, stats, counter, chunk_size=65536):
+        try:
+            while True:
+                data = await reader.read(chunk_size)
+                if not data:
+                    break
+                setattr(stats, counter, getattr(stats, counter) + len(data))
+                writer.write(data)
+                await writer.drain()
+            if writer.can_write_eof():
+                writer.write_eof()
+        except (asyncssh.Error, OSError) as ex:
+            logger.debug(f"SSH channel to port {stats.remote_port} closed: {ex}")
+            with contextlib.suppress(Exception):
+                writer.close()
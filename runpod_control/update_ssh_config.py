@@ -10,42 +10,24 @@ import time
 import asyncio
 from pathlib import Path
 
-import runpod
-
-from config import get_config, setup_runpod
+from config import setup_runpod
+from pod_client import create_pod_client
 
 logger = logging.getLogger(__name__)
 
-def get_ssh_ip_port():
-    name = get_config()['runpod']['pod']['name']
-    pod_list = runpod.get_pods()
-    pod_list = [pod for pod in pod_list if pod['name'] == name]
-    if len(pod_list) != 1:
-        return None, None
-    if not pod_list[0]['runtime']:
-        return None, None
-    if 'ports' not in pod_list[0]['runtime']:
-        return None, None
-    if not pod_list[0]['runtime']['ports']:
-        return None, None
-
-    ssh_port = [port for port in pod_list[0]['runtime']['ports'] if port['privatePort'] == 22]
-    assert len(ssh_port) == 1
-
-    ssh_port = ssh_port[0]
-    return ssh_port['ip'], ssh_port['publicPort']
-
-async def update_ssh_config(wait=True, replace=True, prompt_replace=True):
-    target_hostname = get_config()['runpod']['pod']['name']
-
-    ssh_ip, ssh_port = get_ssh_ip_port()
+async def update_ssh_config(wait=True, replace=True, prompt_replace=True, pod_client=None):
+    if pod_client is None:
+        pod_client = create_pod_client()
+    target_hostname = pod_client.name
+
+    ssh_ip, ssh_port = await pod_client.get_ssh_ip_port()
     if wait:
         if not ssh_ip or not ssh_port:
             logger.info("Waiting for SSH IP and port to be available...")
         while not ssh_ip or not ssh_port:
             await asyncio.sleep(5)
-            ssh_ip, ssh_port = get_ssh_ip_port()
-    else:
+            ssh_ip, ssh_port = await pod_client.get_ssh_ip_port()
+    elif not ssh_ip or not ssh_port:
         raise ConnectionError("SSH IP or port not found. Please ensure the pod is running and SSH is enabled.")
 
     orig_fn = Path.home() / '.ssh' / 'config'
@@ -4,28 +4,128 @@
 # SPDX-License-Identifier: MIT
 
 import logging
+import threading
+from concurrent.futures import Future
 from functools import cache
+from time import monotonic
 from types import SimpleNamespace
 
 import runpod
 
+from config import get_config
+
 logger = logging.getLogger(__name__)
 
+class PodCache:
+    """
+    Cache of the pod inventory returned by runpod.get_pods(), shared by every caller.
+
+    Concurrent callers that miss the cache share a single in-flight request rather than each
+    issuing their own. Safe to use from the event loop's worker threads.
+
+    Args:
+        ttl: Seconds a fetched pod list is served before it is refreshed
+    """
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._pods = None
+        self._fetched_at = 0
+        self._in_flight = None
+
+    def get_pods(self, max_age=None):
+        """
+        Get the pod list, fetching it from RunPod if the cached copy is older than max_age.
+        """
+        max_age = self.ttl if max_age is None else max_age
+        with self._lock:
+            if self._pods is not None and monotonic() - self._fetched_at <= max_age:
+                return self._pods
+            future = self._in_flight
+            is_owner = future is None
+            if is_owner:
+                future = self._in_flight = Future()
+
+        if not is_owner:
+            logger.debug("Waiting for in-flight pod list request")
+            return future.result()
+
+        logger.debug("Fetching pod list from RunPod")
+        try:
+            pods = runpod.get_pods()
+        except Exception as ex:
+            with self._lock:
+                if self._in_flight is future:
+                    self._in_flight = None
+            future.set_exception(ex)
+            raise
+
+        with self._lock:
+            # Only keep the result if it wasn't invalidated by a lifecycle action while in flight
+            if self._in_flight is future:
+                self._in_flight = None
+                self._pods = pods
+                self._fetched_at = monotonic()
+        future.set_result(pods)
+        return pods
+
+    def invalidate(self):
+        """
+        Drop the cached pod list after a lifecycle action so the next caller sees the new state.
+        """
+        with self._lock:
+            self._pods = None
+            self._in_flight = None
+
+@cache
+def get_pod_cache():
+    """
+    Get the process-wide pod inventory cache.
+    """
+    return PodCache(get_config()['runpod']['pod_cache_ttl'])
+
+def get_pods(max_age=None):
+    """
+    Get the list of pods on the account through the shared pod cache.
+    """
+    return get_pod_cache().get_pods(max_age)
+
+def invalidate_pods():
+    """
+    Invalidate the shared pod cache. Call after creating, resuming, stopping or terminating a pod.
+    """
+    get_pod_cache().invalidate()
+
+@cache
+def get_gpu_types():
+    """
+    Get the ID, display name and memory of every GPU type, fetched once per process.
+    """
+    logger.debug("Fetching GPU types from RunPod")
+    return runpod.get_gpus()
+
+@cache
+def get_gpu_details(gpu_id):
+    """
+    Get the prices and clouds of a GPU type, fetched once per process.
+    """
+    logger.debug(f"Fetching details of GPU type: {gpu_id}")
+    return runpod.get_gpu(gpu_id)
+
 @cache
 def get_gpu_mem_gb(name):
     """
     Get the GPU memory size in GB for a given GPU name or ID.
     """
     logger.debug(f"Looking up GPU memory for: {name}")
-    gpu_list = runpod.get_gpus()
-    for gpu in gpu_list:
+    for gpu in get_gpu_types():
         if gpu['id'] == name or gpu['displayName'] == name:
             return gpu['memoryInGb']
     return None
 
-def get_pod_info(name_or_pod):
+def get_pod_info(name_or_pod, max_age=None):
     if isinstance(name_or_pod, str):
-        pod_list = runpod.get_pods()
+        pod_list = get_pods(max_age)
         pod_list = [pod for pod in pod_list if pod['name'] == name_or_pod]
         if len(pod_list) == 0:
             return None
@@ -39,4 +139,28 @@ def get_pod_info(name_or_pod):
         cpu_mem_gb=pod['memoryInGb'],
         gpu_mem_gb=get_gpu_mem_gb(pod['machine']['gpuDisplayName']),
         is_running=pod['desiredStatus'] == 'RUNNING',
+        # RunPod only reports runtime information once the container has actually started
+        is_started=bool(pod.get('runtime')),
     )
+
+def get_ssh_ip_port(name, max_age=None):
+    """
+    Get the public IP and port of the SSH server for the named pod, or (None, None) if the pod
+    has no published SSH port yet.
+    """
+    pod_list = get_pods(max_age)
+    pod_list = [pod for pod in pod_list if pod['name'] == name]
+    if len(pod_list) != 1:
+        return None, None
+    if not pod_list[0]['runtime']:
+        return None, None
+    if 'ports' not in pod_list[0]['runtime']:
+        return None, None
+    if not pod_list[0]['runtime']['ports']:
+        return None, None
+
+    ssh_port = [port for port in pod_list[0]['runtime']['ports'] if port['privatePort'] == 22]
+    assert len(ssh_port) == 1
+
+    ssh_port = ssh_port[0]
+    return ssh_port['ip'], ssh_port['publicPort']
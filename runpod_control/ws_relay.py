@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+
+# SPDX-FileCopyrightText: Copyright (c) 2025 Richard L. Lynch <rich@richlynch.com>
+# SPDX-License-Identifier: MIT
+
+"""Relay WebSocket messages between the browser and the backend with bounded buffering."""
+
+import asyncio
+import logging
+import contextlib
+from collections import deque
+from time import time
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+# ComfyUI binary event types carrying sampler preview images
+PREVIEW_EVENT_TYPES = (1, 2, 4)   # PREVIEW_IMAGE, UNENCODED_PREVIEW_IMAGE, PREVIEW_IMAGE_WITH_METADATA
+
+# Seconds between updates of the proxy's last activity time while messages are flowing
+ACTIVITY_STAMP_INTERVAL = 1
+
+def is_preview_frame(data):
+    """
+    Check if a binary message from ComfyUI is a preview image, which is safe to drop since the next
+    one supersedes it.
+    """
+    return len(data) >= 4 and int.from_bytes(data[:4], 'big') in PREVIEW_EVENT_TYPES
+
+class RelayBuffer:
+    """
+    Messages read from one side of a relay and not yet written to the other. Holds at most
+    max_bytes of messages; beyond that the reader waits, except for preview frames which are
+    handled according to preview_policy.
+
+    Args:
+        max_bytes: Bytes of messages to buffer before the reader waits
+        preview_policy: 'coalesce' to replace a queued preview frame with the newest one, 'drop' to
+                        discard preview frames while the buffer is full, or 'block' to treat them
+                        like any other message
+        on_drop: Called with 'coalesced' or 'dropped' for each discarded preview frame
+    """
+    def __init__(self, max_bytes, preview_policy='block', on_drop=None):
+        self.max_bytes = max_bytes
+        self.preview_policy = preview_policy
+        self.on_drop = on_drop
+        self.size = 0
+        self._messages = deque()
+        self._queued_preview = None
+        self._closed = False
+        self._readable = asyncio.Event()
+        self._writable = asyncio.Event()
+        self._writable.set()
+
+    async def put(self, msg_type, data, preview=False):
+        """
+        Add a message, waiting for space if the buffer is full.
+        """
+        size = len(data)
+        if preview and self.preview_policy != 'block':
+            if self.preview_policy == 'coalesce' and self._queued_preview is not None:
+                # Replace the frame the writer hasn't got to yet with the newer one, queued after
+                # the messages that arrived since so the order is kept
+                old_entry = self._queued_preview
+                del self._messages[next(index for index, entry in enumerate(self._messages) if entry is old_entry)]
+                self.size -= len(old_entry[1])
+                self._drop('coalesced')
+                self._append([msg_type, data], preview=True)
+                return
+            if self._messages and self.size + size > self.max_bytes:
+                self._drop('dropped')
+                return
+
+        # A message larger than the whole buffer is let through once the buffer is empty
+        while self._messages and self.size + size > self.max_bytes:
+            self._writable.clear()
+            await self._writable.wait()
+
+        self._append([msg_type, data], preview)
+
+    def _append(self, entry, preview):
+        if preview:
+            self._queued_preview = entry
+        self._messages.append(entry)
+        self.size += len(entry[1])
+        self._readable.set()
+
+    async def get(self):
+        """
+        Take the oldest message, waiting for one if the buffer is empty.
+
+        Returns:
+            tuple: Message type and data, or None once the buffer is closed and empty
+        """
+        while not self._messages:
+            if self._closed:
+                return None
+            self._readable.clear()
+            await self._readable.wait()
+
+        entry = self._messages.popleft()
+        if entry is self._queued_preview:
+            self._queued_preview = None
+        self.size -= len(entry[1])
+        self._writable.set()
+        return entry[0], entry[1]
+
+    def close(self):
+        """No more messages will be added."""
+        self._closed = True
+        self._readable.set()
+
+    def _drop(self, reason):
+        if self.on_drop:
+            self.on_drop(reason)
+
+class ActivityStamp:
+    """
+    Record that messages were relayed with a flag, and copy it to the proxy's last activity time
+    periodically, so the relay doesn't call time() per message.
+    """
+    def __init__(self, state):
+        self.state = state
+        self.dirty = False
+
+    async def run(self):
+        """Update the proxy's last activity time while messages are flowing."""
+        while True:
+            await asyncio.sleep(ACTIVITY_STAMP_INTERVAL)
+            self.flush()
+
+    def flush(self):
+        """Update the proxy's last activity time if messages were relayed since the last flush."""
+        if self.dirty:
+            self.state.last_web_activity = time()
+            self.dirty = False
+
+async def relay_messages(ws_from, ws_to, direction, buffer, activity, message_count):
+    """
+    Read messages from one side into a buffer and write them to the other side, until the reading
+    side closes.
+    """
+    debug = logger.isEnabledFor(logging.DEBUG)
+    detect_previews = buffer.preview_policy != 'block'
+
+    async def read():
+        try:
+            async for msg in ws_from:
+                message_count.inc()
+                activity.dirty = True
+                if debug:
+                    payload = f' ({msg.data})' if msg.type == aiohttp.WSMsgType.TEXT else ''
+                    logger.debug(f'Forwarding {direction}: {msg.type.name}{payload}')
+
+                if msg.type == aiohttp.WSMsgType.TEXT:
+                    await buffer.put(msg.type, msg.data)
+                elif msg.type == aiohttp.WSMsgType.BINARY:
+                    await buffer.put(msg.type, msg.data, detect_previews and is_preview_frame(msg.data))
+                else:
+                    logger.warning(f'Unknown message type: {msg.type}')
+        finally:
+            buffer.close()
+
+    async def write():
+        while (message := await buffer.get()) is not None:
+            msg_type, data = message
+            if msg_type == aiohttp.WSMsgType.TEXT:
+                await ws_to.send_str(data)
+            else:
+                await ws_to.send_bytes(data)
+
+    reader = asyncio.create_task(read())
+    try:
+        await write()
+        await reader
+    except Exception as e: # pylint: disable=broad-exception-caught
+        logger.error(f'Error forwarding {direction} messages: {e}')
+    finally:
+        reader.cancel()
+        with contextlib.suppress(asyncio.CancelledError, Exception):
+            await reader
+        try:
+            if not ws_to.closed:
+                await ws_to.close()
+        except asyncio.CancelledError:
+            logger.debug('WebSocket cancelled')
+
+async def handle_websocket_proxy(ws_client, ws_backend_server, state, metrics, ws_cfg):
+    """
+    Forward WebSocket messages between client and backend server.
+
+    Each direction buffers up to ws_cfg['max_buffer_kb'] of messages. When the browser falls
+    behind, ComfyUI preview frames are coalesced or dropped according to ws_cfg['preview_policy'];
+    other messages make the relay stop reading from the backend until the browser catches up.
+
+    Args:
+        ws_client: WebSocket connection to the client
+        ws_backend_server: WebSocket connection to the backend server
+        state: State object to track activity
+        metrics: ProxyMetrics to count relayed messages in
+        ws_cfg: The web.websocket section of the configuration
+    """
+    max_bytes = ws_cfg['max_buffer_kb'] * 1024
+    dropped = {reason: metrics.websocket_previews_dropped.labels(state.name, reason)
+               for reason in ('coalesced', 'dropped')}
+
+    def on_drop(reason):
+        dropped[reason].inc()
+
+    activity = ActivityStamp(state)
+    state.last_web_activity = time()
+    stamper = asyncio.create_task(activity.run())
+
+    # Create tasks for bidirectional forwarding
+    client_to_server = asyncio.create_task(relay_messages(
+        ws_client, ws_backend_server, 'client->server', RelayBuffer(max_bytes), activity,
+        metrics.websocket_messages.labels(state.name, 'client->server')))
+    server_to_client = asyncio.create_task(relay_messages(
+        ws_backend_server, ws_client, 'server->client', RelayBuffer(max_bytes, ws_cfg['preview_policy'], on_drop),
+        activity, metrics.websocket_messages.labels(state.name, 'server->client')))
+
+    # Wait for either direction to complete
+    connections = metrics.websocket_connections.labels(state.name)
+    connections.inc()
+    try:
+        await asyncio.wait(
+            [client_to_server, server_to_client],
+            return_when=asyncio.FIRST_COMPLETED
+        )
+    finally:
+        connections.inc(-1)
+        activity.flush()
+
+        # Cancel remaining tasks
+        for task in (client_to_server, server_to_client, stamper):
+            task.cancel()
+        await asyncio.gather(client_to_server, server_to_client, stamper, return_exceptions=True)